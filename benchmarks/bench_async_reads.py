@@ -0,0 +1,133 @@
+"""
+Load test for the async read endpoints at 200 concurrent clients.
+
+Runs main.app in-process through httpx's ASGI transport against a throwaway seeded database and compares
+the async GET /expenses/ route with a sync `def` clone of the previous implementation (Session + threadpool).
+Authentication is overridden with a fixed user so only the database path is measured.
+
+Usage (from the project root, main.py loads categoryFinder.pkl relative to it):
+    python benchmarks/bench_async_reads.py --clients 200 --requests 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import httpx
+from fastapi import Depends
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import database
+import main
+import models
+from service import auth_service
+
+
+def seed(SessionLocal, rows: int) -> models.User:
+    rng = random.Random(1)
+    with SessionLocal() as db:
+        user = models.User(email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        db.bulk_save_objects([
+            models.Expense(user_id=user.id, date=date(2024, 1, 1) + timedelta(days=rng.randrange(730)),
+                           category_id=rng.randint(1, 8), amount=rng.uniform(1, 500), name="bench")
+            for _ in range(rows)
+        ])
+        db.commit()
+        db.refresh(user)
+        db.expunge(user)
+        return user
+
+
+def read_expenses_sync(month: int = None, year: int = None, skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
+    """The pre-async implementation of GET /expenses/, kept here as the baseline."""
+    query = db.query(models.Expense).filter(models.Expense.user_id == 1)
+    if month is not None and year is not None:
+        start_date = date(year, month, 1)
+        end_date = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+        query = query.filter(models.Expense.date >= start_date, models.Expense.date < end_date)
+    expenses = query.order_by(models.Expense.date.desc(), models.Expense.created_at.desc()).offset(skip).limit(limit).all()
+    return [main.Expense(**expense.__dict__) for expense in expenses]
+
+
+async def load(client: httpx.AsyncClient, path: str, clients: int, requests_per_client: int) -> dict:
+    latencies = []
+
+    async def worker(seed: int):
+        rng = random.Random(seed)
+        for _ in range(requests_per_client):
+            started = time.perf_counter()
+            response = await client.get(path, params={"month": rng.randint(1, 12), "year": rng.choice([2024, 2025])})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+async def run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        sync_engine = database.create_db_engine(f"sqlite:///{db_path}")
+        async_engine = database.create_async_db_engine(f"sqlite+aiosqlite:///{db_path}")
+        models.Base.metadata.create_all(bind=sync_engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+        AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+        user = seed(SessionLocal, args.rows)
+
+        def override_get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        async def override_get_async_db():
+            async with AsyncSessionLocal() as db:
+                yield db
+
+        main.app.dependency_overrides[database.get_db] = override_get_db
+        main.app.dependency_overrides[database.get_async_db] = override_get_async_db
+        main.app.dependency_overrides[auth_service.get_current_user] = lambda: user
+        main.app.dependency_overrides[auth_service.get_current_user_async] = lambda: user
+        main.app.add_api_route("/bench/expenses-sync", read_expenses_sync, methods=["GET"])
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            print(f"{args.clients} concurrent clients x {args.requests} requests, {args.rows} expenses")
+            print(f"{'endpoint':<28} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+            for label, path in (("sync def + threadpool", "/bench/expenses-sync"), ("async def + aiosqlite", "/expenses/")):
+                result = await load(client, path, args.clients, args.requests)
+                print(f"{label:<28} {result['rps']:>8.0f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f}")
+
+        await async_engine.dispose()
+        sync_engine.dispose()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--rows", type=int, default=50_000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,106 @@
+"""
+Requests per second on GET /expenses/ with and without the authenticated-principal cache.
+
+Runs main.app in-process through httpx's ASGI transport against a throwaway seeded database. Unlike the other
+benchmarks authentication is NOT overridden: every request carries a real JWT, so the users lookup that the
+cache removes is part of the measured path. GET /accounts/balance is measured too: its handler is a single
+lookup, so the saved users query is a larger share of each request there.
+
+Usage (from the project root, main.py loads categoryFinder.pkl relative to it):
+    python benchmarks/bench_auth_cache.py --clients 50 --requests 40
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import httpx
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import database
+import main
+import models
+from service import auth_service
+
+
+def seed(SessionLocal, users: int, rows_per_user: int) -> list:
+    rng = random.Random(1)
+    with SessionLocal() as db:
+        db.add_all([models.User(email=f"bench{u}@example.com", hashed_password="x") for u in range(users)])
+        db.commit()
+        user_ids = [user_id for (user_id,) in db.query(models.User.id).all()]
+        db.bulk_save_objects([
+            models.Expense(user_id=user_id, date=date(2025, 1, 1) + timedelta(days=rng.randrange(365)),
+                           category_id=rng.randint(1, 8), amount=rng.uniform(1, 500), name="bench")
+            for user_id in user_ids for _ in range(rows_per_user)
+        ])
+        db.add_all([models.Account(user_id=user_id, balance=1000) for user_id in user_ids])
+        db.commit()
+    return [auth_service.create_access_token({"sub": str(user_id)}) for user_id in user_ids]
+
+
+async def load(client: httpx.AsyncClient, path: str, params: dict, tokens: list, clients: int, requests_per_client: int) -> float:
+    async def worker(seed: int):
+        rng = random.Random(seed)
+        for _ in range(requests_per_client):
+            response = await client.get(path, params=params,
+                                        headers={"Authorization": f"Bearer {rng.choice(tokens)}"})
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(clients)))
+    return clients * requests_per_client / (time.perf_counter() - started)
+
+
+async def run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        sync_engine = database.create_db_engine(f"sqlite:///{db_path}")
+        async_engine = database.create_async_db_engine(f"sqlite+aiosqlite:///{db_path}")
+        models.Base.metadata.create_all(bind=sync_engine)
+        tokens = seed(sessionmaker(bind=sync_engine), args.users, 50)
+        AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+        async def override_get_async_db():
+            async with AsyncSessionLocal() as db:
+                yield db
+
+        main.app.dependency_overrides[database.get_async_db] = override_get_async_db
+        cache = auth_service.principal_cache
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            print(f"{args.clients} concurrent clients x {args.requests} requests, {args.users} users")
+            ttl_seconds = cache.ttl_seconds
+            for path, params in (("/expenses/", {"limit": 20}), ("/accounts/balance", {})):
+                for label, ttl in (("no cache", 0), ("principal cache", ttl_seconds or 60)):
+                    cache.ttl_seconds = ttl
+                    cache.clear()
+                    cache.hits = cache.misses = 0
+                    rps = await load(client, path, params, tokens, args.clients, args.requests)
+                    print(f"{path:<18} {label:<16} {rps:>8.0f} req/s   hits {cache.hits:>6}  misses {cache.misses:>6}")
+            cache.ttl_seconds = ttl_seconds
+
+        await async_engine.dispose()
+        sync_engine.dispose()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=40, help="requests per client")
+    parser.add_argument("--users", type=int, default=100)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
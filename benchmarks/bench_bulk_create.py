@@ -0,0 +1,112 @@
+"""
+Throughput of the bulk create endpoints against the single-row POST path.
+
+Runs main.app in-process through FastAPI's TestClient against a throwaway database and imports the same
+synthetic statement twice: once as N `POST /expenses/` calls (one commit each) and once as a single
+`POST /expenses/bulk`. Authentication is overridden with a fixed user so only the write path is measured.
+A MAX_BULK_ROWS batch on as many distinct dates is posted too. Afterwards the monthly aggregates and the
+account balance snapshot are checked against the raw tables.
+
+Usage (from the project root, main.py loads categoryFinder.pkl relative to it):
+    python benchmarks/bench_bulk_create.py --rows 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+import database
+import main
+import models
+from service import auth_service, ledger_service
+from service.aggregate_service import check_monthly_aggregates_drift
+
+
+def statement(rows: int, seed: int) -> list:
+    rng = random.Random(seed)
+    # Dates around today so both branches of the balance snapshot rule (before/after modified_at) are hit
+    return [
+        {"date": (date.today() + timedelta(days=rng.randint(-180, 180))).isoformat(),
+         "category_id": rng.randint(1, 8), "amount": round(rng.uniform(1, 500), 2), "name": f"row {i}"}
+        for i in range(rows)
+    ]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000, help="rows in the synthetic statement")
+    parser.add_argument("--profile", default=database.DEFAULT_SQLITE_PROFILE, choices=sorted(database.SQLITE_PROFILES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        engine = database.create_db_engine(f"sqlite:///{db_path}", args.profile)
+        models.Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        with SessionLocal() as db:
+            user = models.User(email="bench@example.com", hashed_password="x")
+            db.add(user)
+            db.commit()
+            account = models.Account(user_id=user.id, balance=10_000)
+            db.add(account)
+            ledger_service.refresh_account_snapshot(db, account)
+            db.commit()
+            db.refresh(user)
+            db.expunge(user)
+
+        def override_get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        main.app.dependency_overrides[database.get_db] = override_get_db
+        main.app.dependency_overrides[auth_service.get_current_user] = lambda: user
+        client = TestClient(main.app)
+
+        rows = statement(args.rows, seed=1)
+        started = time.perf_counter()
+        for row in rows:
+            client.post("/expenses/", json=row).raise_for_status()
+        single = time.perf_counter() - started
+
+        rows = statement(args.rows, seed=2)
+        started = time.perf_counter()
+        response = client.post("/expenses/bulk", json=rows)
+        response.raise_for_status()
+        bulk = time.perf_counter() - started
+        assert len(response.json()["created_ids"]) == args.rows
+
+        # A full batch with every row on its own date, the balance snapshot must handle it in one request
+        distinct_dates = [{"date": (date.today() - timedelta(days=i)).isoformat(), "category_id": 1,
+                           "amount": 1.0, "name": f"dated {i}"} for i in range(main.MAX_BULK_ROWS)]
+        response = client.post("/expenses/bulk", json=distinct_dates)
+        response.raise_for_status()
+        assert len(response.json()["created_ids"]) == main.MAX_BULK_ROWS
+
+        with SessionLocal() as db:
+            aggregate_drift = check_monthly_aggregates_drift(db)
+            ledger_drift = ledger_service.check_account_snapshots(db)
+        engine.dispose()
+
+    print(f"{args.rows} expenses, '{args.profile}' SQLite profile")
+    print(f"{'path':<24} {'seconds':>8} {'rows/s':>10}")
+    print(f"{'POST /expenses/ x N':<24} {single:>8.2f} {args.rows / single:>10.0f}")
+    print(f"{'POST /expenses/bulk':<24} {bulk:>8.2f} {args.rows / bulk:>10.0f} ({single / bulk:.0f}x faster)")
+    print(f"aggregate drift rows: {len(aggregate_drift)}, drifting account snapshots: {len(ledger_drift)}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,108 @@
+"""
+The pickled TF-IDF pipeline (categoryFinder.pkl) vs the hashing model from train_category_model.py.
+
+Each model is measured in its own fresh interpreter, like a uvicorn worker starting up:
+
+    load s       time to import what the model needs and load it
+    rss MB       resident memory of the worker after loading and scoring (VmRSS)
+    private MB   the anonymous, per-worker part of it (RssAnon); memory-mapped weights are file pages that
+                 every worker shares, so they show up in rss but not here
+    batch/s      names per second through one predict_proba over the whole statement
+    single/s     names per second scoring one name per call, like uncached /predict-category requests
+    accuracy     on the notebook's held-out split (test_size=0.2, random_state=42)
+
+Without --hashing-model a fresh hashing version is trained into a temporary directory.
+
+Usage (from the project root):
+    python benchmarks/bench_category_models.py --rows 2000
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+MERCHANTS = ["Swiggy order", "Zomato", "Uber trip", "Amazon purchase", "Netflix subscription", "Electricity bill",
+             "House rent", "Apollo pharmacy", "Petrol pump", "Movie tickets", "Home loan EMI", "Grocery store"]
+
+
+def memory_mb() -> dict:
+    status = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                status[key] = int(value.split()[0]) / 1024
+    return status
+
+
+def measure(model_path: str, rows: int) -> dict:
+    """Runs inside the child interpreter."""
+    started = time.perf_counter()
+    from service.category_model import load_category_model
+    model = load_category_model(model_path)
+    load_seconds = time.perf_counter() - started
+
+    rng = random.Random(1)
+    names = [f"UPI-{rng.choice(MERCHANTS).upper()}-PAY{rng.randint(1, 99)}@OKAXIS-{rng.randint(10 ** 11, 10 ** 12 - 1)}-UPI"
+             for _ in range(rows)]
+
+    started = time.perf_counter()
+    model.predict_proba(names)
+    batch_rate = rows / (time.perf_counter() - started)
+    started = time.perf_counter()
+    for name in names[:500]:
+        model.predict_proba([name])
+    single_rate = min(rows, 500) / (time.perf_counter() - started)
+
+    # Before the split is loaded, pandas and scikit-learn would otherwise count against the hashing model
+    memory = memory_mb()
+    from train_category_model import load_split
+    _, x_test, _, y_test = load_split()
+    accuracy = float((model.predict(list(x_test)) == y_test.to_numpy()).mean())
+    return {"load": load_seconds, "rss": memory.get("VmRSS"), "private": memory.get("RssAnon"),
+            "batch": batch_rate, "single": single_rate, "accuracy": accuracy}
+
+
+def run_child(model_path: str, rows: int) -> dict:
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", model_path, "--rows", str(rows)],
+                            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--pickle-model", default="categoryFinder.pkl")
+    parser.add_argument("--hashing-model", help="version directory written by train_category_model.py --model hashing")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.rows)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        hashing_model = args.hashing_model
+        if hashing_model is None:
+            subprocess.run([sys.executable, "train_category_model.py", "--model", "hashing", "--model-dir", tmp],
+                           cwd=PROJECT_ROOT, capture_output=True, check=True)
+            hashing_model = os.path.join(tmp, "v1")
+
+        print(f"{args.rows} statement names per model, fresh interpreter each\n")
+        print(f"{'model':<10} {'load s':>7} {'rss MB':>7} {'private MB':>11} {'batch/s':>9} {'single/s':>9} {'accuracy':>9}")
+        for label, path in (("pickle", args.pickle_model), ("hashing", hashing_model)):
+            r = run_child(path, args.rows)
+            print(f"{label:<10} {r['load']:>7.2f} {r['rss']:>7.1f} {r['private']:>11.1f} {r['batch']:>9.0f} "
+                  f"{r['single']:>9.0f} {r['accuracy']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,126 @@
+"""
+Throughput of category prediction with the merchant rules in front of the model vs the model alone.
+
+Builds a statement shaped like the HDFC export in "test statements": UPI payments to known merchants
+(Swiggy, Zepto, fuel, pharmacies, mutual funds, card bills...) that the rules answer, mixed with person to
+person payments and small shops that only the model can guess. Every row carries a fresh reference number and
+person names are unique, so the prediction cache is no help for the model rows. The baseline swaps in an
+empty rule set; the prediction cache is cleared before every run.
+
+    categorize/s  rows per second of the upload's categorization step alone (rules, then the model)
+    batch/s       rows per second through /predict-category/batch, in-process via FastAPI's TestClient
+    single/s      rows per second with one /predict-category call each
+
+The pickled TF-IDF pipeline scores a batch in one vectorized pass; pass --model with a hashing version from
+train_category_model.py to see the gain on a model that scores name by name.
+
+Usage (from the project root, main.py loads categoryFinder.pkl relative to it):
+    python benchmarks/bench_category_rules.py --rows 5000 --rule-share 0.6 --model models/category/v1
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from fastapi.testclient import TestClient
+
+import main
+from service import category_service
+from service.category_rules import RuleClassifier, rule_classifier
+
+RULE_MERCHANTS = [
+    "SWIGGY", "ZOMATO", "ZEPTO MARKETPLACE PR", "BLINKIT", "UBER INDIA", "OLA", "INDIAN OIL PETROL PUM",
+    "APOLLO PHARMACY", "NETFLIX", "BOOKMYSHOW", "ICCL  MUTUAL FUNDS", "CAFE COFFEE DAY", "NEW PRINCE BAKERY",
+    "BESCOM ELECTRICITY", "AIRTEL RECHARGE",
+]
+FIRST_NAMES = ["GAURAV", "SHILA", "VIKRAM", "MANISH", "GAYATRI", "SAKSHAM", "MOHINI", "PANCHAM", "ROHIT", "NEHA"]
+LAST_NAMES = ["KUMAR", "PUROHIT", "WAGHMARE", "PAL", "GUPTA", "ARORA", "GAUTAM", "PURIWAL", "SHARMA", "IYER"]
+HANDLES = ["YBL", "OKAXIS", "PTYS", "PAYTM", "OKHDFCBANK", "AXL"]
+
+
+def statement(rows: int, rule_share: float, seed: int) -> list:
+    rng = random.Random(seed)
+    names = []
+    for i in range(rows):
+        reference = rng.randint(10 ** 11, 10 ** 12 - 1)
+        handle = f"Q{rng.randint(10 ** 8, 10 ** 9)}@{rng.choice(HANDLES)}"
+        if rng.random() < rule_share:
+            merchant = rng.choice(RULE_MERCHANTS)
+            names.append(f"UPI-{merchant}-{handle}-YESB0YBLUPI-{reference}-PAID VIA CRED")
+        else:
+            # Unique payee per row, like the long tail of person to person payments. The suffix is letters:
+            # normalize_merchant drops numbers, so a numeric one would collapse the payees into one merchant
+            suffix = "".join(chr(ord("A") + int(digit)) for digit in str(i))
+            payee = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {suffix}"
+            names.append(f"UPI-{payee}-{handle}-UTIB0000553-{reference}-UPI")
+    return names
+
+
+def categorize(model, names: list, classifier: RuleClassifier) -> dict:
+    """What the upload does per statement: rules first, one cold-cache model pass over the rest."""
+    answered = [classifier.match(name) for name in names]
+    model_names = [name for name, category in zip(names, answered) if category is None]
+    cache = category_service.PredictionCache(category_service.CATEGORY_CACHE_MAX_SIZE)
+    if model_names:
+        cache.predict(model, model_names)
+    return {"rule": len(names) - len(model_names), "model": len(model_names), "scored": cache.misses}
+
+
+def run_batch(client: TestClient, names: list, batch_size: int) -> None:
+    for offset in range(0, len(names), batch_size):
+        client.post("/predict-category/batch", json={"names": names[offset:offset + batch_size], "top_k": 1}).raise_for_status()
+
+
+def run_single(client: TestClient, names: list) -> None:
+    for name in names:
+        client.post("/predict-category", json={"name": name}).raise_for_status()
+
+
+def best_rate(rows: int, repeats: int, run) -> float:
+    """Rows per second of the fastest of repeats runs, the prediction cache cleared before each."""
+    best = float("inf")
+    for _ in range(repeats):
+        category_service.prediction_cache.clear()
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return rows / best
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--rule-share", type=float, default=0.6, help="share of rows from merchants the rules know")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--single-rows", type=int, default=500, help="rows sent one /predict-category call each")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--model", help="category model to serve (version directory, .npy or .pkl), default as configured")
+    args = parser.parse_args()
+
+    if args.model:
+        category_service.model_loader = category_service.ModelLoader(args.model)
+    model = category_service.model_loader.get(timeout=None)
+    client = TestClient(main.app)
+    names = statement(args.rows, args.rule_share, seed=1)
+    single_names = names[:args.single_rows]
+    print(f"{args.rows} rows, {len(rule_classifier.rules)} rules, model {type(model).__name__}, best of {args.repeats}\n")
+    print(f"{'':<16} {'categorize/s':>13} {'batch/s':>9} {'single/s':>9}   rows by source (distinct merchants scored)")
+
+    for label, classifier in (("model only", RuleClassifier([])), ("rules + model", rule_classifier)):
+        main.rule_classifier = classifier
+        sources = categorize(model, names, classifier)
+        categorize_rate = best_rate(len(names), args.repeats, lambda: categorize(model, names, classifier))
+        batch_rate = best_rate(len(names), args.repeats, lambda: run_batch(client, names, args.batch_size))
+        single_rate = best_rate(len(single_names), args.repeats, lambda: run_single(client, single_names))
+        print(f"{label:<16} {categorize_rate:>13.0f} {batch_rate:>9.0f} {single_rate:>9.0f}   "
+              f"rule {sources['rule']}, model {sources['model']} ({sources['scored']})")
+    main.rule_classifier = rule_classifier
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,121 @@
+"""
+Throughput and peak memory of .csv statement ingestion.
+
+Writes HDFC-shaped CSV statements (bank/account lines, the header, then UPI rows with Indian-formatted
+amounts) of each --rows size and parses each one in a fresh interpreter:
+
+    streaming   iter_transactions(): sniffed encoding and delimiter, the C csv reader streaming into the same
+                header detection and row normalization as .xls/.xlsx
+    pandas      the pandas C engine in --chunk-size chunks of strings, rows normalized with the same function,
+                for comparison
+
+Usage (from the project root):
+    python benchmarks/bench_csv_ingestion.py --rows 100000 1000000
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+MERCHANTS = ["SWIGGY", "ZEPTO MARKETPLACE PR", "GAURAV KUMAR", "INDIAN OIL PETROL PUM", "APOLLO PHARMACY",
+             "NEW PRINCE BAKERY", "SHILA PUROHIT", "ICCL  MUTUAL FUNDS", "UBER INDIA", "BESCOM ELECTRICITY"]
+
+
+def write_statement(path: str, rows: int, delimiter: str = ",") -> None:
+    rng = random.Random(1)
+    day = datetime(2020, 1, 1)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        for line in ["HDFC BANK Ltd.", "MR. ACCOUNT HOLDER", "Account No : 50100000000000", ""]:
+            writer.writerow([line])
+        writer.writerow(["Date", "Narration", "Chq./Ref.No.", "Value Dt", "Withdrawal Amt.", "Deposit Amt.", "Closing Balance"])
+        for i in range(rows):
+            day += timedelta(minutes=rng.randint(1, 60))
+            reference = rng.randint(10 ** 11, 10 ** 12 - 1)
+            withdrawal = f"{rng.uniform(10, 5000):,.2f}" if rng.random() < 0.85 else ""
+            deposit = "" if withdrawal else f"{rng.uniform(1000, 50000):,.2f}"
+            writer.writerow([day.strftime("%d/%m/%y"), f"UPI-{rng.choice(MERCHANTS)}-Q{i}@YBL-{reference}-UPI",
+                             f"0000{reference}", day.strftime("%d/%m/%y"), withdrawal, deposit,
+                             f"{rng.uniform(0, 1e6):,.2f}"])
+        writer.writerow(["---  End Of Statement ---"])
+
+
+def parse_streaming(path: str) -> int:
+    from service.statementExtractor import iter_transactions
+    return sum(1 for _ in iter_transactions(path))
+
+
+def parse_pandas(path: str, chunk_size: int) -> int:
+    import pandas as pd
+    from service.statementExtractor import HEADER_SCAN_ROWS, _parse_row, find_layout, iter_rows
+    head = [row for row, _ in zip(iter_rows(path), range(HEADER_SCAN_ROWS))]
+    layout = find_layout(head)
+    count, dates = 0, {}
+    # Ragged preamble lines are skipped with the header, footer lines come through as short rows
+    chunks = pd.read_csv(path, skiprows=layout["header_row"] + 1, header=None, dtype=str, keep_default_na=False,
+                         chunksize=chunk_size, engine="c", on_bad_lines="skip")
+    for chunk in chunks:
+        for row in chunk.itertuples(index=False, name=None):
+            count += _parse_row(0, row, layout["field_columns"], layout["date_format"], dates) is not None
+    return count
+
+
+def measure(mode: str, path: str, chunk_size: int) -> dict:
+    """Runs inside the child interpreter."""
+    import contextlib
+    import io
+    if mode == "pandas":
+        import pandas  # noqa: F401, imported before the baseline like the streaming path's modules
+    from service import statementExtractor  # noqa: F401
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    # The extractor prints a line per skipped footer row
+    with contextlib.redirect_stdout(io.StringIO()):
+        count = parse_pandas(path, chunk_size) if mode == "pandas" else parse_streaming(path)
+    seconds = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"transactions": count, "seconds": seconds, "peak": peak / 1024, "growth": (peak - baseline) / 1024}
+
+
+def run_child(mode: str, path: str, chunk_size: int) -> dict:
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, path,
+                             "--chunk-size", str(chunk_size)], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(*args.child, args.chunk_size)))
+        return
+
+    print(f"{'rows':>8} {'file MB':>8} {'mode':<10} {'seconds':>8} {'rows/s':>8} {'peak RSS MB':>12} {'parse growth MB':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f"statement_{rows}.csv")
+            write_statement(path, rows)
+            size = os.path.getsize(path) / 1024 / 1024
+            for mode in ("streaming", "pandas"):
+                r = run_child(mode, path, args.chunk_size)
+                print(f"{rows:>8} {size:>8.1f} {mode:<10} {r['seconds']:>8.2f} {r['transactions'] / r['seconds']:>8.0f} "
+                      f"{r['peak']:>12.1f} {r['growth']:>16.1f}")
+
+
+if __name__ == "__main__":
+    main_cli()
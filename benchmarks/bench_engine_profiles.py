@@ -0,0 +1,117 @@
+"""
+Compares the SQLite engine profiles in database.py (safe / balanced / performance).
+
+For every profile a fresh database is created, then writer threads insert expenses one commit at a time
+(same shape as POST /expenses/) while reader threads run the monthly total query. Reports write
+throughput, read latency and "database is locked" errors per profile.
+
+Usage (from the project root):
+    python benchmarks/bench_engine_profiles.py --writers 4 --readers 8 --seconds 10
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import models
+from database import SQLITE_PROFILES, create_db_engine
+
+
+def run_profile(profile_name: str, writers: int, readers: int, seconds: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", profile_name)
+        models.Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        with Session() as db:
+            db.add(models.User(email="bench@example.com", hashed_password="x"))
+            db.commit()
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        stats = {"writes": 0, "locked": 0, "read_latencies": []}
+
+        def writer(seed: int):
+            rng = random.Random(seed)
+            while not stop.is_set():
+                db = Session()
+                try:
+                    db.add(models.Expense(user_id=1, date=date(2025, 1, 1) + timedelta(days=rng.randrange(365)),
+                                          category_id=rng.randint(1, 8), amount=rng.uniform(1, 500), name="bench"))
+                    db.commit()
+                    with lock:
+                        stats["writes"] += 1
+                except OperationalError:
+                    db.rollback()
+                    with lock:
+                        stats["locked"] += 1
+                finally:
+                    db.close()
+
+        def reader(seed: int):
+            rng = random.Random(seed)
+            while not stop.is_set():
+                month = rng.randint(1, 12)
+                start_date = date(2025, month, 1)
+                end_date = (start_date + timedelta(days=32)).replace(day=1)
+                db = Session()
+                try:
+                    started = time.perf_counter()
+                    db.query(models.Expense.category_id, func.sum(models.Expense.amount)).filter(
+                        models.Expense.user_id == 1, models.Expense.date >= start_date, models.Expense.date < end_date
+                    ).group_by(models.Expense.category_id).all()
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        stats["read_latencies"].append(elapsed)
+                except OperationalError:
+                    with lock:
+                        stats["locked"] += 1
+                finally:
+                    db.close()
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        threads += [threading.Thread(target=reader, args=(100 + i,)) for i in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    latencies = sorted(stats["read_latencies"]) or [0.0]
+    return {
+        "writes_per_sec": stats["writes"] / seconds,
+        "read_p50_ms": latencies[len(latencies) // 2] * 1000,
+        "read_p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "locked_errors": stats["locked"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"{'profile':<12} {'writes/s':>10} {'read p50 ms':>12} {'read p99 ms':>12} {'locked':>8}")
+    for profile_name in SQLITE_PROFILES:
+        result = run_profile(profile_name, args.writers, args.readers, args.seconds)
+        print(f"{profile_name:<12} {result['writes_per_sec']:>10.0f} {result['read_p50_ms']:>12.2f} "
+              f"{result['read_p99_ms']:>12.2f} {result['locked_errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Header detection: exact words with a rapidfuzz fallback vs the per-cell fuzzywuzzy scan it replaced.
+
+    fuzzywuzzy, all rows    the original: every first-column cell of the sheet against each date name, then
+                            every candidate row against each column name, one extractOne call at a time
+    fuzzywuzzy, first N     the same restricted to the first STATEMENT_HEADER_SCAN_ROWS rows
+    current                 find_header() on the first STATEMENT_HEADER_SCAN_ROWS rows
+
+Statements: "test statements/feb25.xlsx", a generated HDFC-shaped statement of --rows rows (see
+bench_statement_parser.py) and the same with misspelt headers, which only the fuzzy fallback finds. Only the
+header search is timed, the rows are read beforehand. The baseline needs fuzzywuzzy (pip install fuzzywuzzy
+python-Levenshtein).
+
+Usage (from the project root):
+    python benchmarks/bench_header_detection.py --rows 100000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_statement_parser import write_statement
+from service.statementExtractor import HEADER_SCAN_ROWS, find_header, iter_rows, target_fields
+
+FEB25 = os.path.join("test statements", "feb25.xlsx")
+MISSPELT = {"Date": "Dte", "Narration": "Narations", "Withdrawal Amt.": "Withdrawl Amt", "Deposit Amt.": "Deposits"}
+
+
+def legacy_find_header(rows):
+    """The header search as extract_transactions did it before, column indices resolved the same way."""
+    from fuzzywuzzy import process
+
+    def match_column(possible_names, actual_columns):
+        match, score = process.extractOne(possible_names, actual_columns)
+        return match if score > 80 else None
+
+    dateMatchRows = set()
+    for i, row in enumerate(rows):
+        cell_value = row[0] if row else None
+        if cell_value and isinstance(cell_value, str):
+            for j in target_fields['date']:
+                if match_column(j, [cell_value]):
+                    dateMatchRows.add(i)
+                    break
+
+    matchedFields, headerRowNum, best_match_count = {}, -1, 0
+    for row_idx in dateMatchRows:
+        row_values_str = [str(v) if v is not None else '' for v in rows[row_idx]]
+        current_matched_fields = {}
+        for field, options in target_fields.items():
+            for option in options:
+                match = match_column(option, row_values_str)
+                if match and match not in current_matched_fields:
+                    current_matched_fields[match] = field
+                    break
+        if len(current_matched_fields) > best_match_count:
+            best_match_count = len(current_matched_fields)
+            matchedFields = current_matched_fields
+            headerRowNum = row_idx
+        if best_match_count == len(target_fields):
+            break
+
+    if headerRowNum == -1:
+        return -1, {}
+    col_name_to_index = {str(name): i for i, name in enumerate(rows[headerRowNum])}
+    return headerRowNum, {field: col_name_to_index[name] for name, field in matchedFields.items() if name in col_name_to_index}
+
+
+def timed(find, rows, repeats: int):
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = find(rows)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def misspell(path: str, out: str) -> None:
+    import openpyxl
+    book = openpyxl.load_workbook(path)
+    for row in book.active.iter_rows(max_row=HEADER_SCAN_ROWS):
+        for cell in row:
+            if cell.value in MISSPELT:
+                cell.value = MISSPELT[cell.value]
+    book.save(out)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generated = os.path.join(tmp, "generated.xlsx")
+        write_statement(generated, args.rows)
+        misspelt = os.path.join(tmp, "misspelt.xlsx")
+        misspell(generated, misspelt)
+        statements = [("feb25.xlsx", FEB25), (f"generated {args.rows}", generated), (f"misspelt {args.rows}", misspelt)]
+
+        print(f"{'statement':<18} {'method':<22} {'ms':>10}   header row, columns")
+        for label, path in statements:
+            rows = list(iter_rows(path))
+            head = rows[:HEADER_SCAN_ROWS]
+            methods = [("fuzzywuzzy, all rows", legacy_find_header, rows, 1),
+                       (f"fuzzywuzzy, first {HEADER_SCAN_ROWS}", legacy_find_header, head, args.repeats),
+                       ("current", find_header, head, args.repeats)]
+            for method, find, searched, repeats in methods:
+                ms, (header, columns) = timed(find, searched, repeats)
+                print(f"{label:<18} {method:<22} {ms:>10.2f}   {header}, {dict(sorted(columns.items()))}")
+
+
+if __name__ == "__main__":
+    main_cli()
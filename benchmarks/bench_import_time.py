@@ -0,0 +1,69 @@
+"""
+Import time of main with the category model loaded lazily vs eagerly.
+
+Each run starts a fresh interpreter with `python -X importtime` (so nothing is cached in sys.modules) and reports
+the wall time of the process plus the cumulative import time of `main` and of `sklearn` taken from the
+importtime log:
+
+    lazy    import main, the model is loaded later by the startup hook or the first prediction
+    eager   import main, then load the model in the same process like the old module-level joblib.load()
+
+Runs against a throwaway copy of expense_tracker.db (main creates tables and backfills aggregates on import).
+
+Usage (from the project root, main.py loads categoryFinder.pkl relative to it):
+    python benchmarks/bench_import_time.py --runs 5
+"""
+
+import argparse
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPETS = {
+    "lazy": "import main",
+    "eager": "import main; main.category_service.model_loader.get(timeout=None)",
+}
+
+
+def cumulative_us(log: str, module: str) -> int:
+    """Cumulative import time of module in microseconds, from a -X importtime log."""
+    match = re.search(rf"^import time:\s+\d+ \|\s+(\d+) \|\s*{re.escape(module)}$", log, re.MULTILINE)
+    return int(match.group(1)) if match else 0
+
+
+def run_once(cwd: str, snippet: str) -> tuple:
+    env = {**os.environ, "PYTHONPATH": PROJECT_ROOT, "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark")}
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", snippet], cwd=cwd, env=env,
+                            capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - started
+    return wall, cumulative_us(result.stderr, "main") / 1e6, cumulative_us(result.stderr, "sklearn") / 1e6
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("expense_tracker.db", "categoryFinder.pkl"):
+            shutil.copy(os.path.join(PROJECT_ROOT, name), tmp)
+        shutil.copytree(os.path.join(PROJECT_ROOT, "email_templates"), os.path.join(tmp, "email_templates"))
+
+        print(f"median of {args.runs} fresh interpreters\n")
+        print(f"{'mode':<8} {'process s':>10} {'import main s':>14} {'sklearn import s':>17}")
+        for label, snippet in SNIPPETS.items():
+            runs = [run_once(tmp, snippet) for _ in range(args.runs)]
+            wall, main_s, sklearn_s = (statistics.median(column) for column in zip(*runs))
+            print(f"{label:<8} {wall:>10.2f} {main_s:>14.2f} {sklearn_s:>17.2f}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,101 @@
+"""
+Offset vs keyset (cursor) pagination for the newest-first record listing.
+
+Seeds one user with a long expense history in a throwaway database and times fetching page 1 and
+page N (default 5,000) of GET /expenses/ ordering, once with OFFSET and once with the cursor filter
+from service/pagination_service.py. Keyset latency should stay flat while OFFSET grows with the page.
+
+Usage (from the project root):
+    python benchmarks/bench_keyset_pagination.py --rows 200000 --page-size 20 --page 5000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+import models
+from service import pagination_service
+
+
+def seed(db_path: str, rows: int) -> None:
+    engine = create_engine(f"sqlite:///{db_path}")
+    models.Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    rng = random.Random(3)
+    start = datetime(2010, 1, 1)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (id, email, hashed_password) VALUES (1, 'bench@example.com', 'x')")
+
+    def record(i):
+        created = start + timedelta(minutes=i * 30 + rng.randrange(30))
+        return (created.date().isoformat(), rng.randint(1, 8), round(rng.uniform(10, 500), 2),
+                created.strftime("%Y-%m-%d %H:%M:%S.%f"))
+
+    conn.executemany("INSERT INTO expenses (user_id, date, category_id, amount, intention, name, created_at) "
+                     "VALUES (1, ?, ?, ?, 'Need', 'bench', ?)", map(record, range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def timed(db, query, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = db.execute(query).scalars().all()
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)[len(timings) // 2] * 1000, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--page", type=int, default=5_000)
+    parser.add_argument("--repeat", type=int, default=15)
+    args = parser.parse_args()
+    if args.page * args.page_size > args.rows:
+        parser.error("--rows must be at least --page * --page-size")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        seed(db_path, args.rows)
+        engine = create_engine(f"sqlite:///{db_path}")
+        db = sessionmaker(bind=engine)()
+
+        base = select(models.Expense).where(models.Expense.user_id == 1) \
+            .order_by(*pagination_service.order_by_newest(models.Expense)).limit(args.page_size)
+        skip = (args.page - 1) * args.page_size
+
+        offset_first, _ = timed(db, base.offset(0), args.repeat)
+        offset_deep, offset_rows = timed(db, base.offset(skip), args.repeat)
+
+        # Cursor of the last record on the page before the deep page
+        previous = db.execute(base.offset(skip - args.page_size)).scalars().all()[-1]
+        cursor = pagination_service.encode_cursor(previous)
+        keyset_first, _ = timed(db, base, args.repeat)
+        keyset_deep, keyset_rows = timed(
+            db, base.where(pagination_service.keyset_filter(models.Expense, cursor)), args.repeat)
+        assert [r.id for r in keyset_rows] == [r.id for r in offset_rows], "keyset page differs from offset page"
+
+        db.close()
+        engine.dispose()
+
+    print(f"{args.rows} expenses, page size {args.page_size}")
+    print(f"{'':<8} {'page 1 ms':>10} {f'page {args.page} ms':>14}")
+    print(f"{'offset':<8} {offset_first:>10.2f} {offset_deep:>14.2f}")
+    print(f"{'keyset':<8} {keyset_first:>10.2f} {keyset_deep:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
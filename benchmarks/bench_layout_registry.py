@@ -0,0 +1,89 @@
+"""
+Statement layout resolution with the layout registry vs header detection on every upload.
+
+For each statement the first STATEMENT_HEADER_SCAN_ROWS rows are read once, then timed:
+
+    detection    find_layout(): header matching (exact words, rapidfuzz fallback) and date format detection
+    registry     LayoutRegistry.resolve() once the layout is known: hash the rows at known header positions,
+                 plus the hit counter update in SQLite
+    match only   the in-process lookup without the counter update
+
+Statements: "test statements/feb25.xlsx" and a generated HDFC-shaped statement with misspelt headers (see
+bench_header_detection.py), which needs the fuzzy fallback. The registry uses a throwaway database; with
+--layouts the registry is first filled with that many other layouts.
+
+Usage (from the project root):
+    python benchmarks/bench_layout_registry.py --repeats 200 --layouts 50
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models
+from bench_header_detection import FEB25, misspell
+from bench_statement_parser import write_statement
+from service.statementExtractor import HEADER_SCAN_ROWS, find_layout, iter_rows
+from service.statement_layout_service import LayoutRegistry
+
+
+def other_layout(i: int) -> list:
+    """Head rows of a made-up bank, header at a different row with different column names."""
+    preamble = [[f"BANK {i} STATEMENT"]] + [[f"line {n}"] for n in range(i % 15)]
+    return preamble + [["Txn Date", f"Remarks {i}", "Debit", "Credit", "Balance"], ["01-02-2025", "UPI-X", "10", "", "90"]]
+
+
+def best_us(run, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best * 1e6
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--layouts", type=int, default=50, help="other layouts in the registry")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generated, misspelt = os.path.join(tmp, "generated.xlsx"), os.path.join(tmp, "misspelt.xlsx")
+        write_statement(generated, HEADER_SCAN_ROWS)
+        misspell(generated, misspelt)
+
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'layouts.db')}")
+        models.Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        registry = LayoutRegistry()
+        for i in range(args.layouts):
+            registry.resolve(db, other_layout(i))
+
+        print(f"{args.layouts + 2} layouts in the registry, best of {args.repeats}\n")
+        print(f"{'statement':<12} {'detection us':>13} {'registry us':>12} {'match only us':>14}   layout")
+        for label, path in (("feb25.xlsx", FEB25), ("misspelt", misspelt)):
+            head = [row for row, _ in zip(iter_rows(path), range(HEADER_SCAN_ROWS))]
+            first = registry.resolve(db, head)
+            detection = best_us(lambda: find_layout(head), args.repeats)
+            resolved = registry.resolve(db, head)
+            registry_us = best_us(lambda: registry.resolve(db, head), args.repeats)
+            match_us = best_us(lambda: registry.match(head), args.repeats)
+            print(f"{label:<12} {detection:>13.1f} {registry_us:>12.1f} {match_us:>14.1f}   "
+                  f"{first['source']} -> {resolved['source']}, header row {resolved['header_row']}, "
+                  f"{resolved['field_columns']}, {resolved['date_format']}")
+        print(f"\n{registry.stats(top=2)}")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,156 @@
+"""
+Dashboard latency during a login storm, bcrypt inline vs the bounded password hash pool.
+
+Runs main.app in-process through httpx's ASGI transport against a throwaway seeded database. Dashboard clients
+poll GET /expenses/daily (a sync route, so it needs a threadpool slot like the login used to) and
+GET /monthly-summary while login clients hammer either:
+
+    inline   a sync clone of the previous /auth/token that ran bcrypt on the request threadpool
+    pool     the current async /auth/token, bcrypt in auth_service's size-limited executor (503 beyond the queue limit)
+
+Dashboard authentication is overridden with a fixed user, logins go through the real password check.
+
+Usage (from the project root, main.py loads categoryFinder.pkl relative to it):
+    BCRYPT_ROUNDS=10 python benchmarks/bench_login_storm.py --login-clients 60 --seconds 10
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import httpx
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import database
+import main
+import models
+from service import auth_service
+
+PASSWORD = "correct horse battery staple"
+
+
+def login_inline(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
+    """The pre-pool /auth/token password check: bcrypt on the request thread."""
+    user = db.query(models.User).filter(models.User.email == form_data.username).first()
+    if not user or not auth_service.pwd_context.verify(form_data.password, user.hashed_password):
+        raise HTTPException(status_code=403, detail="Incorrect username or password")
+    return {"ok": True}
+
+
+def seed(SessionLocal, users: int) -> models.User:
+    rng = random.Random(1)
+    hashed_password = auth_service.pwd_context.hash(PASSWORD)
+    with SessionLocal() as db:
+        db.add_all([models.User(email=f"bench{u}@example.com", hashed_password=hashed_password) for u in range(users)])
+        db.commit()
+        user = db.query(models.User).first()
+        db.bulk_save_objects([
+            models.Expense(user_id=user.id, date=date(2025, 1, 1) + timedelta(days=rng.randrange(365)),
+                           category_id=rng.randint(1, 8), amount=rng.uniform(1, 500), name="bench")
+            for _ in range(5_000)
+        ])
+        db.commit()
+        db.refresh(user)
+        db.expunge(user)
+        return user
+
+
+async def dashboard_client(client: httpx.AsyncClient, stop: asyncio.Event, latencies: list) -> None:
+    rng = random.Random()
+    while not stop.is_set():
+        path = rng.choice(["/expenses/daily", "/monthly-summary"])
+        started = time.perf_counter()
+        response = await client.get(path, params={"month": rng.randint(1, 12), "year": 2025})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.01)
+
+
+async def login_client(client: httpx.AsyncClient, path: str, users: int, stop: asyncio.Event, outcomes: dict) -> None:
+    rng = random.Random()
+    while not stop.is_set():
+        response = await client.post(path, data={"username": f"bench{rng.randrange(users)}@example.com", "password": PASSWORD})
+        outcomes[response.status_code] = outcomes.get(response.status_code, 0) + 1
+        if response.status_code == 503:
+            # Back off like a well-behaved client, hammering retries would just load the shared event loop
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+
+
+async def phase(client: httpx.AsyncClient, login_path: str | None, args) -> tuple:
+    stop = asyncio.Event()
+    latencies, outcomes = [], {}
+    tasks = [asyncio.create_task(dashboard_client(client, stop, latencies)) for _ in range(args.dashboard_clients)]
+    if login_path:
+        tasks += [asyncio.create_task(login_client(client, login_path, args.users, stop, outcomes))
+                  for _ in range(args.login_clients)]
+    await asyncio.sleep(args.seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000, outcomes
+
+
+async def run(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        sync_engine = database.create_db_engine(f"sqlite:///{db_path}")
+        async_engine = database.create_async_db_engine(f"sqlite+aiosqlite:///{db_path}")
+        models.Base.metadata.create_all(bind=sync_engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+        AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+        user = seed(SessionLocal, args.users)
+
+        def override_get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        async def override_get_async_db():
+            async with AsyncSessionLocal() as db:
+                yield db
+
+        main.app.dependency_overrides[database.get_db] = override_get_db
+        main.app.dependency_overrides[database.get_async_db] = override_get_async_db
+        main.app.dependency_overrides[auth_service.get_current_user] = lambda: user
+        main.app.dependency_overrides[auth_service.get_current_user_async] = lambda: user
+        main.app.add_api_route("/bench/token-inline", login_inline, methods=["POST"])
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            print(f"bcrypt rounds {auth_service.BCRYPT_ROUNDS}, hash pool: {auth_service.PASSWORD_HASH_WORKERS} "
+                  f"{auth_service.PASSWORD_HASH_EXECUTOR} workers, {auth_service.PASSWORD_HASH_MAX_PENDING} max pending")
+            print(f"{args.dashboard_clients} dashboard clients, {args.login_clients} login clients, {args.seconds}s per phase\n")
+            print(f"{'phase':<22} {'dash p50 ms':>12} {'dash p99 ms':>12}   logins by status")
+            for label, login_path in (("no logins", None), ("storm, bcrypt inline", "/bench/token-inline"),
+                                      ("storm, hash pool", "/auth/token")):
+                p50, p99, outcomes = await phase(client, login_path, args)
+                print(f"{label:<22} {p50:>12.1f} {p99:>12.1f}   {outcomes or '-'}")
+
+        await async_engine.dispose()
+        sync_engine.dispose()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dashboard-clients", type=int, default=10)
+    parser.add_argument("--login-clients", type=int, default=60)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
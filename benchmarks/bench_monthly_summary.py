@@ -0,0 +1,162 @@
+"""
+Query count and latency of the /monthly-summary data access, old and new.
+
+Seeds a throwaway SQLite database with synthetic expenses, incomes and savings, builds the monthly_aggregates
+table, and times one month's category totals for random users in four ways:
+
+    six queries        the original implementation, one total and one breakdown query per record kind
+    3 x aggregates     one get_category_totals call per record kind
+    1 x aggregates     aggregate_service.get_monthly_breakdown, what the endpoint uses now
+    1 x UNION ALL      monthly_breakdown_from_records, the raw tables without the aggregate table
+
+Every variant is checked to issue the expected number of statements and to return the same totals. The repo
+has no test suite, so --check is the guard for get_monthly_breakdown staying a single statement: a small
+seed, the same assertions, no timings, exit status 1 on failure.
+
+Usage (from the project root):
+    python benchmarks/bench_monthly_summary.py --rows 1000000 --users 1000
+    python benchmarks/bench_monthly_summary.py --check
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, func, literal, select, union_all
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+import database
+import models
+from service import aggregate_service
+from bench_record_indexes import seed
+from migrations.add_record_indexes import run_migration
+
+
+async def six_queries(db, user_id: int, year: int, month: int) -> dict:
+    """The pre-aggregate /monthly-summary: a total and a category breakdown per record kind."""
+    start_date = date(year, month, 1)
+    end_date = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    breakdown = {}
+    for kind, model in aggregate_service.RECORD_KINDS.items():
+        in_month = (model.user_id == user_id, model.date >= start_date, model.date < end_date)
+        await db.scalar(select(func.sum(model.amount)).where(*in_month))
+        result = await db.execute(select(model.category_id, func.sum(model.amount)).where(*in_month).group_by(model.category_id))
+        breakdown[kind] = result.all()
+    return breakdown
+
+
+async def three_aggregate_queries(db, user_id: int, year: int, month: int) -> dict:
+    return {kind: await aggregate_service.get_category_totals(db, kind, user_id, year, month)
+            for kind in aggregate_service.RECORD_KINDS}
+
+
+async def one_aggregate_query(db, user_id: int, year: int, month: int) -> dict:
+    _, breakdown = await aggregate_service.get_monthly_breakdown(db, user_id, year, month)
+    return breakdown
+
+
+async def monthly_breakdown_from_records(db, user_id: int, year: int, month: int) -> dict:
+    """The breakdown from the raw tables with one UNION ALL statement.
+
+    Each branch is a range scan on the (user_id, date, category_id, amount) covering index, so this needs
+    neither the aggregate table nor one round trip per record kind.
+    """
+    start_date = date(year, month, 1)
+    end_date = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    branches = [
+        select(literal(kind).label("kind"), model.category_id, func.sum(model.amount).label("total"))
+        .where(model.user_id == user_id, model.date >= start_date, model.date < end_date)
+        .group_by(model.category_id)
+        for kind, model in aggregate_service.RECORD_KINDS.items()
+    ]
+    result = await db.execute(union_all(*branches))
+    breakdown = {kind: [] for kind in aggregate_service.RECORD_KINDS}
+    for kind, category_id, total in result.all():
+        breakdown[kind].append((category_id, total))
+    return breakdown
+
+
+VARIANTS = [
+    ("six queries", six_queries, 6),
+    ("3 x aggregates", three_aggregate_queries, 3),
+    ("1 x aggregates", one_aggregate_query, 1),
+    ("1 x UNION ALL", monthly_breakdown_from_records, 1),
+]
+
+
+def normalized(breakdown: dict) -> dict:
+    return {kind: sorted((category_id, round(total, 2)) for category_id, total in rows)
+            for kind, rows in breakdown.items()}
+
+
+async def run(db_path: str, users: int, samples: int, check: bool = False) -> None:
+    async_engine = database.create_async_db_engine(f"sqlite+aiosqlite:///{db_path}")
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    statements = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    rng = random.Random(3)
+    months = [(rng.randint(1, users), rng.randint(2020, 2024), rng.randint(1, 12)) for _ in range(samples)]
+    timings = {label: [] for label, _, _ in VARIANTS}
+    async with AsyncSessionLocal() as db:
+        for user_id, year, month in months:
+            expected = None
+            for label, variant, expected_statements in VARIANTS:
+                statements.clear()
+                started = time.perf_counter()
+                breakdown = await variant(db, user_id, year, month)
+                timings[label].append(time.perf_counter() - started)
+                assert len(statements) == expected_statements, f"{label}: {len(statements)} statements"
+                if expected is None:
+                    expected = normalized(breakdown)
+                assert normalized(breakdown) == expected, f"{label} returned different totals"
+            # The call /monthly-summary makes, with "Saving Goal Redeemed" left out in SQL
+            statements.clear()
+            await aggregate_service.get_monthly_breakdown(db, user_id, year, month, exclude_categories={"saving": [8]})
+            assert len(statements) == 1, f"/monthly-summary breakdown: {len(statements)} statements"
+    await async_engine.dispose()
+
+    if check:
+        print(f"OK: {len(months)} user months, statement counts and totals as expected")
+        return
+
+    print(f"{'variant':<16} {'statements':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, _, expected_statements in VARIANTS:
+        samples_ms = sorted(t * 1000 for t in timings[label])
+        print(f"{label:<16} {expected_statements:>10} {samples_ms[len(samples_ms) // 2]:>8.2f} "
+              f"{samples_ms[int(len(samples_ms) * 0.99)]:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="number of synthetic expense rows")
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--samples", type=int, default=200, help="user months to time per variant")
+    parser.add_argument("--check", action="store_true", help="only assert statement counts and totals on a small seed")
+    args = parser.parse_args()
+    if args.check:
+        args.rows, args.users, args.samples = 5_000, 20, 50
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        seed(db_path, args.rows, args.users)
+        run_migration(f"sqlite:///{db_path}")
+        engine = database.create_db_engine(f"sqlite:///{db_path}")
+        models.MonthlyAggregate.__table__.create(bind=engine)
+        with sessionmaker(bind=engine)() as db:
+            aggregate_service.rebuild_monthly_aggregates(db)
+        engine.dispose()
+        print(f"Seeded {args.rows} expenses (+{args.rows // 5} incomes/savings) for {args.users} users\n")
+        asyncio.run(run(db_path, args.users, args.samples, args.check))
+
+
+if __name__ == "__main__":
+    main()
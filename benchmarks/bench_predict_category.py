@@ -0,0 +1,86 @@
+"""
+Rows per second of POST /predict-category/batch against one POST /predict-category call per name.
+
+Runs main.app in-process through FastAPI's TestClient with a synthetic statement of UPI-style descriptions
+(a few merchants, a fresh reference number on every row) and checks that the top-1 category of the batch
+endpoint matches the single-item prediction for every name. Both endpoints sit behind the normalized-merchant
+prediction cache: each phase starts from an empty cache, the last one replays the batches against a warm cache.
+
+Usage (from the project root, main.py loads categoryFinder.pkl relative to it):
+    python benchmarks/bench_predict_category.py --rows 2000 --batch-size 500
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from fastapi.testclient import TestClient
+
+import main
+from service import category_service
+
+MERCHANTS = [
+    "Swiggy order", "Zomato", "Uber trip", "Ola cabs", "Amazon purchase", "Netflix subscription", "Electricity bill",
+    "House rent", "Apollo pharmacy", "Petrol pump", "Gym membership", "Movie tickets", "Home loan EMI",
+    "Grocery store", "Mobile recharge", "Doctor consultation", "Metro card", "Starbucks coffee", "Water bill",
+    "Mutual fund SIP",
+]
+
+
+def statement(rows: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [f"UPI-{rng.choice(MERCHANTS).upper()}-PAY{rng.randint(1, 99)}@OKAXIS-UTIB0000{rng.randint(100, 999)}-"
+            f"{rng.randint(10 ** 11, 10 ** 12 - 1)}-UPI" for _ in range(rows)]
+
+
+def run_batches(client: TestClient, names: list, args) -> tuple:
+    started = time.perf_counter()
+    batched = []
+    for offset in range(0, len(names), args.batch_size):
+        response = client.post("/predict-category/batch",
+                               json={"names": names[offset:offset + args.batch_size], "top_k": args.top_k})
+        response.raise_for_status()
+        batched += [prediction["category"] for prediction in response.json()["predictions"]]
+    return batched, time.perf_counter() - started
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    names = statement(args.rows, seed=1)
+    client = TestClient(main.app)
+
+    cache = category_service.prediction_cache
+    cache.clear()
+    started = time.perf_counter()
+    single = []
+    for name in names:
+        response = client.post("/predict-category", json={"name": name})
+        response.raise_for_status()
+        single.append(response.json()["category"])
+    single_seconds = time.perf_counter() - started
+
+    cache.clear()
+    batched, batch_seconds = run_batches(client, names, args)
+    _, warm_seconds = run_batches(client, names, args)
+
+    mismatches = sum(a != b for a, b in zip(single, batched))
+    print(f"{args.rows} names, batches of {args.batch_size}, top_k {args.top_k}")
+    print(f"{'single-item endpoint':<24} {args.rows / single_seconds:>10.0f} rows/s")
+    print(f"{'batch endpoint':<24} {args.rows / batch_seconds:>10.0f} rows/s   ({single_seconds / batch_seconds:.1f}x)")
+    print(f"{'batch, warm cache':<24} {args.rows / warm_seconds:>10.0f} rows/s   ({single_seconds / warm_seconds:.1f}x)")
+    print(f"top-1 mismatches vs single-item: {mismatches}")
+    print(f"prediction cache: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,122 @@
+"""
+Before/after benchmark for migrations/add_record_indexes.py.
+
+Generates a throwaway SQLite database with a few million synthetic expense, income and saving rows,
+times the dashboard queries used by main.py and service/chart_service.py, applies the index
+migration and times the same queries again.
+
+Usage (from the project root):
+    python benchmarks/bench_record_indexes.py --rows 2000000 --users 2000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+import models
+from migrations.add_record_indexes import run_migration
+
+
+def seed(db_path: str, rows: int, users: int) -> None:
+    """Bulk insert synthetic rows with sqlite3 directly, seeding through the ORM would take hours."""
+    engine = create_engine(f"sqlite:///{db_path}")
+    # Create the tables without the composite indexes to mimic an existing database
+    for model in (models.Expense, models.Income, models.Saving):
+        model.__table__.create(bind=engine)
+        for index in model.__table__.indexes:
+            if len(index.columns) > 1:
+                index.drop(bind=engine)
+    models.User.__table__.create(bind=engine)
+    engine.dispose()
+
+    rng = random.Random(42)
+    start = date(2020, 1, 1)
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO users (id, email, hashed_password) VALUES (?, ?, 'x')",
+                     ((u, f"user{u}@example.com") for u in range(1, users + 1)))
+
+    def record(_):
+        day = start + timedelta(days=rng.randrange(5 * 365))
+        return (rng.randint(1, users), day.isoformat(), rng.randint(1, 8),
+                round(rng.uniform(10, 5000), 2), "bench", datetime.now().isoformat(sep=" "))
+
+    conn.executemany("INSERT INTO expenses (user_id, date, category_id, amount, name, created_at, intention) "
+                     "VALUES (?, ?, ?, ?, ?, ?, 'Need')", map(record, range(rows)))
+    for table in ("incomes", "savings"):
+        conn.executemany(f"INSERT INTO {table} (user_id, date, category_id, amount, name, created_at) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", map(record, range(rows // 10)))
+    conn.commit()
+    conn.close()
+
+
+def dashboard_queries(db, user_id: int, start_date: date, end_date: date) -> None:
+    """The per-user month queries a dashboard load issues."""
+    for model in (models.Expense, models.Income, models.Saving):
+        db.query(model).filter(model.user_id == user_id, model.date >= start_date, model.date < end_date) \
+            .order_by(model.date.desc(), model.created_at.desc()).limit(100).all()
+        db.query(func.sum(model.amount)).filter(
+            model.user_id == user_id, model.date >= start_date, model.date < end_date).scalar()
+        db.query(model.category_id, func.sum(model.amount)).filter(
+            model.user_id == user_id, model.date >= start_date, model.date < end_date) \
+            .group_by(model.category_id).all()
+    db.query(models.Expense.date, func.sum(models.Expense.amount)).filter(
+        models.Expense.user_id == user_id, models.Expense.date >= start_date, models.Expense.date < end_date) \
+        .group_by(models.Expense.date).all()
+
+
+def time_dashboards(db_path: str, users: int, samples: int) -> float:
+    engine = create_engine(f"sqlite:///{db_path}")
+    Session = sessionmaker(bind=engine)
+    rng = random.Random(7)
+    db = Session()
+    timings = []
+    try:
+        for _ in range(samples):
+            month_start = date(rng.randint(2020, 2024), rng.randint(1, 12), 1)
+            month_end = (month_start + timedelta(days=32)).replace(day=1)
+            started = time.perf_counter()
+            dashboard_queries(db, rng.randint(1, users), month_start, month_end)
+            timings.append(time.perf_counter() - started)
+    finally:
+        db.close()
+        engine.dispose()
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000, help="number of synthetic expense rows")
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--samples", type=int, default=20, help="dashboard loads to time per phase")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        started = time.perf_counter()
+        seed(db_path, args.rows, args.users)
+        print(f"Seeded {args.rows} expenses (+{args.rows // 5} incomes/savings) in {time.perf_counter() - started:.1f}s")
+
+        before = time_dashboards(db_path, args.users, args.samples)
+        started = time.perf_counter()
+        run_migration(f"sqlite:///{db_path}")
+        migration_time = time.perf_counter() - started
+        after = time_dashboards(db_path, args.users, args.samples)
+
+    print(f"\nmigration time:             {migration_time:.1f}s")
+    print(f"dashboard p50 before index: {before:.1f} ms")
+    print(f"dashboard p50 after index:  {after:.1f} ms ({before / after:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Peak memory and throughput of the statement extractor: streaming (read-only openpyxl, one transaction at a
+time) vs loading the whole workbook into a list of lists first, as it did before.
+
+Generates HDFC-shaped .xlsx statements (a block of bank/account details, the header, then UPI rows) of each
+--rows size and parses each one in a fresh interpreter per mode, so peak RSS (ru_maxrss) belongs to that parse
+alone. With streaming the peak should stay flat as the statement grows; what little is left grows with the
+xlsx shared strings table (every distinct narration), which openpyxl loads before the first row.
+
+Usage (from the project root):
+    python benchmarks/bench_statement_parser.py --rows 10000 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+MERCHANTS = ["SWIGGY", "ZEPTO MARKETPLACE PR", "GAURAV KUMAR", "INDIAN OIL PETROL PUM", "APOLLO PHARMACY",
+             "NEW PRINCE BAKERY", "SHILA PUROHIT", "ICCL  MUTUAL FUNDS", "UBER INDIA", "BESCOM ELECTRICITY"]
+
+
+def write_statement(path: str, rows: int) -> None:
+    import openpyxl
+    book = openpyxl.Workbook(write_only=True)
+    sheet = book.create_sheet()
+    for line in ["HDFC BANK Ltd.", "MR. ACCOUNT HOLDER", "Account No : 50100000000000", "Branch : BENGALURU",
+                 "Statement From : 01/01/2020 To : 31/12/2029", ""]:
+        sheet.append([line])
+    sheet.append(["Date", "Narration", "Chq./Ref.No.", "Value Dt", "Withdrawal Amt.", "Deposit Amt.", "Closing Balance"])
+    rng = random.Random(1)
+    day = datetime(2020, 1, 1)
+    balance = 1_000_000.0
+    for i in range(rows):
+        day += timedelta(minutes=rng.randint(10, 600))
+        withdrawal = round(rng.uniform(10, 5000), 2) if rng.random() < 0.85 else None
+        deposit = None if withdrawal else round(rng.uniform(1000, 50000), 2)
+        balance += (deposit or 0) - (withdrawal or 0)
+        reference = f"{rng.randint(10 ** 11, 10 ** 12 - 1)}"
+        sheet.append([day.strftime("%d/%m/%y"), f"UPI-{rng.choice(MERCHANTS)}-Q{i}@YBL-YESB0YBLUPI-{reference}-UPI",
+                      f"0000{reference}", day.strftime("%d/%m/%y"), withdrawal, deposit, round(balance, 2)])
+    sheet.append(["---  End Of Statement ---"])
+    book.save(path)
+
+
+def parse_full(path: str) -> int:
+    """The previous extractor: every cell of the workbook in memory before looking for the header."""
+    import openpyxl
+    from service.statementExtractor import _parse_row, find_header
+    book = openpyxl.load_workbook(path, data_only=True)
+    data = [[cell.value for cell in row] for row in book.active.iter_rows()]
+    header, columns = find_header(data)
+    return sum(_parse_row(i, data[i], columns) is not None for i in range(header + 1, len(data)))
+
+
+def parse_streaming(path: str) -> int:
+    from service.statementExtractor import iter_transactions
+    return sum(1 for _ in iter_transactions(path))
+
+
+def measure(mode: str, path: str) -> dict:
+    """Runs inside the child interpreter."""
+    import contextlib
+    import io
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    # The extractor prints a line per skipped footer row
+    with contextlib.redirect_stdout(io.StringIO()):
+        count = (parse_full if mode == "full" else parse_streaming)(path)
+    seconds = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"transactions": count, "seconds": seconds, "peak": peak / 1024, "growth": (peak - baseline) / 1024}
+
+
+def run_child(mode: str, path: str) -> dict:
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, path],
+                            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(*args.child)))
+        return
+
+    print(f"{'rows':>8} {'file MB':>8} {'mode':<10} {'rows/s':>8} {'peak RSS MB':>12} {'parse growth MB':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f"statement_{rows}.xlsx")
+            write_statement(path, rows)
+            size = os.path.getsize(path) / 1024 / 1024
+            for mode in ("full", "streaming"):
+                r = run_child(mode, path)
+                print(f"{rows:>8} {size:>8.1f} {mode:<10} {r['transactions'] / r['seconds']:>8.0f} "
+                      f"{r['peak']:>12.1f} {r['growth']:>16.1f}")
+
+
+if __name__ == "__main__":
+    main_cli()
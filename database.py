@@ -1,14 +1,118 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./expense_tracker.db"
+# Same database file through the aiosqlite driver, used by the async read endpoints
+ASYNC_SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+# SQLite tuning profiles, selected with the SQLITE_PROFILE env variable.
+# "safe" keeps SQLite's own defaults (rollback journal, fsync on every commit).
+# "balanced" switches to WAL so readers don't block the writer and commits only fsync at checkpoints;
+# synchronous=NORMAL is durable against app crashes, only a power loss can drop the last commits.
+# "performance" additionally memory-maps the file and uses a bigger page cache for read-heavy servers.
+SQLITE_PROFILES = {
+    "safe": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+    },
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "temp_store": "MEMORY",
+        "cache_size": -16000,  # negative = KiB, ~16MB
+        "busy_timeout": 5000,
+    },
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "temp_store": "MEMORY",
+        "cache_size": -64000,  # ~64MB
+        "mmap_size": 268435456,  # 256MB
+        "busy_timeout": 10000,
+    },
+}
+
+DEFAULT_SQLITE_PROFILE = "balanced"
+
+# Explicit pool settings; every uvicorn worker gets its own pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+
+def get_sqlite_profile(profile_name: str | None = None) -> dict:
+    """Return the PRAGMA settings for a profile, falling back to SQLITE_PROFILE / the default profile."""
+    profile_name = profile_name or os.getenv("SQLITE_PROFILE", DEFAULT_SQLITE_PROFILE)
+    if profile_name not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE '{profile_name}'. Choose one of {', '.join(SQLITE_PROFILES)}")
+    return SQLITE_PROFILES[profile_name]
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: dict) -> None:
+    """Run the profile PRAGMAs on a fresh DBAPI connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in pragmas.items():
+            # PRAGMA doesn't accept bound parameters, values come from SQLITE_PROFILES only
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+    finally:
+        cursor.close()
+
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def create_db_engine(database_url: str = SQLALCHEMY_DATABASE_URL, profile_name: str | None = None):
+    """Create the SQLite engine with the selected tuning profile applied to every new connection."""
+    pragmas = get_sqlite_profile(profile_name)
+    db_engine = create_engine(
+        database_url,
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+
+    @event.listens_for(db_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+    return db_engine
+
+
+def create_async_db_engine(database_url: str = ASYNC_SQLALCHEMY_DATABASE_URL, profile_name: str | None = None):
+    """Create the aiosqlite AsyncEngine with the same tuning profile as the sync engine."""
+    pragmas = get_sqlite_profile(profile_name)
+    # aiosqlite defaults to NullPool for file databases, which would reopen the file
+    # and rerun the PRAGMAs on every request
+    db_engine = create_async_engine(
+        database_url,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+
+    @event.listens_for(db_engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+    return db_engine
+
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_db_engine()
+# expire_on_commit=False: expired attributes would need an implicit (sync) reload after commit
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 # Dependency
@@ -17,4 +121,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+# Async dependency for async def routes
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -59,6 +59,7 @@ const AddRecordDialog: React.FC<AddRecordDialogProps> = ({
     const [name, setName] = useState('');
     const [date, setDate] = useState<Date | null>(null);
     const [categoryId, setCategoryId] = useState<number>(1);
+    const [suggestedCategory, setSuggestedCategory] = useState<string | undefined>(undefined);
     const [amount, setAmount] = useState('');
     const [isRecurring, setIsRecurring] = useState(false);
     const [showDateWarning, setShowDateWarning] = useState(false);
@@ -77,6 +78,7 @@ const AddRecordDialog: React.FC<AddRecordDialogProps> = ({
             if (name.trim() && recordType === 'Expense') {
                 try {
                     const data = await api.predictCategory(name);
+                    setSuggestedCategory(data.category || undefined);
                     if (data.category) {
                         const categoryId = Object.entries(EXPENSE_CATEGORIES).find(
                             ([_, catName]) => catName === data.category
@@ -86,6 +88,7 @@ const AddRecordDialog: React.FC<AddRecordDialogProps> = ({
                         }
                     }
                 } catch (error) {
+                    setSuggestedCategory(undefined);
                     console.error('Error predicting category:', error);
                 }
             }
@@ -129,6 +132,7 @@ const AddRecordDialog: React.FC<AddRecordDialogProps> = ({
         setName('');
         setDate(new Date()); // Use current date in user's timezone
         setCategoryId(1);
+        setSuggestedCategory(undefined);
         setAmount('');
         setIsRecurring(false);
     };
@@ -168,7 +172,7 @@ const AddRecordDialog: React.FC<AddRecordDialogProps> = ({
                 if (isRecurring) {
                     onConverttoSubscription(expenseData);
                 } else {
-                    await onAddExpense(expenseData);
+                    await onAddExpense({ ...expenseData, suggested_category: suggestedCategory });
                 }
             } else if (recordType === 'Income') {
                 await onAddIncome(baseRecordData);
@@ -471,7 +471,7 @@ const Dashboard: React.FC = () => {
                                             Export Data
                                         </Button>
                                     </Tooltip>
-                                    <Tooltip title="Extract data from any bank statement in .xls or .xlsx">
+                                    <Tooltip title="Extract data from any bank statement in .xls, .xlsx, .csv or .tsv">
                                         <Button
                                             variant="contained"
                                             onClick={() => fileInputRef.current?.click()}
@@ -525,7 +525,7 @@ const Dashboard: React.FC = () => {
                                     ref={fileInputRef}
                                     onChange={handleFileChange}
                                     style={{ display: 'none' }}
-                                    accept=".xls,.xlsx"
+                                    accept=".xls,.xlsx,.csv,.tsv"
                                 />
                             </Paper>
                         </Box>
@@ -8,6 +8,7 @@ export interface Expense {
     amount: number;
     intention: IntentionType;
     name: string;
+    suggested_category?: string; // Category offered by /predict-category, sent back on create so corrections are learnt
 }
 
 export interface CategoryTotal {
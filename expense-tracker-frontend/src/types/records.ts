@@ -15,6 +15,7 @@ interface BaseRecord {
 // Expense interface (existing)
 export interface Expense extends BaseRecord {
     intention: IntentionType;
+    suggested_category?: string; // Category offered by /predict-category, sent back on create so corrections are learnt
 }
 
 // Income interface
@@ -1,28 +1,32 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, BackgroundTasks, Response, Request
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, BackgroundTasks, Response, Request, Query
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import func
-from typing import List, Union, Dict
+from sqlalchemy import func, select, insert
+from typing import List, Union, Dict, Any
 from datetime import date, timedelta, datetime
 from dateutil.relativedelta import relativedelta
-from database import get_db, engine
+from database import get_db, get_async_db, engine, SessionLocal
 import models
-from pydantic import BaseModel, field_validator, EmailStr
-from fastapi.responses import FileResponse, HTMLResponse
+from pydantic import BaseModel, field_validator, EmailStr, ValidationError
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.formparsers import MultiPartParser
 from openpyxl import Workbook
 import tempfile
 import os
-import shutil
 from enum import Enum
-import joblib
-from service.statementExtractor import extract_transactions
+import numpy as np
+from service.statementExtractor import read_statement
+from service.category_rules import rule_classifier
 from dotenv import load_dotenv
 import os
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 import atexit
 from service.mail_service import _send_monthly_report_logic, send_email, scheduled_report_job, send_password_reset_email
-from service import auth_service
+from service import auth_service, aggregate_service, analytics_service, category_service, goal_service, ledger_service, maintenance_service, pagination_service, statement_layout_service
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi import status
 import jinja2
@@ -33,12 +37,15 @@ load_dotenv()
 template_loader = jinja2.FileSystemLoader(searchpath="./email_templates")
 template_env = jinja2.Environment(loader=template_loader)
 
-# Load the ML model
-model = joblib.load('categoryFinder.pkl')
-
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
 
+# Backfill monthly aggregates, the account balance snapshot and goal allocations on the first start after upgrading
+with SessionLocal() as startup_db:
+    ledger_service.ensure_account_snapshot(startup_db)
+    goal_service.ensure_goal_allocations(startup_db)
+    aggregate_service.ensure_monthly_aggregates(startup_db)
+
 app = FastAPI(openapi_tags=[
     {"name": "Authentication", "description": "Operations related to user registration and login"},
     {"name": "Expenses", "description": "Manage user expenses"},
@@ -70,9 +77,63 @@ app.openapi_extra = {
 
 scheduler = BackgroundScheduler(daemon=True)
 scheduler.add_job(scheduled_report_job, CronTrigger(day=1, hour=6, minute=0))
+scheduler.add_job(maintenance_service.scheduled_token_purge_job,
+                  IntervalTrigger(minutes=maintenance_service.TOKEN_PURGE_INTERVAL_MINUTES),
+                  max_instances=1, coalesce=True)
 scheduler.start()
 atexit.register(lambda: scheduler.shutdown())
 
+@app.on_event("startup")
+def warm_category_model():
+    # Load the ML model in the background, the first predictions wait for it (or get a 503 if it takes too long)
+    category_service.model_loader.start()
+
+@app.on_event("shutdown")
+def flush_statement_layout_hits():
+    # Layout hit counts are written in batches, keep the last ones
+    with SessionLocal() as db:
+        statement_layout_service.layout_registry.flush(db)
+
+# Largest statement /upload/ accepts
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+# Uploaded files up to this size stay in memory, bigger ones spill to a temporary file (Starlette's default is 1 MB)
+MultiPartParser.max_file_size = int(os.getenv("UPLOAD_SPOOL_MAX_BYTES", str(2 * 1024 * 1024)))
+
+class UploadSizeLimitMiddleware:
+    """Answers 413 to request bodies over max_bytes on path, from Content-Length when the client sends it, else
+    as soon as the received chunks pass the limit, before the rest is read and spooled."""
+
+    def __init__(self, app, path: str, max_bytes: int):
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+        detail = f"File too large, at most {self.max_bytes} bytes"
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside the form parsing of the route, FastAPI turns it into the response
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(UploadSizeLimitMiddleware, path="/upload/", max_bytes=MAX_UPLOAD_BYTES)
+
 origins = [
     "http://localhost:5173",
     "http://localhost:4173",
@@ -80,12 +141,14 @@ origins = [
     os.getenv("FRONTEND_URL")
 ]
 
+# Added last so it is the outermost middleware, the upload limit's early 413 gets the CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,  # Allow cookies and authorization headers
     allow_methods=["*"],  # Allow all HTTP methods (GET, POST, PUT, etc.)
-    allow_headers=["*"]  # Allow all headers
+    allow_headers=["*"],  # Allow all headers
+    expose_headers=[pagination_service.NEXT_CURSOR_HEADER]  # Let the frontend read the next page cursor
 )
 
 # Pydantic models for Users and Auth
@@ -182,7 +245,9 @@ class ExpenseBase(BaseModel):
         orm_mode = True
 
 class ExpenseCreate(ExpenseBase):
-    pass
+    # The category the client was offered for name (/predict-category or /upload/), not stored. Lets the
+    # save learn the user's correction without predicting again
+    suggested_category: str | None = None
 
 class Expense(ExpenseBase):
     id: int
@@ -272,6 +337,23 @@ class Budget(BudgetBase):
 class CategoryPredictionRequest(BaseModel):
     name: str
 
+class CategoryBatchPredictionRequest(BaseModel):
+    names: List[str]
+    top_k: int = 3
+
+class CategoryScore(BaseModel):
+    category: str
+    confidence: float
+
+class CategoryPrediction(BaseModel):
+    name: str
+    category: str
+    source: str  # 'user' (the user's own correction for this merchant) or 'model'
+    top_k: List[CategoryScore]
+
+class CategoryBatchPredictionResponse(BaseModel):
+    predictions: List[CategoryPrediction]
+
 # Pydantic models for Income
 class IncomeBase(BaseModel):
     name: str | None = None
@@ -363,14 +445,128 @@ class AccountBalance(BaseModel):
     apparent_balance: float
     real_balance: float
 
+# Pydantic models for bulk create
+class BulkRowError(BaseModel):
+    index: int
+    detail: str
+
+class BulkCreateResponse(BaseModel):
+    created_ids: List[int]
+    errors: List[BulkRowError]
+
+# Largest batch accepted by the bulk create endpoints, a full year statement fits comfortably
+MAX_BULK_ROWS = 5000
+
+def _bulk_create(db: Session, user_id: int, kind: str, model, schema, categories: dict, rows: List[Dict[str, Any]]) -> BulkCreateResponse:
+    """Validate rows one by one and insert the valid ones in a single transaction.
+
+    Invalid rows are reported by their position in the request and skipped, they don't abort the batch.
+    """
+    if len(rows) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=400, detail=f"Too many rows, at most {MAX_BULK_ROWS} per request")
+
+    valid_rows, suggested, errors = [], [], []
+    for index, row in enumerate(rows):
+        try:
+            record = schema(**row)
+        except ValidationError as e:
+            detail = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+            errors.append(BulkRowError(index=index, detail=detail))
+            continue
+        if record.category_id not in categories:
+            errors.append(BulkRowError(index=index, detail=f"Invalid category ID. Must be between 1 and {len(categories)}"))
+            continue
+        valid_rows.append(record.dict(exclude={"suggested_category"}))
+        suggested.append(getattr(record, "suggested_category", None))
+
+    if not valid_rows:
+        return BulkCreateResponse(created_ids=[], errors=errors)
+
+    # One created_at for the whole batch so the ledger can treat it as a single write
+    created_at = datetime.now()
+    for row in valid_rows:
+        row.update(user_id=user_id, created_at=created_at)
+    # executemany insert, RETURNING keeps the ids in request order
+    created_ids = list(db.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), valid_rows))
+    aggregate_service.records_added(db, kind, user_id, valid_rows)
+    ledger_service.records_added(db, kind, user_id, valid_rows, created_at)
+    if kind == "expense":
+        category_service.learn_from_expenses(
+            db, user_id, [{**row, "suggested_category": category} for row, category in zip(valid_rows, suggested)],
+            categories)
+    db.commit()
+    return BulkCreateResponse(created_ids=created_ids, errors=errors)
+
+def _known_categories(db: Session, current_user: models.User | None, names: List[str]) -> List[tuple | None]:
+    """(category, source) per name where no model is needed: the user's own correction for the merchant
+    ('user'), else a merchant rule ('rule'); None for the names left to the category model."""
+    overrides = (category_service.get_overrides(db, current_user.id, names) if current_user is not None
+                 else [None] * len(names))
+    known = []
+    for name, override in zip(names, overrides):
+        if override in CATEGORIES:
+            known.append((CATEGORIES[override], "user"))
+            continue
+        rule_category = rule_classifier.match(name)
+        known.append((rule_category, "rule") if rule_category else None)
+    return known
+
 @app.post("/predict-category")
-def predict_category(request: CategoryPredictionRequest):
+def predict_category(request: CategoryPredictionRequest, db: Session = Depends(get_db), current_user: models.User | None = Depends(auth_service.get_optional_current_user)):
+    known = _known_categories(db, current_user, [request.name])[0]
+    if known is not None:
+        return {"category": known[0], "source": known[1]}
+    model = category_service.model_loader.get()
     try:
-        predicted_category = model.predict([request.name])[0]
-        return {"category": predicted_category}
+        predicted_category = category_service.prediction_cache.predict(model, [request.name])[0]
+        return {"category": predicted_category, "source": "model"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Largest batch accepted by /predict-category/batch, same bound as the bulk create endpoints
+MAX_PREDICTION_BATCH = MAX_BULK_ROWS
+
+@app.post("/predict-category/batch", response_model=CategoryBatchPredictionResponse, tags=["Utilities"])
+def predict_category_batch(request: CategoryBatchPredictionRequest, db: Session = Depends(get_db), current_user: models.User | None = Depends(auth_service.get_optional_current_user)):
+    """Predict categories for many names, returning the top_k most likely per name.
+
+    A logged-in user's own corrections and the merchant rules answer first, with a single category of
+    confidence 1. The rest go through a single predict_proba pass over the merchants not in the prediction cache.
+    """
+    if len(request.names) > MAX_PREDICTION_BATCH:
+        raise HTTPException(status_code=400, detail=f"Too many names, at most {MAX_PREDICTION_BATCH} per request")
+    if request.top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be at least 1")
+    if not request.names:
+        return CategoryBatchPredictionResponse(predictions=[])
+
+    known = _known_categories(db, current_user, request.names)
+    model_names = [name for name, answer in zip(request.names, known) if answer is None]
+    model_scores = iter([])
+    if model_names:
+        model = category_service.model_loader.get()
+        try:
+            classes, probabilities = category_service.prediction_cache.predict_proba(model, model_names)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        top_k = min(request.top_k, len(classes))
+        # Column indices of the top_k probabilities per row, highest first
+        top_indices = np.argsort(-probabilities, axis=1, kind="stable")[:, :top_k]
+        model_scores = iter([
+            [CategoryScore(category=classes[i], confidence=round(float(row[i]), 4)) for i in indices]
+            for row, indices in zip(probabilities, top_indices)
+        ])
+
+    predictions = []
+    for name, answer in zip(request.names, known):
+        if answer is not None:
+            category, source = answer
+            scores = [CategoryScore(category=category, confidence=1.0)]
+        else:
+            scores, source = next(model_scores), "model"
+        predictions.append(CategoryPrediction(name=name, category=scores[0].category, source=source, top_k=scores))
+    return CategoryBatchPredictionResponse(predictions=predictions)
+
 @app.get("/categories", tags=["Utilities"])
 def get_all_categories():
     """Get all available categories for expenses, income, and savings"""
@@ -380,43 +576,84 @@ def get_all_categories():
         "saving_categories": SAVING_CATEGORIES
     }
 
+@app.get("/metrics", tags=["Utilities"])
+def get_metrics():
+    """In-process cache and maintenance job counters for monitoring"""
+    return {
+        "auth_principal_cache": auth_service.principal_cache.stats(),
+        "password_hash_pool": auth_service.password_hash_pool_stats(),
+        "token_purge": maintenance_service.token_purge_stats(),
+        "category_prediction_cache": category_service.prediction_cache.stats(),
+        "category_model": category_service.model_loader.stats(),
+        "statement_layouts": statement_layout_service.layout_registry.stats()
+    }
+
+def _read_upload(file: UploadFile, db: Session, current_user: models.User | None) -> tuple:
+    """(layout, transactions, known categories) of an uploaded statement, see upload_file."""
+    # Parsed straight from the upload's spooled file, in memory unless it is bigger than UPLOAD_SPOOL_MAX_BYTES.
+    # Layouts of statements seen before come from the registry, without header detection. Only signed in users'
+    # uploads add layouts to it
+    layout, transactions = read_statement(
+        file.file, file.filename,
+        resolve_layout=lambda head: statement_layout_service.layout_registry.resolve(
+            db, head, record=current_user is not None))
+    data = list(transactions)
+    return layout, data, _known_categories(db, current_user, [item["Description"] for item in data])
+
 @app.post("/upload/")
-async def upload_file(file: UploadFile = File(...)):
-    if not file.filename.endswith((".xls", ".xlsx")):
-        raise HTTPException(status_code=400, detail="Only .xls or .xlsx files are allowed")
+async def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db), current_user: models.User | None = Depends(auth_service.get_optional_current_user)):
+    if not file.filename.lower().endswith((".xls", ".xlsx", ".csv", ".tsv")):
+        raise HTTPException(status_code=400, detail="Only .xls, .xlsx, .csv or .tsv files are allowed")
     
-    temp_file_path = f"temp_uploads/{file.filename}"
-    os.makedirs("temp_uploads", exist_ok=True)
-    
-    with open(temp_file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
+    # The parse, the layout registry and the user's corrections are blocking work, kept off the event loop
     try:
-        data = extract_transactions(temp_file_path)
-        total_withdrawal = sum(item["Withdrawal"] for item in data)
-        total_deposit = sum(item["Deposit"] for item in data)
-        count = len(data)
-        net_monthly_expenditure = total_withdrawal-total_deposit
-    finally:
-        os.remove(temp_file_path)  # Clean up temp file
+        layout, data, known = await run_in_threadpool(_read_upload, file, db, current_user)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Suggested category per row: the user's corrections and merchant rules first, the model for the rest
+    model_rows = [item for item, answer in zip(data, known) if answer is None]
+    if model_rows:
+        model = await category_service.model_loader.get_async()
+        # predict_proba over a cold cache is CPU bound, off the event loop like the parse
+        predicted = await run_in_threadpool(category_service.prediction_cache.predict, model,
+                                            [item["Description"] for item in model_rows])
+        for item, category in zip(model_rows, predicted):
+            item["Category"] = category
+    for item, answer in zip(data, known):
+        if answer is not None:
+            item["Category"] = answer[0]
+    total_withdrawal = sum(item["Withdrawal"] for item in data)
+    total_deposit = sum(item["Deposit"] for item in data)
+    count = len(data)
+    net_monthly_expenditure = total_withdrawal-total_deposit
 
     return {"data": data,
             "total_amount_withdrawn": total_withdrawal,
             "total_amount_deposited": total_deposit,
             "net_monthly_expenditure": net_monthly_expenditure,
-            "total_transcations": count}
+            "total_transcations": count,
+            "layout": {key: layout[key] for key in ("fingerprint", "source", "header_row", "field_columns", "date_format")}
+                      if layout is not None else None}
 
 @app.post("/expenses/", response_model=Expense)
 def create_expense(expense: ExpenseCreate, db: Session = Depends(get_db), current_user: models.User = Depends(auth_service.get_current_user)):
     if expense.category_id not in CATEGORIES:
         raise HTTPException(status_code=400, detail="Invalid category ID. Must be between 1 and 9")
     
-    db_expense = models.Expense(**expense.dict(), user_id=current_user.id)
+    db_expense = models.Expense(**expense.dict(exclude={"suggested_category"}), user_id=current_user.id)
     db.add(db_expense)
+    aggregate_service.record_added(db, "expense", db_expense)
+    ledger_service.record_added(db, "expense", db_expense)
+    category_service.learn_from_expenses(db, current_user.id, [expense.dict()], CATEGORIES)
     db.commit()
     db.refresh(db_expense)
     return Expense(**db_expense.__dict__)
 
+@app.post("/expenses/bulk", response_model=BulkCreateResponse)
+def create_expenses_bulk(expenses: List[Dict[str, Any]], db: Session = Depends(get_db), current_user: models.User = Depends(auth_service.get_current_user)):
+    return _bulk_create(db, current_user.id, "expense", models.Expense, ExpenseCreate, CATEGORIES, expenses)
+
 @app.post("/recurring-expenses/", response_model=RecurringExpense)
 def create_recurring_expense(expense: RecurringExpenseCreate, db: Session = Depends(get_db), current_user: models.User = Depends(auth_service.get_current_user)):
     if expense.category_id not in CATEGORIES:
@@ -464,9 +701,9 @@ def create_recurring_expense(expense: RecurringExpenseCreate, db: Session = Depe
     )
 
 @app.get("/expenses/", response_model=List[Expense])
-def read_expenses(month: int = None, year: int = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(auth_service.get_current_user)):
+async def read_expenses(response: Response, month: int = None, year: int = None, skip: int = 0, limit: int = 100, cursor: str | None = None, db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(auth_service.get_current_user_async)):
     # If month and year are provided, filter expenses for that month
-    query = db.query(models.Expense).filter(models.Expense.user_id == current_user.id)
+    query = select(models.Expense).where(models.Expense.user_id == current_user.id)
     if month is not None and year is not None:
         start_date = date(year, month, 1)
         if month == 12:
@@ -474,48 +711,29 @@ def read_expenses(month: int = None, year: int = None, skip: int = 0, limit: int
         else:
             end_date = date(year, month + 1, 1)
         
-        query = query.filter(
+        query = query.where(
             models.Expense.date >= start_date,
             models.Expense.date < end_date
         )
+    if cursor:
+        # Keyset pagination: seek past the last record of the previous page instead of OFFSET
+        query = query.where(pagination_service.keyset_filter(models.Expense, cursor))
+    else:
+        # Offset paging kept for backward compatibility
+        query = query.offset(skip)
     # Sort by date first, then by created_at for consistent ordering
-    expenses = query.order_by(models.Expense.date.desc(), models.Expense.created_at.desc()).offset(skip).limit(limit).all()
+    result = await db.execute(query.order_by(*pagination_service.order_by_newest(models.Expense)).limit(limit))
+    expenses = result.scalars().all()
+    if len(expenses) == limit:
+        response.headers[pagination_service.NEXT_CURSOR_HEADER] = pagination_service.encode_cursor(expenses[-1])
     return [Expense(**expense.__dict__) for expense in expenses]
 
 @app.get("/expenses/total")
-def get_total_expenses(month: int = None, year: int = None, db: Session = Depends(get_db), current_user: models.User = Depends(auth_service.get_current_user)):
-    # If month and year are provided, filter expenses for that month
-    query = db.query(models.Expense).filter(models.Expense.user_id == current_user.id)
-    if month is not None and year is not None:
-        start_date = date(year, month, 1)
-        if month == 12:
-            end_date = date(year + 1, 1, 1)
-        else:
-            end_date = date(year, month + 1, 1)
-        
-        # Get overall total for the month
-        total = query.filter(
-            models.Expense.date >= start_date,
-            models.Expense.date < end_date
-        ).with_entities(func.sum(models.Expense.amount)).scalar()
-        
-        # Get category-wise totals for the month
-        category_totals = query.with_entities(
-            models.Expense.category_id,
-            func.sum(models.Expense.amount).label('total')
-        ).filter(
-            models.Expense.date >= start_date,
-            models.Expense.date < end_date
-        ).group_by(models.Expense.category_id).all()
-    else:
-        # Get overall total
-        total = query.with_entities(func.sum(models.Expense.amount)).scalar()
-        
-        # Get category-wise totals
-        category_totals = query.with_entities(
-            models.Expense.category_id,
-            func.sum(models.Expense.amount).label('total')
-        ).group_by(models.Expense.category_id).all()
+async def get_total_expenses(month: int = None, year: int = None, db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(auth_service.get_current_user_async)):
+    # Served from the monthly_aggregates table (one row per month and category) instead of scanning expenses
+    # If month and year are provided, only that month's rows are read
+    category_totals = await aggregate_service.get_category_totals(db, "expense", current_user.id, year, month)
+    total = sum(amount for _, amount in category_totals)
     
     # Convert category IDs to names and format the response
     category_breakdown = {
@@ -535,6 +753,8 @@ def delete_expense(expense_id: int, db: Session = Depends(get_db), current_user:
     
     message = f"Expense on {expense.date} for {CATEGORIES[expense.category_id]} amounting to {expense.amount} deleted successfully"
     db.delete(expense)
+    aggregate_service.record_removed(db, "expense", expense)
+    ledger_service.record_removed(db, "expense", expense)
     db.commit()
     return message
 
@@ -769,21 +989,16 @@ def get_intention_breakdown(month: int, year: int, db: Session = Depends(get_db)
     else:
         end_date = date(year, month + 1, 1)
     
-    expenses = db.query(models.Expense).filter(
-        models.Expense.date >= start_date,
-        models.Expense.date < end_date,
-        models.Expense.user_id == current_user.id
-    ).all()
-    
-    # Calculate totals for each intention
+    # Calculate totals for each intention (summed in SQL, one row per intention)
     intention_totals = {
         "Need": 0,
         "Want": 0,
         "Saving": 0
     }
     
-    for expense in expenses:
-        intention_totals[expense.intention] += expense.amount
+    columns = analytics_service.aggregate(db, "expense", current_user.id, start_date, end_date, group_by=["intention"])
+    for intention, amount in zip(columns["intention"], columns["sum"]):
+        intention_totals[intention] += amount
     
     # Calculate percentages
     total = sum(intention_totals.values())
@@ -976,14 +1191,20 @@ def create_income(income: IncomeCreate, db: Session = Depends(get_db), current_u
     
     db_income = models.Income(**income.dict(), user_id=current_user.id)
     db.add(db_income)
+    aggregate_service.record_added(db, "income", db_income)
+    ledger_service.record_added(db, "income", db_income)
     db.commit()
     db.refresh(db_income)
     return Income(**db_income.__dict__)
 
+@app.post("/income/bulk", response_model=BulkCreateResponse, tags=["Income"])
+def create_incomes_bulk(incomes: List[Dict[str, Any]], db: Session = Depends(get_db), current_user: models.User = Depends(auth_service.get_current_user)):
+    return _bulk_create(db, current_user.id, "income", models.Income, IncomeCreate, INCOME_CATEGORIES, incomes)
+
 @app.get("/income/", response_model=List[Income], tags=["Income"])
-def read_incomes(month: int = None, year: int = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(auth_service.get_current_user)):
+async def read_incomes(response: Response, month: int = None, year: int = None, skip: int = 0, limit: int = 100, cursor: str | None = None, db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(auth_service.get_current_user_async)):
     # If month and year are provided, filter incomes for that month
-    query = db.query(models.Income).filter(models.Income.user_id == current_user.id)
+    query = select(models.Income).where(models.Income.user_id == current_user.id)
     if month is not None and year is not None:
         start_date = date(year, month, 1)
         if month == 12:
@@ -991,12 +1212,21 @@ def read_incomes(month: int = None, year: int = None, skip: int = 0, limit: int
         else:
             end_date = date(year, month + 1, 1)
         
-        query = query.filter(
+        query = query.where(
             models.Income.date >= start_date,
             models.Income.date < end_date
         )
+    if cursor:
+        # Keyset pagination: seek past the last record of the previous page instead of OFFSET
+        query = query.where(pagination_service.keyset_filter(models.Income, cursor))
+    else:
+        # Offset paging kept for backward compatibility
+        query = query.offset(skip)
     # Sort by date first, then by created_at for consistent ordering
-    incomes = query.order_by(models.Income.date.desc(), models.Income.created_at.desc()).offset(skip).limit(limit).all()
+    result = await db.execute(query.order_by(*pagination_service.order_by_newest(models.Income)).limit(limit))
+    incomes = result.scalars().all()
+    if len(incomes) == limit:
+        response.headers[pagination_service.NEXT_CURSOR_HEADER] = pagination_service.encode_cursor(incomes[-1])
     return [Income(**income.__dict__) for income in incomes]
 
 @app.delete("/income/{income_id}", tags=["Income"])
@@ -1007,43 +1237,16 @@ def delete_income(income_id: int, db: Session = Depends(get_db), current_user: m
     
     message = f"Income on {income.date} for {INCOME_CATEGORIES[income.category_id]} amounting to {income.amount} deleted successfully"
     db.delete(income)
+    aggregate_service.record_removed(db, "income", income)
+    ledger_service.record_removed(db, "income", income)
     db.commit()
     return {"message": message}
 
 @app.get("/income/total", tags=["Income"])
-def get_total_income(month: int = None, year: int = None, db: Session = Depends(get_db), current_user: models.User = Depends(auth_service.get_current_user)):
-    # If month and year are provided, filter incomes for that month
-    query = db.query(models.Income).filter(models.Income.user_id == current_user.id)
-    if month is not None and year is not None:
-        start_date = date(year, month, 1)
-        if month == 12:
-            end_date = date(year + 1, 1, 1)
-        else:
-            end_date = date(year, month + 1, 1)
-        
-        # Get overall total for the month
-        total = query.filter(
-            models.Income.date >= start_date,
-            models.Income.date < end_date
-        ).with_entities(func.sum(models.Income.amount)).scalar()
-        
-        # Get category-wise totals for the month
-        category_totals = query.with_entities(
-            models.Income.category_id,
-            func.sum(models.Income.amount).label('total')
-        ).filter(
-            models.Income.date >= start_date,
-            models.Income.date < end_date
-        ).group_by(models.Income.category_id).all()
-    else:
-        # Get overall total
-        total = query.with_entities(func.sum(models.Income.amount)).scalar()
-        
-        # Get category-wise totals
-        category_totals = query.with_entities(
-            models.Income.category_id,
-            func.sum(models.Income.amount).label('total')
-        ).group_by(models.Income.category_id).all()
+async def get_total_income(month: int = None, year: int = None, db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(auth_service.get_current_user_async)):
+    # Served from the monthly_aggregates table, for one month if month and year are provided
+    category_totals = await aggregate_service.get_category_totals(db, "income", current_user.id, year, month)
+    total = sum(amount for _, amount in category_totals)
     
     # Convert category IDs to names and format the response
     category_breakdown = {
@@ -1063,14 +1266,20 @@ def create_saving(saving: SavingCreate, db: Session = Depends(get_db), current_u
     
     db_saving = models.Saving(**saving.dict(), user_id=current_user.id)
     db.add(db_saving)
+    aggregate_service.record_added(db, "saving", db_saving)
+    ledger_service.record_added(db, "saving", db_saving)
     db.commit()
     db.refresh(db_saving)
     return Saving(**db_saving.__dict__)
 
+@app.post("/savings/bulk", response_model=BulkCreateResponse, tags=["Savings"])
+def create_savings_bulk(savings: List[Dict[str, Any]], db: Session = Depends(get_db), current_user: models.User = Depends(auth_service.get_current_user)):
+    return _bulk_create(db, current_user.id, "saving", models.Saving, SavingCreate, SAVING_CATEGORIES, savings)
+
 @app.get("/savings/", response_model=List[Saving], tags=["Savings"])
-def read_savings(month: int = None, year: int = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(auth_service.get_current_user)):
+async def read_savings(response: Response, month: int = None, year: int = None, skip: int = 0, limit: int = 100, cursor: str | None = None, db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(auth_service.get_current_user_async)):
     # If month and year are provided, filter savings for that month
-    query = db.query(models.Saving).filter(models.Saving.user_id == current_user.id)
+    query = select(models.Saving).where(models.Saving.user_id == current_user.id)
     if month is not None and year is not None:
         start_date = date(year, month, 1)
         if month == 12:
@@ -1078,12 +1287,21 @@ def read_savings(month: int = None, year: int = None, skip: int = 0, limit: int
         else:
             end_date = date(year, month + 1, 1)
         
-        query = query.filter(
+        query = query.where(
             models.Saving.date >= start_date,
             models.Saving.date < end_date
         )
+    if cursor:
+        # Keyset pagination: seek past the last record of the previous page instead of OFFSET
+        query = query.where(pagination_service.keyset_filter(models.Saving, cursor))
+    else:
+        # Offset paging kept for backward compatibility
+        query = query.offset(skip)
     # Sort by date first, then by created_at for consistent ordering
-    savings = query.order_by(models.Saving.date.desc(), models.Saving.created_at.desc()).offset(skip).limit(limit).all()
+    result = await db.execute(query.order_by(*pagination_service.order_by_newest(models.Saving)).limit(limit))
+    savings = result.scalars().all()
+    if len(savings) == limit:
+        response.headers[pagination_service.NEXT_CURSOR_HEADER] = pagination_service.encode_cursor(savings[-1])
     return [Saving(**saving.__dict__) for saving in savings]
 
 @app.delete("/savings/{saving_id}", tags=["Savings"])
@@ -1093,50 +1311,22 @@ def delete_saving(saving_id: int, db: Session = Depends(get_db), current_user: m
         raise HTTPException(status_code=404, detail="Saving not found or not authorized")
     
     message = f"Saving on {saving.date} for {SAVING_CATEGORIES[saving.category_id]} amounting to {saving.amount} deleted successfully"
+    # A deleted goal savings record no longer counts towards its goal
+    db.query(models.GoalAllocation).filter(models.GoalAllocation.saving_id == saving.id).delete(synchronize_session=False)
     db.delete(saving)
+    aggregate_service.record_removed(db, "saving", saving)
+    ledger_service.record_removed(db, "saving", saving)
     db.commit()
     return {"message": message}
 
 @app.get("/savings/total", tags=["Savings"])
-def get_total_savings(month: int = None, year: int = None, db: Session = Depends(get_db), current_user: models.User = Depends(auth_service.get_current_user)):
-    # If month and year are provided, filter savings for that month
-    query = db.query(models.Saving).filter(models.Saving.user_id == current_user.id)
-    if month is not None and year is not None:
-        start_date = date(year, month, 1)
-        if month == 12:
-            end_date = date(year + 1, 1, 1)
-        else:
-            end_date = date(year, month + 1, 1)
-        
-        # Get overall total for the month (exclude "Saving Goal Redeemed" category)
-        total = query.filter(
-            models.Saving.date >= start_date,
-            models.Saving.date < end_date,
-            models.Saving.category_id != 8  # Exclude "Saving Goal Redeemed" category
-        ).with_entities(func.sum(models.Saving.amount)).scalar()
-        
-        # Get category-wise totals for the month (exclude "Saving Goal Redeemed" category)
-        category_totals = query.with_entities(
-            models.Saving.category_id,
-            func.sum(models.Saving.amount).label('total')
-        ).filter(
-            models.Saving.date >= start_date,
-            models.Saving.date < end_date,
-            models.Saving.category_id != 8  # Exclude "Saving Goal Redeemed" category
-        ).group_by(models.Saving.category_id).all()
-    else:
-        # Get overall total (exclude "Saving Goal Redeemed" category)
-        total = query.filter(
-            models.Saving.category_id != 8  # Exclude "Saving Goal Redeemed" category
-        ).with_entities(func.sum(models.Saving.amount)).scalar()
-        
-        # Get category-wise totals (exclude "Saving Goal Redeemed" category)
-        category_totals = query.with_entities(
-            models.Saving.category_id,
-            func.sum(models.Saving.amount).label('total')
-        ).filter(
-            models.Saving.category_id != 8  # Exclude "Saving Goal Redeemed" category
-        ).group_by(models.Saving.category_id).all()
+async def get_total_savings(month: int = None, year: int = None, db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(auth_service.get_current_user_async)):
+    # Served from the monthly_aggregates table, for one month if month and year are provided
+    category_totals = await aggregate_service.get_category_totals(
+        db, "saving", current_user.id, year, month,
+        exclude_categories=[8]  # Exclude "Saving Goal Redeemed" category
+    )
+    total = sum(amount for _, amount in category_totals)
     
     # Convert category IDs to names and format the response
     category_breakdown = {
@@ -1158,6 +1348,8 @@ def create_account(account: AccountCreate, db: Session = Depends(get_db), curren
     
     db_account = models.Account(**account.dict(), user_id=current_user.id)
     db.add(db_account)
+    # Savings goals may predate the account, so the snapshot starts from a full recompute
+    ledger_service.refresh_account_snapshot(db, db_account)
     db.commit()
     db.refresh(db_account)
     return Account(**db_account.__dict__)
@@ -1175,132 +1367,56 @@ def update_account_balance(account_id: int, account: AccountCreate, db: Session
     
     db_account.balance = account.balance
     db_account.modified_at = datetime.now()
+    ledger_service.refresh_account_snapshot(db, db_account)
     db.commit()
     db.refresh(db_account)
     return Account(**db_account.__dict__)
 
 @app.get("/accounts/balance", response_model=AccountBalance, tags=["Accounts"])
-def get_account_balance(db: Session = Depends(get_db), current_user: models.User = Depends(auth_service.get_current_user)):
-    # Get user's account
-    user_account = db.query(models.Account).filter(models.Account.user_id == current_user.id).first()
+async def get_account_balance(db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(auth_service.get_current_user_async)):
+    # Apparent and real balance are kept up to date on every write by service/ledger_service.py
+    # (see compute_balances there for the full calculation), so this is a single indexed lookup
+    user_account = (await db.execute(
+        select(models.Account).where(models.Account.user_id == current_user.id)
+    )).scalars().first()
     if not user_account:
         raise HTTPException(status_code=404, detail="Account not found. Please create an account first.")
     
-    # Apparent balance is the balance stored in the database (unaffected by saving goals)
-    apparent_balance = user_account.balance
-    
-    # Calculate real balance considering transactions after account's modified_at
-    # Only consider records that meet the criteria:
-    # (created_at of record > updated_at of account) && (date of record >= Date(update_at) of account)
-    
-    account_modified_date = user_account.modified_at.date()
-    
-    # Get income records that affect the balance
-    relevant_income = db.query(func.sum(models.Income.amount)).filter(
-        models.Income.user_id == current_user.id,
-        models.Income.created_at > user_account.modified_at,  # created_at > modified_at
-        models.Income.date >= account_modified_date  # date >= Date(modified_at)
-    ).scalar() or 0
-    
-    # Get expense records that affect the balance
-    relevant_expenses = db.query(func.sum(models.Expense.amount)).filter(
-        models.Expense.user_id == current_user.id,
-        models.Expense.created_at > user_account.modified_at,  # created_at > modified_at
-        models.Expense.date >= account_modified_date  # date >= Date(modified_at)
-    ).scalar() or 0
-    
-    # Get saving records that affect the balance (exclude "Saving Goal" category from apparent balance)
-    relevant_savings_non_goal = db.query(func.sum(models.Saving.amount)).filter(
-        models.Saving.user_id == current_user.id,
-        models.Saving.created_at > user_account.modified_at,  # created_at > modified_at
-        models.Saving.date >= account_modified_date,  # date >= Date(modified_at)
-        models.Saving.category_id != 7  # Exclude "Saving Goal" category
-    ).scalar() or 0
-    
-    # Calculate apparent balance
-    # Apparent balance = DB balance + net effect of transactions after account's last manual update
-    # (income - expenses - savings excluding saving goals) for transactions that meet the criteria
-    apparent_balance = apparent_balance + relevant_income - relevant_expenses - relevant_savings_non_goal
-    
-    # Real balance = apparent balance - saving goals (money locked away in saving goals)
-    # But we need to consider ALL saving goal records, not just those after modified_at
-    all_saving_goals = db.query(func.sum(models.Saving.amount)).filter(
-        models.Saving.user_id == current_user.id,
-        models.Saving.category_id == 7  # "Saving Goal" category
-    ).scalar() or 0
-    
-    real_balance = apparent_balance - all_saving_goals
-    
     return AccountBalance(
-        apparent_balance=apparent_balance,
-        real_balance=real_balance
+        apparent_balance=user_account.apparent_balance,
+        real_balance=user_account.real_balance
     )
 
 # Monthly Summary API
+@app.get("/analytics/aggregate", tags=["Summary"])
+async def get_analytics_aggregate(kind: str, start_date: date, end_date: date, group_by: List[str] = Query([]), metrics: List[str] = Query(["sum"]), db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(auth_service.get_current_user_async)):
+    """Group expenses/incomes/savings in [start_date, end_date) by category, intention, day, week, month or year
+    and compute sum, count, avg, min or max of the amount. Returns one array per column."""
+    query = analytics_service.build_aggregate_query(kind, current_user.id, start_date, end_date, group_by, metrics)
+    result = await db.execute(query)
+    return {
+        "kind": kind,
+        "start_date": start_date,
+        "end_date": end_date,
+        "group_by": group_by,
+        "metrics": metrics,
+        "columns": analytics_service.to_columns(result.all(), group_by, metrics)
+    }
+
 @app.get("/monthly-summary", tags=["Summary"])
-def get_monthly_summary(month: int, year: int, db: Session = Depends(get_db), current_user: models.User = Depends(auth_service.get_current_user)):
-    # Calculate start and end dates for the month
-    start_date = date(year, month, 1)
-    if month == 12:
-        end_date = date(year + 1, 1, 1)
-    else:
-        end_date = date(year, month + 1, 1)
-    
-    # Get income totals
-    income_total = db.query(func.sum(models.Income.amount)).filter(
-        models.Income.user_id == current_user.id,
-        models.Income.date >= start_date,
-        models.Income.date < end_date
-    ).scalar() or 0
-    
-    # Get expense totals
-    expense_total = db.query(func.sum(models.Expense.amount)).filter(
-        models.Expense.user_id == current_user.id,
-        models.Expense.date >= start_date,
-        models.Expense.date < end_date
-    ).scalar() or 0
-    
-    # Get saving totals
-    saving_total = db.query(func.sum(models.Saving.amount)).filter(
-        models.Saving.user_id == current_user.id,
-        models.Saving.date >= start_date,
-        models.Saving.date < end_date
-    ).scalar() or 0
+async def get_monthly_summary(month: int, year: int, db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(auth_service.get_current_user_async)):
+    # Totals and category breakdowns of all three record kinds come from the monthly_aggregates table in one
+    # statement. "Saving Goal Redeemed" is left out of the savings breakdown, it still counts in the total
+    totals, breakdown = await aggregate_service.get_monthly_breakdown(
+        db, current_user.id, year, month, exclude_categories={"saving": [8]})
+    expense_categories = breakdown["expense"]
+    income_categories = breakdown["income"]
+    saving_categories = breakdown["saving"]
+    income_total, expense_total, saving_total = totals["income"], totals["expense"], totals["saving"]
     
     # Calculate net balance for the month (income - expenses - savings)
     net_balance = income_total - expense_total - saving_total
     
-    # Get category breakdown for expenses
-    expense_categories = db.query(
-        models.Expense.category_id,
-        func.sum(models.Expense.amount).label('total')
-    ).filter(
-        models.Expense.user_id == current_user.id,
-        models.Expense.date >= start_date,
-        models.Expense.date < end_date
-    ).group_by(models.Expense.category_id).all()
-    
-    # Get category breakdown for income
-    income_categories = db.query(
-        models.Income.category_id,
-        func.sum(models.Income.amount).label('total')
-    ).filter(
-        models.Income.user_id == current_user.id,
-        models.Income.date >= start_date,
-        models.Income.date < end_date
-    ).group_by(models.Income.category_id).all()
-    
-    # Get category breakdown for savings (exclude "Saving Goal Redeemed" category)
-    saving_categories = db.query(
-        models.Saving.category_id,
-        func.sum(models.Saving.amount).label('total')
-    ).filter(
-        models.Saving.user_id == current_user.id,
-        models.Saving.date >= start_date,
-        models.Saving.date < end_date,
-        models.Saving.category_id != 8  # Exclude "Saving Goal Redeemed" category
-    ).group_by(models.Saving.category_id).all()
-    
     return {
         "month": month,
         "year": year,
@@ -1379,6 +1495,38 @@ class AddAmountRequest(BaseModel):
 class RedeemGoalRequest(BaseModel):
     pass
 
+def _allocate_to_goal(db: Session, db_goal: models.SavingGoal, amount: float, record_date: date) -> None:
+    """Put money into a goal: a "Saving Goal" savings record plus the allocation linking it to the goal."""
+    savings_record = models.Saving(
+        user_id=db_goal.user_id,
+        name=f"{db_goal.name}",
+        amount=amount,
+        date=record_date,
+        category_id=7,  # "Saving Goal" category
+        created_at=datetime.now()
+    )
+    db.add(savings_record)
+    db.flush()  # the allocation needs the savings record id
+    db.add(models.GoalAllocation(
+        user_id=db_goal.user_id,
+        saving_goal_id=db_goal.id,
+        saving_id=savings_record.id,
+        amount=amount,
+        date=record_date,
+        created_at=savings_record.created_at
+    ))
+    aggregate_service.record_added(db, "saving", savings_record)
+    ledger_service.record_added(db, "saving", savings_record)
+
+def _linked_goal_savings(db: Session, goal_id: int, category_ids: List[int]) -> List[models.Saving]:
+    """Savings records allocated to a goal, found through the indexed goal_allocations.saving_goal_id."""
+    return db.query(models.Saving).join(
+        models.GoalAllocation, models.GoalAllocation.saving_id == models.Saving.id
+    ).filter(
+        models.GoalAllocation.saving_goal_id == goal_id,
+        models.Saving.category_id.in_(category_ids)
+    ).all()
+
 
 @app.post("/saving-goals/", response_model=SavingGoal)
 def create_saving_goal(goal: SavingGoalCreate, db: Session = Depends(get_db), current_user: models.User = Depends(auth_service.get_current_user)):
@@ -1389,32 +1537,25 @@ def create_saving_goal(goal: SavingGoalCreate, db: Session = Depends(get_db), cu
     
     # Create linked savings record if initial saved_amount > 0
     if db_goal.saved_amount > 0:
-        savings_record = models.Saving(
-            user_id=current_user.id,
-            name=f"{db_goal.name}",
-            amount=db_goal.saved_amount,
-            date=datetime.now().date(),
-            category_id=7,  # "Saving Goal" category
-            created_at=datetime.now()
-        )
-        db.add(savings_record)
+        _allocate_to_goal(db, db_goal, db_goal.saved_amount, datetime.now().date())
         db.commit()
     
     return db_goal
 
 @app.get("/saving-goals/", response_model=List[SavingGoal])
 def get_saving_goals(db: Session = Depends(get_db), current_user: models.User = Depends(auth_service.get_current_user)):
-    goals = db.query(models.SavingGoal).filter(models.SavingGoal.user_id == current_user.id).all()
-    
-    # Calculate saved_amount from savings records for each goal
-    for goal in goals:
-        # Calculate from both "Saving Goal" and "Saving Goal Redeemed" categories
-        total_saved = db.query(func.sum(models.Saving.amount)).filter(
-            models.Saving.user_id == current_user.id,
-            models.Saving.category_id.in_([7, 8]),  # Both "Saving Goal" and "Saving Goal Redeemed" categories
-            models.Saving.name == f"{goal.name}"
-        ).scalar() or 0
-        
+    # Goals with their allocated totals (redeemed allocations included) in a single grouped query
+    goals_with_totals = db.query(
+        models.SavingGoal,
+        func.coalesce(func.sum(models.GoalAllocation.amount), 0)
+    ).outerjoin(
+        models.GoalAllocation, models.GoalAllocation.saving_goal_id == models.SavingGoal.id
+    ).filter(
+        models.SavingGoal.user_id == current_user.id
+    ).group_by(models.SavingGoal.id).all()
+
+    goals = []
+    for goal, total_saved in goals_with_totals:
         goal.saved_amount = total_saved
         
         # Update completion status based on calculated amount
@@ -1426,6 +1567,7 @@ def get_saving_goals(db: Session = Depends(get_db), current_user: models.User =
             goal.is_completed = False
             if goal.status == "completed":
                 goal.status = "active"
+        goals.append(goal)
     
     return goals
 
@@ -1451,25 +1593,15 @@ def add_amount_to_saving_goal(goal_id: int, request: AddAmountRequest, db: Sessi
     if db_goal.status == "redeemed":
         raise HTTPException(status_code=400, detail="Cannot add amount to redeemed goal")
 
-    # Create linked savings record
-    record_date = request.sg_date if request.sg_date else datetime.now().date()
-    savings_record = models.Saving(
-        user_id=current_user.id,
-        name=f"{db_goal.name}",
-        amount=request.amount,
-        date=record_date,
-        category_id=7,  # "Saving Goal" category
-        created_at=datetime.now()
-    )
-    db.add(savings_record)
-    
-    # Calculate total saved amount from savings records
-    total_saved = db.query(func.sum(models.Saving.amount)).filter(
-        models.Saving.user_id == current_user.id,
-        models.Saving.category_id == 7,  # "Saving Goal" category
-        models.Saving.name == f"{db_goal.name}"
+    # Calculate total saved amount from the goal's allocations
+    total_saved = db.query(func.sum(models.GoalAllocation.amount)).filter(
+        models.GoalAllocation.saving_goal_id == db_goal.id
     ).scalar() or 0
     total_saved += request.amount  # Add the new amount
+
+    # Create linked savings record
+    record_date = request.sg_date if request.sg_date else datetime.now().date()
+    _allocate_to_goal(db, db_goal, request.amount, record_date)
     
     db_goal.saved_amount = total_saved
     
@@ -1491,10 +1623,7 @@ def edit_saving_goal(goal_id: int, goal_update: SavingGoalEdit, db: Session = De
     if db_goal.status == "redeemed":
         raise HTTPException(status_code=400, detail="Cannot edit redeemed goal")
     
-    # Store old name for updating linked records
-    old_name = db_goal.name
-    
-    # Update goal fields
+    # Update goal fields (linked records reference the goal by id, a rename touches only this row)
     update_data = goal_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_goal, field, value)
@@ -1507,17 +1636,6 @@ def edit_saving_goal(goal_id: int, goal_update: SavingGoalEdit, db: Session = De
         db_goal.is_completed = False
         db_goal.status = "active"
     
-    # Update linked savings records if name changed
-    if goal_update.name and goal_update.name != old_name:
-        linked_savings = db.query(models.Saving).filter(
-            models.Saving.user_id == current_user.id,
-            models.Saving.category_id == 7,  # "Saving Goal" category
-            models.Saving.name == f"{old_name}"
-        ).all()
-        
-        for saving in linked_savings:
-            saving.name = f"{goal_update.name}"
-    
     db.commit()
     db.refresh(db_goal)
     return db_goal
@@ -1538,14 +1656,11 @@ def redeem_saving_goal(goal_id: int, request: RedeemGoalRequest, db: Session = D
     # Keep is_completed flag intact for achieved goals
     
     # Update linked savings records category to "Saving Goal Redeemed"
-    linked_savings = db.query(models.Saving).filter(
-        models.Saving.user_id == current_user.id,
-        models.Saving.category_id == 7,  # "Saving Goal" category
-        models.Saving.name == f"{db_goal.name}"
-    ).all()
+    linked_savings = _linked_goal_savings(db, db_goal.id, [7])  # "Saving Goal" category
     
     for saving in linked_savings:
         saving.category_id = 8  # "Saving Goal Redeemed" category
+        aggregate_service.record_recategorized(db, "saving", saving, old_category_id=7)
     
     # Get or create user account
     user_account = db.query(models.Account).filter(models.Account.user_id == current_user.id).first()
@@ -1556,6 +1671,8 @@ def redeem_saving_goal(goal_id: int, request: RedeemGoalRequest, db: Session = D
     # Add redeemed amount back to real balance
     user_account.balance += db_goal.saved_amount
     user_account.modified_at = datetime.now()
+    # Redeem resets modified_at and moves the goal's savings out of "Saving Goal", recompute the snapshot
+    ledger_service.refresh_account_snapshot(db, user_account)
     
     db.commit()
     db.refresh(db_goal)
@@ -1567,50 +1684,60 @@ def delete_saving_goal(goal_id: int, db: Session = Depends(get_db), current_user
     if not db_goal:
         raise HTTPException(status_code=404, detail="Saving goal not found or not authorized")
 
-    # Delete linked savings records
-    linked_savings = db.query(models.Saving).filter(
-        models.Saving.user_id == current_user.id,
-        models.Saving.category_id.in_([7, 8]),  # "Saving Goal" and "Saving Goal Redeemed" categories
-        models.Saving.name == f"{db_goal.name}"
-    ).all()
+    # Delete linked savings records and the allocations pointing at them
+    linked_savings = _linked_goal_savings(db, db_goal.id, [7, 8])  # "Saving Goal" and "Saving Goal Redeemed" categories
+    db.query(models.GoalAllocation).filter(models.GoalAllocation.saving_goal_id == db_goal.id).delete(synchronize_session=False)
     
     for saving in linked_savings:
         db.delete(saving)
+        aggregate_service.record_removed(db, "saving", saving)
+        ledger_service.record_removed(db, "saving", saving)
     
     db.delete(db_goal)
     db.commit()
     return {"message": "Saving goal and linked records deleted successfully"}
 
 @app.post("/auth/register", response_model=User)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.scalar(select(models.User).where(models.User.email == user.email))
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = auth_service.get_password_hash(user.password)
+    # bcrypt runs in the password hash pool, the event loop keeps serving other requests meanwhile.
+    # End the read transaction first so the pooled connection isn't held while waiting for a hash worker
+    await db.commit()
+    hashed_password = await auth_service.get_password_hash_async(user.password)
     db_user = models.User(email=user.email, hashed_password=hashed_password, name=user.name, created_at=datetime.now())
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @app.post("/auth/token", response_model=TokenWithRefresh)
-def login_for_access_token(response: Response, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
-    if not user or not auth_service.verify_password(form_data.password, user.hashed_password):
+async def login_for_access_token(response: Response, form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(models.User).where(models.User.email == form_data.username))
+    # Give the connection back to the pool while bcrypt runs (expire_on_commit=False keeps user loaded)
+    await db.commit()
+    password_valid, new_hash = (await auth_service.verify_and_update_password_async(form_data.password, user.hashed_password)
+                                if user else (False, None))
+    if not password_valid:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # The stored hash uses an outdated bcrypt cost (BCRYPT_ROUNDS changed), replace it while we have the password
+    if new_hash:
+        user.hashed_password = new_hash
+    
     access_token_expires = timedelta(minutes=auth_service.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth_service.create_access_token(
         data={"sub": str(user.id)}, expires_delta=access_token_expires
     )
     
     # Create refresh token
-    refresh_token = auth_service.create_refresh_token(db, user.id)
+    refresh_token = await auth_service.create_refresh_token_async(db, user.id)
     
     # Set refresh token as HttpOnly cookie
     response.set_cookie(
@@ -1624,7 +1751,7 @@ def login_for_access_token(response: Response, form_data: OAuth2PasswordRequestF
     
     # Update last login time
     user.last_login = datetime.now()
-    db.commit()
+    await db.commit()
     
     return {"access_token": access_token, "token_type": "bearer"}
 
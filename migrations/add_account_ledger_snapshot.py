@@ -0,0 +1,73 @@
+"""
+Migration script to add the running balance snapshot to the accounts table.
+
+This migration:
+1. Adds apparent_balance and real_balance columns to accounts
+2. Adds an index on accounts.user_id (the /accounts/balance lookup)
+3. Backfills both counters for every account by recomputing them from incomes, expenses and savings
+
+Run this migration from the project root before deploying the ledger snapshot. It can be re-run safely.
+With --check it only runs the consistency checker and reports accounts whose counters drifted
+(add --fix to rewrite them).
+"""
+
+import argparse
+import sys
+import os
+from sqlalchemy import text
+
+# Add parent directory to path to import models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal, engine
+import models
+from service.ledger_service import check_account_snapshots
+
+
+def add_snapshot_columns() -> None:
+    with engine.begin() as connection:
+        for column in ("apparent_balance", "real_balance"):
+            try:
+                connection.execute(text(f"ALTER TABLE accounts ADD COLUMN {column} FLOAT DEFAULT 0 NOT NULL"))
+                print(f"Added {column} column successfully")
+            except Exception as e:
+                print(f"{column} column might already exist: {e}")
+        for index in models.Account.__table__.indexes:
+            index.create(bind=connection, checkfirst=True)
+
+
+def run_migration(check_only: bool = False, fix: bool = False) -> int:
+    """Add and backfill the snapshot, or only check it. Returns the number of drifting accounts found."""
+    if not check_only:
+        print("Step 1: Adding balance snapshot columns to accounts table...")
+        add_snapshot_columns()
+
+    db = SessionLocal()
+    try:
+        if check_only:
+            drift = check_account_snapshots(db, fix=fix)
+            for row in drift:
+                print(f"Drift: account {row['account_id']} (user {row['user_id']}): "
+                      f"apparent {row['stored_apparent_balance']} vs {row['expected_apparent_balance']}, "
+                      f"real {row['stored_real_balance']} vs {row['expected_real_balance']}")
+            print(f"Found {len(drift)} drifting accounts" + (" (fixed)" if fix and drift else ""))
+            return 0 if fix else len(drift)
+
+        print("Step 2: Backfilling balance snapshots...")
+        backfilled = check_account_snapshots(db, fix=True)
+        print(f"Migration completed successfully! Backfilled {len(backfilled)} accounts")
+        return 0
+    except Exception as e:
+        print(f"Migration failed: {e}")
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add, backfill or check the accounts balance snapshot")
+    parser.add_argument("--check", action="store_true", help="only run the consistency checker")
+    parser.add_argument("--fix", action="store_true", help="with --check, rewrite drifting counters")
+    args = parser.parse_args()
+    sys.exit(1 if run_migration(check_only=args.check, fix=args.fix) else 0)
@@ -0,0 +1,47 @@
+"""
+Migration script to add (user_id, date, created_at) indexes on expenses, incomes and savings.
+
+This migration:
+1. Creates the indexes declared in models.py that back the newest-first listing and keyset (cursor)
+   pagination of GET /expenses/, /income/ and /savings/
+2. Runs ANALYZE and records the schema version in PRAGMA user_version
+
+Run migrations/add_record_indexes.py first, then this migration, from the project root.
+"""
+
+import sys
+import os
+from sqlalchemy import create_engine, text
+
+# Add parent directory to path to import models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SQLALCHEMY_DATABASE_URL
+from migrations.add_record_indexes import get_schema_version, create_record_indexes
+
+MIGRATION_VERSION = 2
+
+
+def run_migration(database_url: str = SQLALCHEMY_DATABASE_URL):
+    """Execute the migration to add the pagination indexes."""
+    engine = create_engine(database_url)
+
+    with engine.begin() as connection:
+        current_version = get_schema_version(connection)
+        if current_version >= MIGRATION_VERSION:
+            print(f"Schema version is {current_version}, pagination indexes already applied. Nothing to do.")
+            return
+        if current_version < MIGRATION_VERSION - 1:
+            print(f"Schema version is {current_version}, run migrations/add_record_indexes.py first.")
+            return
+
+        print("Starting migration to add pagination indexes...")
+        create_record_indexes(connection, name_suffix="_user_date_created_at")
+        # PRAGMA doesn't accept bound parameters
+        connection.execute(text(f"PRAGMA user_version = {MIGRATION_VERSION}"))
+
+    print(f"Migration completed successfully! Schema version is now {MIGRATION_VERSION}")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,66 @@
+"""
+Migration script to add composite (user_id, date, category_id, amount) indexes on
+expenses, incomes and savings.
+
+This migration:
+1. Creates the covering indexes declared in models.py on databases that already have the tables
+   (create_all() only creates indexes together with new tables, so existing databases need this)
+2. Runs ANALYZE so the SQLite query planner picks the new indexes up
+3. Records the schema version in PRAGMA user_version so the migration is applied only once
+
+Run this migration from the project root before deploying the indexed models.
+"""
+
+import sys
+import os
+import time
+from sqlalchemy import create_engine, text
+
+# Add parent directory to path to import models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SQLALCHEMY_DATABASE_URL
+import models
+
+MIGRATION_VERSION = 1
+
+# Index definitions live in models.py so new databases and migrated databases stay identical
+INDEXED_MODELS = [models.Expense, models.Income, models.Saving]
+
+
+def get_schema_version(connection) -> int:
+    return connection.execute(text("PRAGMA user_version")).scalar() or 0
+
+
+def create_record_indexes(connection, name_suffix: str = "_user_date_category_amount") -> None:
+    """Create the record indexes whose name ends with name_suffix if they don't exist yet."""
+    for model in INDEXED_MODELS:
+        for index in model.__table__.indexes:
+            if not index.name.endswith(name_suffix):
+                continue
+            started = time.perf_counter()
+            index.create(bind=connection, checkfirst=True)
+            print(f"Created {index.name} in {time.perf_counter() - started:.2f}s")
+    connection.execute(text("ANALYZE"))
+
+
+def run_migration(database_url: str = SQLALCHEMY_DATABASE_URL):
+    """Execute the migration to add composite record indexes."""
+    engine = create_engine(database_url)
+
+    with engine.begin() as connection:
+        current_version = get_schema_version(connection)
+        if current_version >= MIGRATION_VERSION:
+            print(f"Schema version is {current_version}, record indexes already applied. Nothing to do.")
+            return
+
+        print("Starting migration to add composite record indexes...")
+        create_record_indexes(connection)
+        # PRAGMA doesn't accept bound parameters
+        connection.execute(text(f"PRAGMA user_version = {MIGRATION_VERSION}"))
+
+    print(f"Migration completed successfully! Schema version is now {MIGRATION_VERSION}")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,58 @@
+"""
+Migration script to add indexes on refresh_tokens and password_reset_tokens.
+
+This migration:
+1. Creates the token indexes declared in models.py: (token, is_active) for refresh token validation,
+   (user_id, is_active) for revoking all of a user's tokens and (is_active, expires_at) / expires_at
+   for the scheduled purge of expired and revoked tokens (service/maintenance_service.py)
+2. Runs ANALYZE and records the schema version in PRAGMA user_version
+
+Run migrations/add_record_indexes.py and migrations/add_pagination_indexes.py first, then this migration,
+from the project root.
+"""
+
+import sys
+import os
+import time
+from sqlalchemy import create_engine, text
+
+# Add parent directory to path to import models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SQLALCHEMY_DATABASE_URL
+from migrations.add_record_indexes import get_schema_version
+import models
+
+MIGRATION_VERSION = 3
+
+INDEXED_MODELS = [models.RefreshToken, models.PasswordResetToken]
+
+
+def run_migration(database_url: str = SQLALCHEMY_DATABASE_URL):
+    """Execute the migration to add the token indexes."""
+    engine = create_engine(database_url)
+
+    with engine.begin() as connection:
+        current_version = get_schema_version(connection)
+        if current_version >= MIGRATION_VERSION:
+            print(f"Schema version is {current_version}, token indexes already applied. Nothing to do.")
+            return
+        if current_version < MIGRATION_VERSION - 1:
+            print(f"Schema version is {current_version}, run migrations/add_pagination_indexes.py first.")
+            return
+
+        print("Starting migration to add token indexes...")
+        for model in INDEXED_MODELS:
+            for index in model.__table__.indexes:
+                started = time.perf_counter()
+                index.create(bind=connection, checkfirst=True)
+                print(f"Created {index.name} in {time.perf_counter() - started:.2f}s")
+        connection.execute(text("ANALYZE"))
+        # PRAGMA doesn't accept bound parameters
+        connection.execute(text(f"PRAGMA user_version = {MIGRATION_VERSION}"))
+
+    print(f"Migration completed successfully! Schema version is now {MIGRATION_VERSION}")
+
+
+if __name__ == "__main__":
+    run_migration()
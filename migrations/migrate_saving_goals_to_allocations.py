@@ -3,10 +3,14 @@
 Migration script to convert existing saving goal records to the new GoalAllocation system.
 
 This script:
-1. Creates the new goal_allocations table
+1. Creates the new goal_allocations table (or adds the saving_id column and the
+   saving_goal_id/saving_id indexes to an existing one)
 2. Migrates existing Saving records with category_id 7 & 8 to GoalAllocation records
-3. Links them properly with saving_goal_id
-4. Preserves all data for historical accuracy
+3. Links them properly with saving_goal_id and saving_id
+4. Preserves all data for historical accuracy, the savings records stay in place because
+   balances and monthly totals are still computed from them
+
+Records that already have an allocation are skipped, so the script can be re-run safely.
 
 Run this script after updating the models.py with GoalAllocation model.
 """
@@ -15,11 +19,11 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, func
 from sqlalchemy.orm import sessionmaker
 from database import SQLALCHEMY_DATABASE_URL, Base
-from models import GoalAllocation, Saving, SavingGoal
-import models
+from models import GoalAllocation, SavingGoal
+from service.goal_service import link_goal_savings
 
 def migrate_saving_goals_to_allocations():
     """Migrate existing saving goal records to the new GoalAllocation system"""
@@ -30,52 +34,32 @@ def migrate_saving_goals_to_allocations():
     
     # Create all new tables (including goal_allocations)
     Base.metadata.create_all(bind=engine)
+
+    # Tables created by an earlier version of this script lack saving_id and the lookup indexes
+    with engine.begin() as connection:
+        try:
+            connection.execute(text("ALTER TABLE goal_allocations ADD COLUMN saving_id INTEGER REFERENCES savings (id)"))
+            print("Added saving_id column to goal_allocations")
+        except Exception as e:
+            print(f"saving_id column might already exist: {e}")
+        for index in GoalAllocation.__table__.indexes:
+            index.create(bind=connection, checkfirst=True)
     
     db = SessionLocal()
     
     try:
         print("Starting migration of saving goal records to goal allocations...")
         
-        # Step 1: Find all Saving records with category_id 7 or 8 (Saving Goal categories)
-        goal_savings = db.query(Saving).filter(
-            Saving.category_id.in_([7, 8])  # "Saving Goal" and "Saving Goal Redeemed"
-        ).all()
-        
-        print(f"Found {len(goal_savings)} saving goal records to migrate...")
-        
-        migrated_count = 0
-        skipped_count = 0
-        
-        for saving_record in goal_savings:
-            # Step 2: Find the corresponding SavingGoal by matching name
-            # Remove any prefix from the saving record name if it exists
-            goal_name = saving_record.name
-            
-            # Find matching saving goal
-            saving_goal = db.query(SavingGoal).filter(
-                SavingGoal.user_id == saving_record.user_id,
-                SavingGoal.name == goal_name
-            ).first()
-            
-            if not saving_goal:
-                print(f"Warning: Could not find matching saving goal for record '{goal_name}' (user_id: {saving_record.user_id})")
-                skipped_count += 1
-                continue
-            
-            # Step 3: Create GoalAllocation record
-            goal_allocation = GoalAllocation(
-                user_id=saving_record.user_id,
-                saving_goal_id=saving_goal.id,
-                amount=saving_record.amount,
-                date=saving_record.date,
-                created_at=saving_record.created_at,
-                note=f"Migrated from saving record (category {'Saving Goal' if saving_record.category_id == 7 else 'Saving Goal Redeemed'})"
-            )
-            
-            db.add(goal_allocation)
-            migrated_count += 1
-            
-            print(f"Migrated: {goal_name} - ₹{saving_record.amount} -> Goal ID {saving_goal.id}")
+        # Steps 1-3: Find the Saving records with category_id 7 or 8 (Saving Goal categories), match each to
+        # its SavingGoal by name and create the GoalAllocation linking them
+        allocations, unmatched = link_goal_savings(db)
+        migrated_count = len(allocations)
+        skipped_count = len(unmatched)
+
+        for saving_record in unmatched:
+            print(f"Warning: Could not find matching saving goal for record '{saving_record.name}' (user_id: {saving_record.user_id})")
+        for allocation in allocations:
+            print(f"Migrated: saving {allocation.saving_id} - ₹{allocation.amount} -> Goal ID {allocation.saving_goal_id}")
         
         # Step 4: Commit the new GoalAllocation records
         db.commit()
@@ -87,7 +71,7 @@ def migrate_saving_goals_to_allocations():
         all_goals = db.query(SavingGoal).all()
         for goal in all_goals:
             # Calculate total from goal allocations
-            total_allocated = db.query(models.func.sum(GoalAllocation.amount)).filter(
+            total_allocated = db.query(func.sum(GoalAllocation.amount)).filter(
                 GoalAllocation.saving_goal_id == goal.id
             ).scalar() or 0
             
@@ -108,20 +92,8 @@ def migrate_saving_goals_to_allocations():
         print(f"Migrated: {migrated_count} records")
         print(f"Skipped: {skipped_count} records (no matching goal found)")
         
-        response = input("\nDo you want to DELETE the old saving goal records (category_id 7 & 8)? (y/N): ")
-        if response.lower() == 'y':
-            # Delete old saving goal records
-            deleted_count = db.query(Saving).filter(
-                Saving.category_id.in_([7, 8])
-            ).delete()
-            db.commit()
-            print(f"Deleted {deleted_count} old saving goal records from the savings table")
-        else:
-            print("Old records kept. You can manually delete them later if needed.")
-            
         print("\n✅ Migration completed successfully!")
-        print("The saving goals system now uses GoalAllocation records instead of Saving records.")
-        print("This resolves the phantom transaction issue in monthly analysis.")
+        print("Saving goals now find their records through GoalAllocation.saving_goal_id instead of matching names.")
         
     except Exception as e:
         print(f"❌ Error during migration: {e}")
@@ -0,0 +1,59 @@
+"""
+Migration / maintenance script for the monthly_aggregates table.
+
+This script:
+1. Creates the monthly_aggregates table if it doesn't exist yet
+2. Rebuilds (backfills) it from the expenses, incomes and savings tables
+3. With --check, only reports drift between the aggregate table and the raw tables without changing anything
+
+Run from the project root:
+    python migrations/rebuild_monthly_aggregates.py            # rebuild all users
+    python migrations/rebuild_monthly_aggregates.py --user 3   # rebuild one user
+    python migrations/rebuild_monthly_aggregates.py --check    # report drift only
+"""
+
+import argparse
+import sys
+import os
+
+# Add parent directory to path to import models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal, engine
+import models
+from service.aggregate_service import rebuild_monthly_aggregates, check_monthly_aggregates_drift
+
+
+def run_migration(check_only: bool = False, user_id: int | None = None) -> int:
+    """Rebuild the aggregates or report drift. Returns the number of drifting rows found (0 after a rebuild)."""
+    models.MonthlyAggregate.__table__.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        if check_only:
+            drift = check_monthly_aggregates_drift(db, user_id)
+            for row in drift:
+                print(f"Drift: user {row['user_id']} {row['kind']} {row['month']:02d}/{row['year']} "
+                      f"category {row['category_id']}: stored {row['stored_total']} ({row['stored_count']} records), "
+                      f"expected {row['expected_total']} ({row['expected_count']} records)")
+            print(f"Found {len(drift)} drifting aggregate rows")
+            return len(drift)
+
+        print("Rebuilding monthly aggregates from expenses, incomes and savings...")
+        rows = rebuild_monthly_aggregates(db, user_id)
+        print(f"Rebuild completed successfully! Wrote {rows} aggregate rows")
+        return 0
+    except Exception as e:
+        print(f"Migration failed: {e}")
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild or check the monthly_aggregates table")
+    parser.add_argument("--check", action="store_true", help="only report drift, don't rebuild")
+    parser.add_argument("--user", type=int, default=None, help="limit to one user id")
+    args = parser.parse_args()
+    drift_count = run_migration(check_only=args.check, user_id=args.user)
+    sys.exit(1 if drift_count else 0)
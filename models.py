@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, JSON, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, JSON, DateTime, Boolean, Index
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -37,6 +37,14 @@ class Expense(Base):
     created_at = Column(DateTime, nullable=False, default=datetime.now)
     owner = relationship("User", back_populates="expenses") # Relationship
 
+    # Covering index for the per-user date range queries (lists, totals, summaries, charts)
+    # so SQLite can answer them from the index without scanning the whole table
+    __table_args__ = (
+        Index("ix_expenses_user_date_category_amount", "user_id", "date", "category_id", "amount"),
+        # Newest-first listing and keyset pagination (id is implicitly part of every SQLite index)
+        Index("ix_expenses_user_date_created_at", "user_id", "date", "created_at"),
+    )
+
 class RecurringExpense(Base):
     __tablename__ = "recurring_expenses"
 
@@ -84,6 +92,54 @@ class SavingGoal(Base):
 
     owner = relationship("User", back_populates="saving_goals") # Relationship
 
+class GoalAllocation(Base):
+    """Money put into a saving goal, linked to the goal by id instead of by name.
+
+    Every allocation mirrors the "Saving Goal" savings record it was created with (saving_id), which stays
+    the record that balances and monthly totals are computed from.
+    """
+    __tablename__ = "goal_allocations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    saving_goal_id = Column(Integer, ForeignKey("saving_goals.id"), nullable=False, index=True)
+    saving_id = Column(Integer, ForeignKey("savings.id"), nullable=True, index=True)
+    amount = Column(Float, nullable=False)
+    date = Column(Date, nullable=False)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    note = Column(String, nullable=True)
+
+class MerchantCategoryOverride(Base):
+    """A user's own category for a merchant, learned from expenses saved with a category the model didn't predict.
+
+    Keyed by the normalized merchant (service/category_service.py normalize_merchant), consulted before the
+    global category model.
+    """
+    __tablename__ = "merchant_category_overrides"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    merchant_key = Column(String, primary_key=True)
+    category_id = Column(Integer, nullable=False)
+    corrections = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, default=datetime.now, nullable=False)
+
+class StatementLayout(Base):
+    """A bank statement layout seen in an upload: the header row position and the columns holding each field.
+
+    Keyed by service/statementExtractor.py header_fingerprint, consulted before header detection
+    (service/statement_layout_service.py).
+    """
+    __tablename__ = "statement_layouts"
+
+    fingerprint = Column(String, primary_key=True)
+    header_row = Column(Integer, nullable=False)
+    header = Column(JSON, nullable=False)  # Normalized column names
+    field_columns = Column(JSON, nullable=False)  # Stores field: column index mapping
+    date_format = Column(String, nullable=True)  # strptime format of text dates, None for date cells
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    last_used_at = Column(DateTime, default=datetime.now, nullable=False)
+
 class PasswordResetToken(Base):
     __tablename__ = "password_reset_tokens"
 
@@ -95,6 +151,12 @@ class PasswordResetToken(Base):
 
     user = relationship("User") # Relationship to the User model
 
+    __table_args__ = (
+        # Expired token purge and the per-user invalidation in generate_password_reset_token
+        Index("ix_password_reset_tokens_expires_at", "expires_at"),
+        Index("ix_password_reset_tokens_user_id", "user_id"),
+    )
+
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
 
@@ -107,6 +169,13 @@ class RefreshToken(Base):
 
     user = relationship("User", back_populates="refresh_tokens")
 
+    __table_args__ = (
+        # validate_refresh_token (token + is_active), logout's revoke-all and the expired/inactive purge
+        Index("ix_refresh_tokens_token_is_active", "token", "is_active"),
+        Index("ix_refresh_tokens_user_id_is_active", "user_id", "is_active"),
+        Index("ix_refresh_tokens_is_active_expires_at", "is_active", "expires_at"),
+    )
+
 class Income(Base):
     __tablename__ = "incomes"
 
@@ -120,6 +189,12 @@ class Income(Base):
 
     owner = relationship("User", back_populates="incomes")
 
+    __table_args__ = (
+        Index("ix_incomes_user_date_category_amount", "user_id", "date", "category_id", "amount"),
+        # Newest-first listing and keyset pagination (id is implicitly part of every SQLite index)
+        Index("ix_incomes_user_date_created_at", "user_id", "date", "created_at"),
+    )
+
 class Saving(Base):
     __tablename__ = "savings"
 
@@ -133,13 +208,39 @@ class Saving(Base):
 
     owner = relationship("User", back_populates="savings")
 
+    __table_args__ = (
+        Index("ix_savings_user_date_category_amount", "user_id", "date", "category_id", "amount"),
+        # Newest-first listing and keyset pagination (id is implicitly part of every SQLite index)
+        Index("ix_savings_user_date_created_at", "user_id", "date", "created_at"),
+    )
+
 class Account(Base):
     __tablename__ = "accounts"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     balance = Column(Float, nullable=False, default=0.0)
+    # Running balance snapshot maintained by service/ledger_service.py on every write that affects it,
+    # so /accounts/balance doesn't have to re-sum incomes, expenses and savings
+    apparent_balance = Column(Float, nullable=False, default=0.0)
+    real_balance = Column(Float, nullable=False, default=0.0)
     created_at = Column(DateTime, default=datetime.now)
     modified_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
-    owner = relationship("User", back_populates="accounts") 
\ No newline at end of file
+    owner = relationship("User", back_populates="accounts")
+
+class MonthlyAggregate(Base):
+    """Running sum/count per user, record kind, month and category.
+
+    Maintained in the same transaction as every expense/income/saving write (service/aggregate_service.py)
+    so totals and summaries don't have to scan the raw tables.
+    """
+    __tablename__ = "monthly_aggregates"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    kind = Column(String, primary_key=True)  # 'expense', 'income', 'saving'
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    category_id = Column(Integer, primary_key=True)
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
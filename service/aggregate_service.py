@@ -0,0 +1,196 @@
+from datetime import date
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import and_, func, not_, select, delete, literal, union_all, Integer, cast
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+
+# Record kind stored in monthly_aggregates.kind -> source table
+RECORD_KINDS = {
+    "expense": models.Expense,
+    "income": models.Income,
+    "saving": models.Saving,
+}
+
+# Float sums drift slightly when maintained incrementally, anything below this is not reported as drift
+DRIFT_TOLERANCE = 0.01
+
+
+def _apply_delta(db: Session, kind: str, user_id: int, record_date: date, category_id: int, amount: float, count: int) -> None:
+    """Upsert a (sum, count) delta into the aggregate row of the record's month and category.
+
+    Runs on the caller's session, so it commits or rolls back together with the record write.
+    """
+    key = {
+        "user_id": user_id,
+        "kind": kind,
+        "year": record_date.year,
+        "month": record_date.month,
+        "category_id": category_id,
+    }
+    stmt = insert(models.MonthlyAggregate).values(**key, total=amount, count=count)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key),
+        set_={
+            "total": models.MonthlyAggregate.total + stmt.excluded.total,
+            "count": models.MonthlyAggregate.count + stmt.excluded.count,
+        },
+    )
+    db.execute(stmt)
+
+    if count < 0:
+        # Drop emptied rows so breakdowns don't list categories that no longer have records
+        db.execute(delete(models.MonthlyAggregate).where(
+            *(getattr(models.MonthlyAggregate, column) == value for column, value in key.items()),
+            models.MonthlyAggregate.count <= 0,
+        ))
+
+
+def records_added(db: Session, kind: str, user_id: int, rows: List[dict]) -> None:
+    """Account for a batch of new records (dicts with date, category_id, amount) with one upsert per month/category."""
+    deltas = {}
+    for row in rows:
+        key = (row["date"].year, row["date"].month, row["category_id"])
+        total, count = deltas.get(key, (0.0, 0))
+        deltas[key] = (total + row["amount"], count + 1)
+    for (year, month, category_id), (total, count) in deltas.items():
+        _apply_delta(db, kind, user_id, date(year, month, 1), category_id, total, count)
+
+
+def record_added(db: Session, kind: str, record) -> None:
+    """Account for a new expense/income/saving in the monthly aggregates."""
+    _apply_delta(db, kind, record.user_id, record.date, record.category_id, record.amount, 1)
+
+
+def record_removed(db: Session, kind: str, record) -> None:
+    """Remove a deleted expense/income/saving from the monthly aggregates."""
+    _apply_delta(db, kind, record.user_id, record.date, record.category_id, -record.amount, -1)
+
+
+def record_recategorized(db: Session, kind: str, record, old_category_id: int) -> None:
+    """Move a record's amount from its old category to its current one (e.g. saving goal redeem)."""
+    _apply_delta(db, kind, record.user_id, record.date, old_category_id, -record.amount, -1)
+    record_added(db, kind, record)
+
+
+async def get_category_totals(db: AsyncSession, kind: str, user_id: int, year: int | None = None, month: int | None = None,
+                              exclude_categories: Iterable[int] = ()) -> List[Tuple[int, float]]:
+    """Return [(category_id, total)] for a user from the aggregate table, for one month or all time."""
+    query = select(
+        models.MonthlyAggregate.category_id,
+        func.sum(models.MonthlyAggregate.total),
+    ).where(
+        models.MonthlyAggregate.user_id == user_id,
+        models.MonthlyAggregate.kind == kind,
+    )
+    if year is not None and month is not None:
+        query = query.where(models.MonthlyAggregate.year == year, models.MonthlyAggregate.month == month)
+    exclude_categories = list(exclude_categories)
+    if exclude_categories:
+        query = query.where(models.MonthlyAggregate.category_id.not_in(exclude_categories))
+    result = await db.execute(query.group_by(models.MonthlyAggregate.category_id))
+    return [(category_id, total) for category_id, total in result.all()]
+
+
+async def get_monthly_breakdown(db: AsyncSession, user_id: int, year: int, month: int,
+                                exclude_categories: Dict[str, Iterable[int]] | None = None
+                                ) -> Tuple[Dict[str, float], Dict[str, List[Tuple[int, float]]]]:
+    """Return ({kind: total}, {kind: [(category_id, total)]}) for every record kind of one month in a single
+    statement. Totals cover every category, exclude_categories ({kind: category ids}) only leaves categories out
+    of the breakdown."""
+    in_month = (
+        models.MonthlyAggregate.user_id == user_id,
+        models.MonthlyAggregate.year == year,
+        models.MonthlyAggregate.month == month,
+    )
+    excluded = [and_(models.MonthlyAggregate.kind == kind, models.MonthlyAggregate.category_id.in_(list(category_ids)))
+                for kind, category_ids in (exclude_categories or {}).items()]
+    # The kind totals come back as rows without a category
+    totals_query = (
+        select(models.MonthlyAggregate.kind, literal(None, Integer), func.sum(models.MonthlyAggregate.total))
+        .where(*in_month)
+        .group_by(models.MonthlyAggregate.kind)
+    )
+    categories_query = (
+        select(models.MonthlyAggregate.kind, models.MonthlyAggregate.category_id, func.sum(models.MonthlyAggregate.total))
+        .where(*in_month, *(not_(condition) for condition in excluded))
+        .group_by(models.MonthlyAggregate.kind, models.MonthlyAggregate.category_id)
+    )
+    result = await db.execute(union_all(totals_query, categories_query))
+    totals, breakdown = {kind: 0.0 for kind in RECORD_KINDS}, {kind: [] for kind in RECORD_KINDS}
+    for kind, category_id, total in result.all():
+        if category_id is None:
+            totals[kind] = total
+        else:
+            breakdown[kind].append((category_id, total))
+    return totals, breakdown
+
+
+def _raw_aggregates(db: Session, user_id: int | None = None) -> dict:
+    """Recompute {(user_id, kind, year, month, category_id): (total, count)} from the raw tables."""
+    aggregates = {}
+    for kind, model in RECORD_KINDS.items():
+        year = cast(func.strftime("%Y", model.date), Integer)
+        month = cast(func.strftime("%m", model.date), Integer)
+        query = db.query(
+            model.user_id, year, month, model.category_id, func.sum(model.amount), func.count(model.id)
+        )
+        if user_id is not None:
+            query = query.filter(model.user_id == user_id)
+        for row_user_id, row_year, row_month, category_id, total, count in query.group_by(
+                model.user_id, year, month, model.category_id).all():
+            aggregates[(row_user_id, kind, row_year, row_month, category_id)] = (total, count)
+    return aggregates
+
+
+def rebuild_monthly_aggregates(db: Session, user_id: int | None = None) -> int:
+    """Backfill the aggregate table from the raw tables (all users or one user). Returns rows written."""
+    delete_query = db.query(models.MonthlyAggregate)
+    if user_id is not None:
+        delete_query = delete_query.filter(models.MonthlyAggregate.user_id == user_id)
+    delete_query.delete(synchronize_session=False)
+
+    aggregates = _raw_aggregates(db, user_id)
+    db.bulk_insert_mappings(models.MonthlyAggregate, [
+        {"user_id": key[0], "kind": key[1], "year": key[2], "month": key[3], "category_id": key[4],
+         "total": total, "count": count}
+        for key, (total, count) in aggregates.items()
+    ])
+    db.commit()
+    return len(aggregates)
+
+
+def check_monthly_aggregates_drift(db: Session, user_id: int | None = None) -> List[dict]:
+    """Compare the aggregate table with the raw tables and return every mismatching key."""
+    expected = _raw_aggregates(db, user_id)
+    query = db.query(models.MonthlyAggregate)
+    if user_id is not None:
+        query = query.filter(models.MonthlyAggregate.user_id == user_id)
+    stored = {
+        (row.user_id, row.kind, row.year, row.month, row.category_id): (row.total, row.count)
+        for row in query.all()
+    }
+
+    drift = []
+    for key in expected.keys() | stored.keys():
+        expected_total, expected_count = expected.get(key, (0.0, 0))
+        stored_total, stored_count = stored.get(key, (0.0, 0))
+        if expected_count != stored_count or abs(expected_total - stored_total) > DRIFT_TOLERANCE:
+            drift.append({
+                "user_id": key[0], "kind": key[1], "year": key[2], "month": key[3], "category_id": key[4],
+                "expected_total": expected_total, "stored_total": stored_total,
+                "expected_count": expected_count, "stored_count": stored_count,
+            })
+    return drift
+
+
+def ensure_monthly_aggregates(db: Session) -> None:
+    """Backfill once when the aggregate table is empty but records exist (first start after upgrading)."""
+    if db.query(models.MonthlyAggregate).first() is not None:
+        return
+    if any(db.query(model.id).first() is not None for model in RECORD_KINDS.values()):
+        rows = rebuild_monthly_aggregates(db)
+        print(f"Backfilled {rows} monthly aggregate rows")
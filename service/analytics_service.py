@@ -0,0 +1,87 @@
+from datetime import date
+from typing import Dict, List, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import cast, func, select, Integer
+from sqlalchemy.orm import Session
+
+import models
+from service.aggregate_service import RECORD_KINDS
+
+METRICS = {
+    "sum": func.sum,
+    "count": func.count,
+    "avg": func.avg,
+    "min": func.min,
+    "max": func.max,
+}
+
+
+def _iso_week(column):
+    """'YYYY-Www' ISO week label. SQLite only got %V/%G in 3.46, so derive it from the week's Thursday."""
+    thursday = func.date(column, "-3 days", "weekday 4")
+    week = (cast(func.strftime("%j", thursday), Integer) - 1) // 7 + 1
+    return func.printf("%s-W%02d", func.strftime("%Y", thursday), week)
+
+
+def _dimensions(model) -> Dict[str, object]:
+    dimensions = {
+        "category": model.category_id,
+        "day": model.date,
+        "week": _iso_week(model.date),
+        "month": func.strftime("%Y-%m", model.date),
+        "year": func.strftime("%Y", model.date),
+    }
+    if model is models.Expense:
+        dimensions["intention"] = model.intention
+    return dimensions
+
+
+def build_aggregate_query(kind: str, user_id: int, start_date: date, end_date: date,
+                          group_by: Sequence[str] = (), metrics: Sequence[str] = ("sum",)):
+    """Compile a kind/date range/group-by/metrics request into one GROUP BY statement.
+
+    start_date is inclusive and end_date exclusive, like the month ranges used across the app. Rows come back
+    as the group-by columns followed by the metrics, ordered by the group-by columns.
+    """
+    if kind not in RECORD_KINDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Unknown record kind '{kind}', expected one of {', '.join(RECORD_KINDS)}")
+    model = RECORD_KINDS[kind]
+    dimensions = _dimensions(model)
+    unknown = [name for name in group_by if name not in dimensions] + [name for name in metrics if name not in METRICS]
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Unsupported group_by/metrics for {kind}: {', '.join(unknown)}")
+    if not metrics:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="At least one metric is required")
+
+    group_columns = [dimensions[name].label(name) for name in group_by]
+    metric_columns = [
+        (func.count(model.id) if name == "count" else METRICS[name](model.amount)).label(name) for name in metrics
+    ]
+    query = select(*group_columns, *metric_columns).where(
+        model.user_id == user_id,
+        model.date >= start_date,
+        model.date < end_date,
+    )
+    if group_columns:
+        query = query.group_by(*group_columns).order_by(*group_columns)
+    return query
+
+
+def to_columns(rows, group_by: Sequence[str], metrics: Sequence[str]) -> Dict[str, List]:
+    """Turn result rows into {column: [values]} arrays, one entry per group."""
+    names = list(group_by) + list(metrics)
+    columns = {name: [] for name in names}
+    for row in rows:
+        for name, value in zip(names, row):
+            columns[name].append(value.isoformat() if isinstance(value, date) else value)
+    return columns
+
+
+def aggregate(db: Session, kind: str, user_id: int, start_date: date, end_date: date,
+              group_by: Sequence[str] = (), metrics: Sequence[str] = ("sum",)) -> Dict[str, List]:
+    """Run build_aggregate_query on a sync session and return the columnar result."""
+    query = build_aggregate_query(kind, user_id, start_date, end_date, group_by, metrics)
+    return to_columns(db.execute(query).all(), group_by, metrics)
@@ -1,13 +1,21 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+import asyncio
+import threading
+import time
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
+from database import get_db, get_async_db
 import models
 from dotenv import load_dotenv
 import os
@@ -21,15 +29,146 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 PASSWORD_RESET_TOKEN_EXPIRE_MINUTES = 15 # New: Expiry for password reset tokens
 REFRESH_TOKEN_EXPIRE_DAYS = 7 # New: Expiry for refresh tokens
+# Authenticated user cache, skips the users lookup on repeated requests with the same token (0 disables it)
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", "1024"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost factor; hashes with a different cost are flagged by needs_update and rehashed on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Hashing runs in its own small pool so a burst of logins can't take every request thread
+# Default to half the cores so hashing can't take the CPU away from request handling
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# "process" by default: passlib's os_crypt fallback (used when the bcrypt package isn't installed) holds the GIL
+# for the whole hash, which would stall the event loop from a thread; "thread" is fine with the bcrypt package
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "process")
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))  # running + queued, beyond that 503
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
+# For routes that also serve anonymous requests, a missing token isn't an error there
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token", auto_error=False)
+
+# Module level so ProcessPoolExecutor can pickle them
+def _hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+_hash_executor = None
+_hash_lock = threading.Lock()
+_hash_pending = 0
+_hash_rejected = 0
+_hash_pool_rebuilds = 0
+
+def _get_hash_executor():
+    global _hash_executor
+    if _hash_executor is None:
+        if PASSWORD_HASH_EXECUTOR == "process":
+            # Lower priority workers: on a busy box the scheduler serves request handling first. os.nice is
+            # POSIX only, on Windows the workers keep the default priority
+            lower_priority = {"initializer": os.nice, "initargs": (10,)} if hasattr(os, "nice") else {}
+            _hash_executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, **lower_priority)
+        else:
+            _hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+    return _hash_executor
+
+def _replace_broken_executor(broken) -> None:
+    """Drop a process pool broken by a dead worker (OOM kill, segfault), the next job starts a new one."""
+    global _hash_executor, _hash_pool_rebuilds
+    with _hash_lock:
+        if _hash_executor is not broken:
+            return  # Another job replaced it already
+        _hash_executor = None
+        _hash_pool_rebuilds += 1
+    broken.shutdown(wait=False)
+
+def _copy_future(source: Future, target: Future) -> None:
+    if target.cancelled():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+def _submit_to_hash_executor(fn, args, retry: bool = True) -> Future:
+    """Submit to the pool; a broken pool is recreated and the job resubmitted once, whether it broke before the
+    job was queued or while it ran."""
+    executor = _get_hash_executor()
+    try:
+        future = executor.submit(fn, *args)
+    except BrokenProcessPool:
+        if not retry:
+            raise
+        _replace_broken_executor(executor)
+        return _submit_to_hash_executor(fn, args, retry=False)
+    if not retry:
+        return future
+
+    retried = Future()
+    def resubmit_if_broken(done: Future) -> None:
+        if done.cancelled() or not isinstance(done.exception(), BrokenProcessPool):
+            _copy_future(done, retried)
+            return
+        _replace_broken_executor(executor)
+        try:
+            _submit_to_hash_executor(fn, args, retry=False).add_done_callback(lambda again: _copy_future(again, retried))
+        except Exception as e:
+            retried.set_exception(e)
+    future.add_done_callback(resubmit_if_broken)
+    return retried
+
+def _release_hash_slot(_future) -> None:
+    global _hash_pending
+    with _hash_lock:
+        _hash_pending -= 1
+
+def _submit_hash_job(fn, *args) -> Future:
+    """Queue a hashing job, or fail fast with 503 when PASSWORD_HASH_MAX_PENDING jobs are already waiting."""
+    global _hash_pending, _hash_rejected
+    with _hash_lock:
+        if _hash_pending >= PASSWORD_HASH_MAX_PENDING:
+            _hash_rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-in attempts in progress, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        _hash_pending += 1
+    try:
+        future = _submit_to_hash_executor(fn, args)
+    except BaseException:
+        _release_hash_slot(None)
+        raise
+    future.add_done_callback(_release_hash_slot)
+    return future
+
+def password_hash_pool_stats() -> dict:
+    with _hash_lock:
+        return {"pending": _hash_pending, "rejected": _hash_rejected, "pool_rebuilds": _hash_pool_rebuilds,
+                "workers": PASSWORD_HASH_WORKERS,
+                "executor": PASSWORD_HASH_EXECUTOR, "max_pending": PASSWORD_HASH_MAX_PENDING, "bcrypt_rounds": BCRYPT_ROUNDS}
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return _submit_hash_job(_verify_and_update_password, plain_password, hashed_password).result()[0]
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return _submit_hash_job(_hash_password, password).result()
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify without blocking the event loop. Returns (valid, new hash if the stored one uses an outdated cost)."""
+    return await asyncio.wrap_future(_submit_hash_job(_verify_and_update_password, plain_password, hashed_password))
+
+async def get_password_hash_async(password: str) -> str:
+    return await asyncio.wrap_future(_submit_hash_job(_hash_password, password))
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -37,26 +176,118 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # iat keys the principal cache, a new login never reuses an older token's cache entry
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _decode_token(token: str) -> Tuple[int, Optional[int]]:
+    """Decode the access token and return (user id stored in its subject, issued-at timestamp)."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
+        user_id = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+            raise _credentials_exception()
+        return int(user_id), payload.get("iat")
+    except (JWTError, ValueError):
+        raise _credentials_exception()
+
+class PrincipalCache:
+    """Bounded TTL + LRU cache of authenticated users keyed by (user id, token iat).
+
+    Entries are detached copies of the user row, so they can be shared between requests and sessions.
+    Sync routes run in the threadpool, hence the lock.
+    """
+
+    def __init__(self, ttl_seconds: int, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (user_id, iat) -> (expires_at, user)
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[models.User]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, user: models.User) -> None:
+        if self.ttl_seconds <= 0 or self.max_size <= 0:
+            return
+        principal = models.User(**{column.key: getattr(user, column.key) for column in models.User.__table__.columns})
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries),
+                    "max_size": self.max_size, "ttl_seconds": self.ttl_seconds}
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_MAX_SIZE)
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    # Profile changes, password resets and last_login updates all go through the ORM
+    principal_cache.invalidate_user(target.id)
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    cache_key = _decode_token(token)
+    user = principal_cache.get(cache_key)
+    if user is not None:
+        return user
+    user = db.query(models.User).filter(models.User.id == cache_key[0]).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    principal_cache.put(cache_key, user)
+    return user
+
+def get_optional_current_user(token: Optional[str] = Depends(optional_oauth2_scheme), db: Session = Depends(get_db)) -> Optional[models.User]:
+    """get_current_user for routes that work without a login too: no token or an invalid one gives None."""
+    if not token:
+        return None
+    try:
+        return get_current_user(token, db)
+    except HTTPException:
+        return None
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """Async twin of get_current_user for async def routes, so auth doesn't take a threadpool slot."""
+    cache_key = _decode_token(token)
+    user = principal_cache.get(cache_key)
+    if user is not None:
+        return user
+    user = await db.get(models.User, cache_key[0])
+    if user is None:
+        raise _credentials_exception()
+    principal_cache.put(cache_key, user)
     return user
 
 def generate_password_reset_token(db: Session, user_id: int) -> str:
@@ -120,6 +351,18 @@ def create_refresh_token(db: Session, user_id: int) -> str:
     db.refresh(db_token)
     return token
 
+async def create_refresh_token_async(db: AsyncSession, user_id: int) -> str:
+    """Async twin of create_refresh_token for the async login route."""
+    token = str(uuid.uuid4())
+    db.add(models.RefreshToken(
+        user_id=user_id,
+        token=token,
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        is_active=True
+    ))
+    await db.commit()
+    return token
+
 def validate_refresh_token(db: Session, token: str) -> models.User:
     """
     Validates a refresh token and returns the associated user.
@@ -178,4 +421,5 @@ def revoke_all_user_refresh_tokens(db: Session, user_id: int) -> None:
         models.RefreshToken.user_id == user_id,
         models.RefreshToken.is_active == True
     ).update({"is_active": False})
-    db.commit() 
\ No newline at end of file
+    db.commit()
+    principal_cache.invalidate_user(user_id) 
\ No newline at end of file
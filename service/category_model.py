@@ -0,0 +1,160 @@
+import json
+import os
+import re
+from typing import List
+
+import numpy as np
+
+from service.category_service import normalize_merchant
+
+# Artifact format written by train_category_model.py, bump when the layout or featurization changes
+ARTIFACT_FORMAT = 1
+
+
+def murmurhash3_32(data: bytes, seed: int = 0) -> int:
+    """Signed 32-bit MurmurHash3 (x86_32), the hash scikit-learn's HashingVectorizer uses for tokens."""
+    c1, c2 = 0xCC9E2D51, 0x1B873593
+    h = seed & 0xFFFFFFFF
+    length = len(data)
+    tail_start = length - length % 4
+    for i in range(0, tail_start, 4):
+        k = int.from_bytes(data[i:i + 4], "little")
+        k = (k * c1) & 0xFFFFFFFF
+        k = ((k << 15) | (k >> 17)) & 0xFFFFFFFF
+        k = (k * c2) & 0xFFFFFFFF
+        h ^= k
+        h = ((h << 13) | (h >> 19)) & 0xFFFFFFFF
+        h = (h * 5 + 0xE6546B64) & 0xFFFFFFFF
+    k = 0
+    tail = data[tail_start:]
+    if len(tail) >= 3:
+        k ^= tail[2] << 16
+    if len(tail) >= 2:
+        k ^= tail[1] << 8
+    if tail:
+        k ^= tail[0]
+        k = (k * c1) & 0xFFFFFFFF
+        k = ((k << 15) | (k >> 17)) & 0xFFFFFFFF
+        k = (k * c2) & 0xFFFFFFFF
+        h ^= k
+    h ^= length
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & 0xFFFFFFFF
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & 0xFFFFFFFF
+    h ^= h >> 16
+    return h - (1 << 32) if h & 0x80000000 else h
+
+
+class HashingCategoryModel:
+    """Linear category classifier over hashed word n-grams, loaded from a memory-mapped float32 .npy.
+
+    Featurization matches scikit-learn's HashingVectorizer (lowercase, default token pattern, signed
+    murmurhash3, l2 norm) applied to the normalized merchant, so training can use scikit-learn while serving
+    only needs numpy. The weight matrix is stored feature-major, (n_features + 1, n_classes) with the
+    intercept as the last row: scoring a name reads one contiguous row per token, and every worker maps the
+    same file pages instead of unpickling its own copy.
+
+    Exposes classes_ and predict_proba like the scikit-learn pipeline, so it is a drop-in for the prediction
+    cache and the model loader.
+    """
+
+    token_pattern = re.compile(r"(?u)\b\w\w+\b")
+
+    def __init__(self, weights: np.ndarray, classes: List[str], n_features: int, ngram_range=(1, 1), metadata: dict = None):
+        self.weights = weights
+        self.classes_ = np.array(classes)
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+        self.metadata = metadata or {}
+
+    @staticmethod
+    def paths(path: str):
+        """(weights .npy, metadata .json) for an artifact path given with or without either extension."""
+        base = re.sub(r"\.(npy|json)$", "", path)
+        return f"{base}.npy", f"{base}.json"
+
+    @classmethod
+    def load(cls, path: str) -> "HashingCategoryModel":
+        weights_path, metadata_path = cls.paths(path)
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+        if metadata.get("format") != ARTIFACT_FORMAT:
+            raise ValueError(f"Unsupported category model format {metadata.get('format')}, expected {ARTIFACT_FORMAT}")
+        weights = np.load(weights_path, mmap_mode="r")
+        return cls(weights, metadata["classes"], metadata["n_features"], metadata["ngram_range"], metadata)
+
+    def save(self, path: str) -> None:
+        weights_path, metadata_path = self.paths(path)
+        np.save(weights_path, np.ascontiguousarray(self.weights, dtype=np.float32))
+        metadata = {**self.metadata, "format": ARTIFACT_FORMAT, "classes": self.classes_.tolist(),
+                    "n_features": self.n_features, "ngram_range": list(self.ngram_range)}
+        with open(metadata_path, "w") as f:
+            json.dump(metadata, f, indent=2)
+
+    def tokens(self, text: str) -> List[str]:
+        words = self.token_pattern.findall(normalize_merchant(text))
+        low, high = self.ngram_range
+        return [" ".join(words[i:i + n]) for n in range(low, high + 1) for i in range(len(words) - n + 1)]
+
+    def features(self, text: str):
+        """Hashed feature indices and l2-normalized signed counts of one name."""
+        counts = {}
+        for token in self.tokens(text):
+            h = murmurhash3_32(token.encode("utf-8"))
+            index = abs(h) % self.n_features if h != -2 ** 31 else (2 ** 31 - 1 - (self.n_features - 1)) % self.n_features
+            counts[index] = counts.get(index, 0.0) + (1.0 if h >= 0 else -1.0)
+        indices = np.fromiter(counts, dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        norm = np.sqrt(np.dot(values, values))
+        return indices, values / norm if norm else values
+
+    def decision_function(self, names: List[str]) -> np.ndarray:
+        scores = np.empty((len(names), len(self.classes_)), dtype=np.float64)
+        intercept = self.weights[self.n_features]
+        for row, name in enumerate(names):
+            indices, values = self.features(name)
+            scores[row] = values @ self.weights[indices] + intercept if len(indices) else intercept
+        return scores
+
+    def predict_proba(self, names: List[str]) -> np.ndarray:
+        scores = self.decision_function(names)
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        return scores / scores.sum(axis=1, keepdims=True)
+
+    def predict(self, names: List[str]) -> np.ndarray:
+        return self.classes_[self.decision_function(names).argmax(axis=1)]
+
+
+def list_model_versions(model_dir: str) -> List[str]:
+    """Trained versions in model_dir (v1, v2, ...), oldest first."""
+    if not os.path.isdir(model_dir):
+        return []
+    versions = [name for name in os.listdir(model_dir)
+                if re.fullmatch(r"v\d+", name) and os.path.exists(os.path.join(model_dir, name, "metadata.json"))]
+    return sorted(versions, key=lambda name: int(name[1:]))
+
+
+def resolve_model_version(model_dir: str, version: str) -> str:
+    """Directory of a version written by train_category_model.py, "latest" being the highest one."""
+    versions = list_model_versions(model_dir)
+    if version == "latest":
+        if not versions:
+            raise FileNotFoundError(f"No trained category model versions in {model_dir}")
+        version = versions[-1]
+    if version not in versions:
+        raise FileNotFoundError(f"Category model version {version} not found in {model_dir}")
+    return os.path.join(model_dir, version)
+
+
+def load_category_model(path: str):
+    """Load the category model at path: a version directory, a HashingCategoryModel artifact (.npy/.json) or a
+    joblib pickle."""
+    if os.path.isdir(path):
+        with open(os.path.join(path, "metadata.json")) as f:
+            path = os.path.join(path, json.load(f)["model_file"])
+    if path.endswith((".npy", ".json")):
+        return HashingCategoryModel.load(path)
+    import joblib  # pulls in scikit-learn, only needed for the pickled pipeline
+    return joblib.load(path)
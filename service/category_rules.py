@@ -0,0 +1,119 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+# (kind, pattern, category). Patterns are matched case-insensitively against the raw description:
+#   prefix   the description starts with the pattern ("UPI-CRED-" is a card bill, "PAID VIA CRED" isn't)
+#   keyword  the pattern appears as whole words anywhere, the leftmost keyword wins (the merchant comes
+#            before the payment note in UPI and card descriptions)
+# A space in a pattern matches any run of whitespace.
+# Prefix rules are checked first. Categories are the category model's class names.
+DEFAULT_RULES: List[Tuple[str, str, str]] = [
+    ("prefix", "UPI-CRED-", "Debt"),
+    ("prefix", "UPI-GROWW", "Saving"),
+    ("prefix", "UPI-ZERODHA", "Saving"),
+    ("prefix", "ACH D- HDFC MF", "Saving"),
+    ("keyword", "MUTUAL FUND", "Saving"),
+    ("keyword", "MUTUAL FUNDS", "Saving"),
+    ("keyword", "ICCL", "Saving"),
+    ("keyword", "GROWW", "Saving"),
+    ("keyword", "ZERODHA", "Saving"),
+    ("keyword", "SIP", "Saving"),
+    ("keyword", "SWIGGY", "Food"),
+    ("keyword", "ZOMATO", "Food"),
+    ("keyword", "ZEPTO", "Food"),
+    ("keyword", "BLINKIT", "Food"),
+    ("keyword", "BIGBASKET", "Food"),
+    ("keyword", "DOMINOS", "Food"),
+    ("keyword", "MCDONALDS", "Food"),
+    ("keyword", "STARBUCKS", "Food"),
+    ("keyword", "RESTAURANT", "Food"),
+    ("keyword", "RESTAURA", "Food"),  # UPI names are cut at 20 characters
+    ("keyword", "CAFE", "Food"),
+    ("keyword", "BAKERY", "Food"),
+    ("keyword", "BAKERS", "Food"),
+    ("keyword", "UBER", "Transportation"),
+    ("keyword", "OLA", "Transportation"),
+    ("keyword", "RAPIDO", "Transportation"),
+    ("keyword", "IRCTC", "Transportation"),
+    ("keyword", "FASTAG", "Transportation"),
+    ("keyword", "PETROL", "Transportation"),
+    ("keyword", "FUEL", "Transportation"),
+    ("keyword", "FILLING STATION", "Transportation"),
+    ("keyword", "INDIAN OIL", "Transportation"),
+    ("keyword", "HPCL", "Transportation"),
+    ("keyword", "BPCL", "Transportation"),
+    ("keyword", "ELECTRICITY", "Utility"),
+    ("keyword", "BESCOM", "Utility"),
+    ("keyword", "RECHARGE", "Utility"),
+    ("keyword", "RECHARGES", "Utility"),
+    ("keyword", "BROADBAND", "Utility"),
+    ("keyword", "NETFLIX", "Recreation"),
+    ("keyword", "SPOTIFY", "Recreation"),
+    ("keyword", "HOTSTAR", "Recreation"),
+    ("keyword", "BOOKMYSHOW", "Recreation"),
+    ("keyword", "PVR", "Recreation"),
+    ("keyword", "PHARMACY", "Health"),
+    ("keyword", "PHARMEASY", "Health"),
+    ("keyword", "APOLLO", "Health"),
+    ("keyword", "HOSPITAL", "Health"),
+    ("keyword", "CLINIC", "Health"),
+    ("keyword", "NOBROKER", "Housing"),
+    ("keyword", "HOUSE RENT", "Housing"),
+    ("keyword", "EMI", "Debt"),
+]
+
+
+def _trie_regex(patterns: List[str]) -> str:
+    """Regex for a set of literals compiled from their trie, e.g. CAFE, CAB -> CA(?:FE|B).
+
+    Shared prefixes are matched once, so a search is a single pass over the string whatever the number of
+    rules, and the longest pattern at a position wins.
+    """
+    trie: Dict = {}
+    for pattern in patterns:
+        node = trie
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def emit(node: Dict) -> str:
+        # Branches start with different characters, so their order doesn't matter
+        branches = [(r"\s+" if char == " " else re.escape(char)) + emit(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if "" in node:
+            # A pattern ends here: the greedy ? still tries the longer ones first
+            return f"(?:{'|'.join(branches)})?"
+        return branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+
+    return emit(trie)
+
+
+class RuleClassifier:
+    """Deterministic merchant rules compiled into two trie regexes (prefix and keyword), in front of the
+    category model."""
+
+    def __init__(self, rules: List[Tuple[str, str, str]]):
+        self.rules = {(kind, pattern.upper()): category for kind, pattern, category in rules}
+        prefixes = [pattern for kind, pattern in self.rules if kind == "prefix"]
+        keywords = [pattern for kind, pattern in self.rules if kind == "keyword"]
+        self._prefix = re.compile(rf"(?:{_trie_regex(prefixes)})", re.IGNORECASE) if prefixes else None
+        self._keyword = (re.compile(rf"(?<![A-Z0-9])(?:{_trie_regex(keywords)})(?![A-Z0-9])", re.IGNORECASE)
+                         if keywords else None)
+
+    def match(self, description: str) -> Optional[str]:
+        """The category of the first rule matching description, or None."""
+        if not description:
+            return None
+        if self._prefix is not None:
+            found = self._prefix.match(description)
+            if found:
+                return self.rules[("prefix", " ".join(found.group(0).upper().split()))]
+        if self._keyword is not None:
+            found = self._keyword.search(description)
+            if found:
+                return self.rules[("keyword", " ".join(found.group(0).upper().split()))]
+        return None
+
+rule_classifier = RuleClassifier(DEFAULT_RULES)
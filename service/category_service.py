@@ -0,0 +1,287 @@
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException, status
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+import models
+from service.category_rules import rule_classifier
+
+# The category model, loaded in the background after startup (relative to the working directory like before).
+# With CATEGORY_MODEL_VERSION set (v3, or latest) the model is that version from train_category_model.py instead.
+CATEGORY_MODEL_PATH = os.getenv("CATEGORY_MODEL_PATH", "categoryFinder.pkl")
+CATEGORY_MODEL_DIR = os.getenv("CATEGORY_MODEL_DIR", os.path.join("models", "category"))
+CATEGORY_MODEL_VERSION = os.getenv("CATEGORY_MODEL_VERSION", "")
+# How long a prediction request waits for a model that is still loading before getting a 503
+CATEGORY_MODEL_WAIT_SECONDS = float(os.getenv("CATEGORY_MODEL_WAIT_SECONDS", "5"))
+# Distinct merchants kept in the prediction cache, a probability row is one float per category
+CATEGORY_CACHE_MAX_SIZE = int(os.getenv("CATEGORY_CACHE_MAX_SIZE", "10000"))
+
+# Noise that varies between transactions of the same merchant. Applied in order, each match becomes a space.
+_NOISE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r"[\w.]+@[\w.]+",                                      # UPI handles / VPAs: merchant@okhdfcbank
+    r"\b[A-Z]{4}0[A-Z0-9]{6}\b",                           # IFSC codes: HDFC0MERUPI
+    r"\b\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}\b",                # dates: 12-01-2025, 2025/01/12, 12.01.25
+    r"\b\d{1,2}\s?(?:JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|OCT|NOV|DEC)[A-Z]*\s?\d{2,4}\b",  # 12JAN25, 12 Jan 2025
+    r"\b\w*\d{4,}\w*\b",                                    # reference ids, account and card numbers: 546764572896, XXXX1234
+    r"\b(?:UPI|NEFT|IMPS|RTGS|POS|ACH|NACH|ECS|MMT|BIL|INF|VPS|IPS|REF|TXN|UTR|NO)\b",  # payment rails and labels
+    r"[^\w\s]",                                            # punctuation, the vectorizer splits on it anyway
+)]
+
+
+def normalize_merchant(description: str) -> str:
+    """Reduce a transaction description to a merchant key by stripping reference ids, dates, account numbers
+    and bank handles, e.g. "UPI-SWIGGY-SWIGGY8@YBL-YESB0YBLUPI-512345678901-Order" -> "swiggy order".
+
+    Only tokens the category model has no use for are removed, so predicting on the key gives the same
+    category as predicting on the raw description.
+    """
+    text = description or ""
+    for pattern in _NOISE_PATTERNS:
+        text = pattern.sub(" ", text)
+    return " ".join(text.lower().split())
+
+
+class PredictionCache:
+    """LRU cache of category probability rows keyed by normalized merchant.
+
+    Bound to one model: handing it a different model (a reload) drops every entry. Sync routes run in the
+    threadpool, hence the lock.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._model = None
+        self._entries = OrderedDict()  # merchant key -> probability row
+        self._lock = threading.Lock()
+
+    def predict_proba(self, model, names: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (classes, probabilities) for names, running the model once over the keys not cached yet."""
+        keys = [normalize_merchant(name) for name in names]
+        rows, missing = {}, {}
+        with self._lock:
+            if model is not self._model:
+                self._entries.clear()
+                self._model = model
+            for key in keys:
+                # A merchant repeated within the same call is scored once, only its first occurrence is a miss
+                if key in rows or key in missing:
+                    self.hits += 1
+                    continue
+                row = self._entries.get(key)
+                if row is None:
+                    self.misses += 1
+                    missing[key] = None
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                rows[key] = row
+        missing = list(missing)
+        if missing:
+            # Model inference outside the lock, concurrent requests for other merchants don't wait on it
+            for key, row in zip(missing, model.predict_proba(missing)):
+                rows[key] = row
+            self._put_many(model, missing, rows)
+        return model.classes_, np.array([rows[key] for key in keys]).reshape(len(keys), len(model.classes_))
+
+    def predict(self, model, names: List[str]) -> List[str]:
+        classes, probabilities = self.predict_proba(model, names)
+        return [classes[i] for i in probabilities.argmax(axis=1)]
+
+    def cached(self, keys: List[str]) -> Dict[str, str]:
+        """Top category of the keys already scored, without running the model or touching the LRU order."""
+        with self._lock:
+            if self._model is None:
+                return {}
+            classes = self._model.classes_
+            return {key: classes[self._entries[key].argmax()] for key in keys if key in self._entries}
+
+    def _put_many(self, model, keys: List[str], rows: dict) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if model is not self._model:
+                return
+            for key in keys:
+                self._entries[key] = rows[key]
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                    "size": len(self._entries), "max_size": self.max_size}
+
+prediction_cache = PredictionCache(CATEGORY_CACHE_MAX_SIZE)
+
+
+class ModelLoader:
+    """Loads the category model once, in a background thread, so importing main doesn't pay for scikit-learn.
+
+    start() is called from the app startup hook; get() starts the load itself if nothing did (scripts, tests)
+    and waits up to CATEGORY_MODEL_WAIT_SECONDS for it before answering 503.
+    """
+
+    def __init__(self, path: str, version: str = "", model_dir: str = CATEGORY_MODEL_DIR):
+        self.path = path
+        self.version = version
+        self.model_dir = model_dir
+        self.load_seconds = None
+        self._model = None
+        self._error = None
+        self._ready = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._load, name="category-model-loader", daemon=True)
+                self._thread.start()
+
+    def _load(self) -> None:
+        started = time.perf_counter()
+        try:
+            # joblib and scikit-learn (for a pickled pipeline) are only imported here
+            from service.category_model import load_category_model, resolve_model_version
+            if self.version:
+                self.path = resolve_model_version(self.model_dir, self.version)
+                self.version = os.path.basename(self.path)
+            self._model = load_category_model(self.path)
+        except Exception as e:
+            self._error = e
+            print(f"Failed to load category model from {self.path}: {e}")
+        finally:
+            self.load_seconds = round(time.perf_counter() - started, 3)
+            self._ready.set()
+
+    def get(self, timeout: float = CATEGORY_MODEL_WAIT_SECONDS):
+        self.start()
+        if not self._ready.wait(timeout):
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Category model is still loading, try again shortly",
+                                headers={"Retry-After": "1"})
+        if self._error is not None:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail=f"Category model is unavailable: {self._error}")
+        return self._model
+
+    def get_if_ready(self):
+        """The model if it has finished loading, else None (never waits)."""
+        self.start()
+        return self._model if self._ready.is_set() else None
+
+    async def get_async(self, timeout: float = CATEGORY_MODEL_WAIT_SECONDS):
+        """get() for async routes, waits in a worker thread instead of blocking the event loop."""
+        if self._ready.is_set():
+            return self.get()
+        return await asyncio.to_thread(self.get, timeout)
+
+    def stats(self) -> dict:
+        return {"path": self.path, "version": self.version or None, "ready": self._ready.is_set() and self._error is None,
+                "load_seconds": self.load_seconds, "error": str(self._error) if self._error else None}
+
+model_loader = ModelLoader(CATEGORY_MODEL_PATH, CATEGORY_MODEL_VERSION)
+
+
+def get_overrides(db: Session, user_id: int, names: List[str]) -> List[Optional[int]]:
+    """The user's own category id for each name's merchant (None where there is none), in one query."""
+    keys = [normalize_merchant(name) for name in names]
+    wanted = {key for key in keys if key}
+    if not wanted:
+        return [None] * len(keys)
+    overrides = dict(db.execute(
+        select(models.MerchantCategoryOverride.merchant_key, models.MerchantCategoryOverride.category_id).where(
+            models.MerchantCategoryOverride.user_id == user_id,
+            models.MerchantCategoryOverride.merchant_key.in_(wanted),
+        )
+    ).all())
+    return [overrides.get(key) for key in keys]
+
+
+def learn_from_expenses(db: Session, user_id: int, rows: List[dict], categories: Dict[int, str]) -> None:
+    """Record the user's corrections from newly saved expenses (dicts with name, category_id and optionally
+    suggested_category).
+
+    A merchant saved with a category other than the one the user was offered gets (or updates) an override,
+    one saved with the offered category again drops it. The offer is the suggested_category the client sent
+    back, else resolved like the prediction endpoints do without running the model: the user's override, a
+    merchant rule, then the prediction cache's entry. Merchants with none of these are left as they are. One upsert per corrected merchant, no retraining. Runs on the caller's
+    session, so it commits or rolls back together with the expenses.
+    """
+    # Last category wins when a batch has the same merchant more than once
+    saved, names, offered = {}, {}, {}
+    for row in rows:
+        key = normalize_merchant(row.get("name") or "")
+        if key:
+            saved[key] = row["category_id"]
+            names[key] = row["name"]
+            if row.get("suggested_category"):
+                offered[key] = row["suggested_category"]
+            else:
+                offered.pop(key, None)
+    unoffered = [key for key in saved if key not in offered]
+    if unoffered:
+        overrides = get_overrides(db, user_id, [names[key] for key in unoffered])
+        for key, override in zip(unoffered, overrides):
+            category = categories.get(override) or rule_classifier.match(names[key])
+            if category:
+                offered[key] = category
+        offered.update(prediction_cache.cached([key for key in unoffered if key not in offered]))
+    saved = {key: category_id for key, category_id in saved.items() if key in offered}
+    if not saved:
+        return
+    predicted = [offered[key] for key in saved]
+
+    corrected = [(key, category_id) for (key, category_id), category in zip(saved.items(), predicted)
+                 if categories.get(category_id) != category]
+    agreed = {key: category_id for (key, category_id), category in zip(saved.items(), predicted)
+              if categories.get(category_id) == category}
+
+    if corrected:
+        stmt = insert(models.MerchantCategoryOverride).values([
+            {"user_id": user_id, "merchant_key": key, "category_id": category_id, "corrections": 1,
+             "updated_at": datetime.now()}
+            for key, category_id in corrected
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["user_id", "merchant_key"],
+            set_={
+                "category_id": stmt.excluded.category_id,
+                "corrections": models.MerchantCategoryOverride.corrections + 1,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        ))
+    if agreed:
+        # The offer may have been the user's own override, keeping its category doesn't drop it
+        overrides = db.execute(select(models.MerchantCategoryOverride.merchant_key,
+                                      models.MerchantCategoryOverride.category_id).where(
+            models.MerchantCategoryOverride.user_id == user_id,
+            models.MerchantCategoryOverride.merchant_key.in_(list(agreed)),
+        )).all()
+        dropped = [key for key, category_id in overrides if agreed[key] != category_id]
+        if dropped:
+            db.execute(delete(models.MerchantCategoryOverride).where(
+                models.MerchantCategoryOverride.user_id == user_id,
+                models.MerchantCategoryOverride.merchant_key.in_(dropped),
+            ))
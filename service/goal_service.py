@@ -0,0 +1,62 @@
+from datetime import datetime
+from typing import List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+import models
+
+GOAL_CATEGORY_IDS = (7, 8)  # "Saving Goal" and "Saving Goal Redeemed"
+
+
+def link_goal_savings(db: Session) -> Tuple[List[models.GoalAllocation], List[models.Saving]]:
+    """Create the allocations of goal savings records that have none, matching each record to its goal by name
+    like goals were linked before goal_allocations. Returns the new allocations (added, not committed) and the
+    records without a goal of that name."""
+    already_linked = db.query(models.GoalAllocation.saving_id).filter(models.GoalAllocation.saving_id.isnot(None))
+    goal_savings = db.query(models.Saving, models.SavingGoal.id).outerjoin(
+        models.SavingGoal,
+        (models.SavingGoal.user_id == models.Saving.user_id) & (models.SavingGoal.name == models.Saving.name)
+    ).filter(
+        models.Saving.category_id.in_(GOAL_CATEGORY_IDS),
+        models.Saving.id.not_in(already_linked)
+    ).order_by(models.Saving.id, models.SavingGoal.id).all()
+
+    allocations, unmatched, seen = [], [], set()
+    for saving_record, goal_id in goal_savings:
+        if saving_record.id in seen:
+            continue  # Several goals share the name, the first one gets it like the name lookup did
+        seen.add(saving_record.id)
+        if goal_id is None:
+            unmatched.append(saving_record)
+            continue
+        allocations.append(models.GoalAllocation(
+            user_id=saving_record.user_id,
+            saving_goal_id=goal_id,
+            saving_id=saving_record.id,
+            amount=saving_record.amount,
+            date=saving_record.date,
+            created_at=saving_record.created_at or datetime.now(),
+            note=f"Migrated from saving record (category {'Saving Goal' if saving_record.category_id == 7 else 'Saving Goal Redeemed'})"
+        ))
+    db.add_all(allocations)
+    return allocations, unmatched
+
+
+def ensure_goal_allocations(db: Session) -> None:
+    """Link goal savings to their goals once when goal_allocations is empty (first start after upgrading without
+    running migrations/migrate_saving_goals_to_allocations.py), goal totals only come from allocations."""
+    # Tables created by an early version of the migration lack saving_id and the lookup indexes
+    connection = db.connection()
+    columns = {column["name"] for column in inspect(connection).get_columns(models.GoalAllocation.__tablename__)}
+    if "saving_id" not in columns:
+        connection.execute(text("ALTER TABLE goal_allocations ADD COLUMN saving_id INTEGER REFERENCES savings (id)"))
+        for index in models.GoalAllocation.__table__.indexes:
+            index.create(bind=connection, checkfirst=True)
+        db.commit()
+    if db.query(models.GoalAllocation.id).first() is not None:
+        return
+    allocations, unmatched = link_goal_savings(db)
+    if allocations:
+        db.commit()
+        print(f"Backfilled {len(allocations)} goal allocations ({len(unmatched)} goal savings without a matching goal)")
@@ -0,0 +1,174 @@
+from datetime import datetime
+from typing import List, Tuple
+
+from sqlalchemy import and_, case, func, inspect, literal, select, text, update, Date, DateTime
+from sqlalchemy.orm import Session
+
+import models
+
+GOAL_CATEGORY_ID = 7  # "Saving Goal" saving category, locked money that only lowers the real balance
+
+# Float counters drift slightly when maintained incrementally, anything below this is not reported
+DRIFT_TOLERANCE = 0.01
+
+
+def compute_balances(db: Session, account: models.Account) -> Tuple[float, float]:
+    """Recompute (apparent_balance, real_balance) from scratch.
+
+    Apparent balance = DB balance + (income - expenses - savings excluding saving goals) of the records
+    created after the account's last manual update and dated on/after that day.
+    Real balance = apparent balance - ALL "Saving Goal" savings (money locked away in saving goals).
+    """
+    account_modified_date = account.modified_at.date()
+
+    relevant_income = db.query(func.sum(models.Income.amount)).filter(
+        models.Income.user_id == account.user_id,
+        models.Income.created_at > account.modified_at,
+        models.Income.date >= account_modified_date
+    ).scalar() or 0
+
+    relevant_expenses = db.query(func.sum(models.Expense.amount)).filter(
+        models.Expense.user_id == account.user_id,
+        models.Expense.created_at > account.modified_at,
+        models.Expense.date >= account_modified_date
+    ).scalar() or 0
+
+    relevant_savings_non_goal = db.query(func.sum(models.Saving.amount)).filter(
+        models.Saving.user_id == account.user_id,
+        models.Saving.created_at > account.modified_at,
+        models.Saving.date >= account_modified_date,
+        models.Saving.category_id != GOAL_CATEGORY_ID
+    ).scalar() or 0
+
+    all_saving_goals = db.query(func.sum(models.Saving.amount)).filter(
+        models.Saving.user_id == account.user_id,
+        models.Saving.category_id == GOAL_CATEGORY_ID
+    ).scalar() or 0
+
+    apparent_balance = account.balance + relevant_income - relevant_expenses - relevant_savings_non_goal
+    return apparent_balance, apparent_balance - all_saving_goals
+
+
+def _write_snapshot(db: Session, account_id: int, apparent_balance: float, real_balance: float) -> None:
+    db.execute(
+        update(models.Account)
+        .where(models.Account.id == account_id)
+        # Keep modified_at as is: onupdate would otherwise turn a counter write into a "manual update"
+        .values(apparent_balance=apparent_balance, real_balance=real_balance, modified_at=models.Account.modified_at)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def refresh_account_snapshot(db: Session, account: models.Account) -> None:
+    """Reset the snapshot counters after the account itself changed (create, manual update, goal redeem)."""
+    db.flush()  # pending account/record changes must be visible to the recompute queries
+    apparent_balance, real_balance = compute_balances(db, account)
+    _write_snapshot(db, account.id, apparent_balance, real_balance)
+
+
+def _apply_record(db: Session, kind: str, record, sign: int, created_at: datetime | None) -> None:
+    """Atomically add (sign=1) or remove (sign=-1) a record's effect on its owner's balance counters."""
+    amount = record.amount * sign
+    if kind == "saving" and record.category_id == GOAL_CATEGORY_ID:
+        # Saving goal money only lowers the real balance and counts regardless of modified_at
+        apparent_change, real_change = literal(0.0), literal(-amount)
+    else:
+        delta = amount if kind == "income" else -amount
+        # Same rule as compute_balances, evaluated against the row's current modified_at inside the UPDATE
+        qualifies = and_(
+            literal(created_at, DateTime) > models.Account.modified_at,
+            literal(record.date, Date) >= func.date(models.Account.modified_at),
+        )
+        apparent_change = real_change = case((qualifies, delta), else_=0.0)
+
+    db.execute(
+        update(models.Account)
+        .where(models.Account.user_id == record.user_id)
+        .values(
+            apparent_balance=models.Account.apparent_balance + apparent_change,
+            real_balance=models.Account.real_balance + real_change,
+            # Keep modified_at as is: onupdate would otherwise turn every record write into a "manual update"
+            modified_at=models.Account.modified_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def record_added(db: Session, kind: str, record) -> None:
+    """Apply a new expense/income/saving to the owner's balance snapshot."""
+    # created_at is filled by the column default at flush time, new records are created "now"
+    _apply_record(db, kind, record, 1, record.created_at or datetime.now())
+
+
+def records_added(db: Session, kind: str, user_id: int, rows: List[dict], created_at: datetime) -> None:
+    """Apply a batch of new records (dicts with date, category_id, amount) in a single UPDATE.
+
+    Runs after the batch's INSERT in the same transaction, so the write lock is already held and modified_at
+    can't change between reading it here and the UPDATE.
+    """
+    modified_at = db.execute(
+        select(models.Account.modified_at).where(models.Account.user_id == user_id)
+    ).scalar_one_or_none()
+    if modified_at is None:
+        return
+
+    goal_total = qualifying_change = 0.0
+    for row in rows:
+        if kind == "saving" and row["category_id"] == GOAL_CATEGORY_ID:
+            goal_total += row["amount"]
+        # Same rule as compute_balances, all rows share created_at
+        elif created_at > modified_at and row["date"] >= modified_at.date():
+            qualifying_change += row["amount"] if kind == "income" else -row["amount"]
+
+    db.execute(
+        update(models.Account)
+        .where(models.Account.user_id == user_id)
+        .values(
+            apparent_balance=models.Account.apparent_balance + qualifying_change,
+            real_balance=models.Account.real_balance + qualifying_change - goal_total,
+            modified_at=models.Account.modified_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def record_removed(db: Session, kind: str, record) -> None:
+    """Reverse a deleted expense/income/saving from the owner's balance snapshot."""
+    _apply_record(db, kind, record, -1, record.created_at)
+
+
+def check_account_snapshots(db: Session, fix: bool = False) -> List[dict]:
+    """Recompute every account's counters from scratch and return the ones that drifted (optionally fixing them)."""
+    drift = []
+    for account in db.query(models.Account).all():
+        apparent_balance, real_balance = compute_balances(db, account)
+        if (account.apparent_balance is None or account.real_balance is None
+                or abs(account.apparent_balance - apparent_balance) > DRIFT_TOLERANCE
+                or abs(account.real_balance - real_balance) > DRIFT_TOLERANCE):
+            drift.append({
+                "account_id": account.id, "user_id": account.user_id,
+                "stored_apparent_balance": account.apparent_balance, "expected_apparent_balance": apparent_balance,
+                "stored_real_balance": account.real_balance, "expected_real_balance": real_balance,
+            })
+            if fix:
+                _write_snapshot(db, account.id, apparent_balance, real_balance)
+    if fix:
+        db.commit()
+    return drift
+
+
+def ensure_account_snapshot(db: Session) -> None:
+    """Add and backfill the balance snapshot columns when missing (first start after upgrading without running
+    migrations/add_account_ledger_snapshot.py)."""
+    connection = db.connection()
+    columns = {column["name"] for column in inspect(connection).get_columns(models.Account.__tablename__)}
+    missing = [column for column in ("apparent_balance", "real_balance") if column not in columns]
+    if not missing:
+        return
+    for column in missing:
+        connection.execute(text(f"ALTER TABLE accounts ADD COLUMN {column} FLOAT DEFAULT 0 NOT NULL"))
+    for index in models.Account.__table__.indexes:
+        index.create(bind=connection, checkfirst=True)
+    db.commit()
+    backfilled = check_account_snapshots(db, fix=True)
+    print(f"Added the account balance snapshot, backfilled {len(backfilled)} accounts")
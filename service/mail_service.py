@@ -5,11 +5,10 @@ from sqlalchemy.orm import Session
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 import smtplib
-from sqlalchemy import func
 import os
 from dotenv import load_dotenv
 from database import get_db
-from . import chart_service
+from . import analytics_service, chart_service
 import jinja2
 
 load_dotenv()
@@ -66,31 +65,18 @@ def _send_monthly_report_logic(db: Session, year: int, month: int, user_id: int)
 
     template_file = 'email_templates/monthly_report_template.html' if budget else 'email_templates/monthly_report_template_no_budget.html'
 
-    expenses = db.query(models.Expense).filter(
-        models.Expense.date >= start_date,
-        models.Expense.date < end_date,
-        models.Expense.user_id == user_id
-    ).all()
-
-    total_spent = sum(expense.amount for expense in expenses)
+    # Totals and category sums are computed in SQL, only the three top expenses are loaded as rows
+    total_spent = analytics_service.aggregate(db, "expense", user_id, start_date.date(), end_date.date())["sum"][0] or 0
     total_saved = (budget.monthly_income - total_spent) if budget else 0
 
     last_month_start = start_date - relativedelta(months=1)
-    past_expenses = db.query(models.Expense).filter(
-        models.Expense.date >= last_month_start,
-        models.Expense.date < start_date,
-        models.Expense.user_id == user_id
-    ).all()
-    past_total_spent = sum(expense.amount for expense in past_expenses)
+    past_total_spent = analytics_service.aggregate(db, "expense", user_id, last_month_start.date(), start_date.date())["sum"][0] or 0
     percent_change_expenses = ((total_spent - past_total_spent) / past_total_spent * 100) if past_total_spent > 0 else "N/A"
 
     overspent_categories = []
     if budget and budget.category_budgets:
-        category_expenses_q = db.query(models.Expense.category_id, func.sum(models.Expense.amount).label('total'))\
-            .filter(models.Expense.date >= start_date, models.Expense.date < end_date, models.Expense.user_id == user_id)\
-            .group_by(models.Expense.category_id).all()
-
-        category_expenses = {item.category_id: item.total for item in category_expenses_q}
+        category_columns = analytics_service.aggregate(db, "expense", user_id, start_date.date(), end_date.date(), group_by=["category"])
+        category_expenses = dict(zip(category_columns["category"], category_columns["sum"]))
 
         for cat_id, total_spent_for_cat in category_expenses.items():
             budget_for_cat = budget.category_budgets.get(str(cat_id))
@@ -100,7 +86,11 @@ def _send_monthly_report_logic(db: Session, year: int, month: int, user_id: int)
     budget_used_percent = (total_spent / budget.monthly_income * 100) if budget and budget.monthly_income > 0 else 0
     savings_goal_reached = total_saved >= budget.saving_goal if budget else False
 
-    top_expenses = sorted(expenses, key=lambda x: x.amount, reverse=True)[:3]
+    top_expenses = db.query(models.Expense).filter(
+        models.Expense.date >= start_date,
+        models.Expense.date < end_date,
+        models.Expense.user_id == user_id
+    ).order_by(models.Expense.amount.desc()).limit(3).all()
     top_expense_1 = f"{top_expenses[0].name} of amount ₹{top_expenses[0].amount:,.2f} on {top_expenses[0].date.strftime('%Y-%m-%d')}" if len(top_expenses) > 0 else "N/A"
     top_expense_2 = f"{top_expenses[1].name} of amount ₹{top_expenses[1].amount:,.2f} on {top_expenses[1].date.strftime('%Y-%m-%d')}" if len(top_expenses) > 1 else "N/A"
     top_expense_3 = f"{top_expenses[2].name} of amount ₹{top_expenses[2].amount:,.2f} on {top_expenses[2].date.strftime('%Y-%m-%d')}" if len(top_expenses) > 2 else "N/A"
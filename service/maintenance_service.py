@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+import models
+
+# Rows deleted per transaction, keeps each write lock short so requests aren't blocked by a big purge
+TOKEN_PURGE_BATCH_SIZE = int(os.getenv("TOKEN_PURGE_BATCH_SIZE", "1000"))
+TOKEN_PURGE_INTERVAL_MINUTES = int(os.getenv("TOKEN_PURGE_INTERVAL_MINUTES", "60"))
+
+_purge_lock = threading.Lock()
+_purge_stats = {
+    "runs": 0,
+    "last_run_at": None,
+    "last_duration_ms": None,
+    "last_purged": {"refresh_tokens": 0, "password_reset_tokens": 0},
+    "total_purged": {"refresh_tokens": 0, "password_reset_tokens": 0},
+}
+
+
+def _delete_in_batches(db: Session, model, *conditions, batch_size: int) -> int:
+    """Delete the rows matching conditions batch_size at a time, committing after every batch."""
+    deleted = 0
+    while True:
+        batch = select(model.id).where(*conditions).limit(batch_size)
+        result = db.execute(delete(model).where(model.id.in_(batch)).execution_options(synchronize_session=False))
+        db.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+
+def purge_tokens(db: Session, now: datetime | None = None, batch_size: int = TOKEN_PURGE_BATCH_SIZE) -> dict:
+    """Delete revoked or expired refresh tokens and expired password reset tokens. Returns rows deleted per table."""
+    now = now or datetime.utcnow()  # token expiries are stored in UTC
+    started = time.perf_counter()
+    # Two deletes instead of an OR so both walk the (is_active, expires_at) index
+    refresh_tokens = _delete_in_batches(db, models.RefreshToken, models.RefreshToken.is_active == False,
+                                        batch_size=batch_size)
+    refresh_tokens += _delete_in_batches(db, models.RefreshToken, models.RefreshToken.is_active == True,
+                                         models.RefreshToken.expires_at < now, batch_size=batch_size)
+    password_reset_tokens = _delete_in_batches(db, models.PasswordResetToken, models.PasswordResetToken.expires_at < now,
+                                               batch_size=batch_size)
+    duration_ms = (time.perf_counter() - started) * 1000
+
+    purged = {"refresh_tokens": refresh_tokens, "password_reset_tokens": password_reset_tokens}
+    with _purge_lock:
+        _purge_stats["runs"] += 1
+        _purge_stats["last_run_at"] = datetime.now()
+        _purge_stats["last_duration_ms"] = round(duration_ms, 1)
+        _purge_stats["last_purged"] = purged
+        for table, count in purged.items():
+            _purge_stats["total_purged"][table] += count
+    return purged
+
+
+def token_purge_stats() -> dict:
+    with _purge_lock:
+        return {**_purge_stats, "last_purged": dict(_purge_stats["last_purged"]),
+                "total_purged": dict(_purge_stats["total_purged"])}
+
+
+def scheduled_token_purge_job():
+    """
+    Scheduled job to purge revoked/expired refresh tokens and expired password reset tokens.
+    """
+    db = SessionLocal()
+    try:
+        purged = purge_tokens(db)
+        print(f"Scheduler: Purged {purged['refresh_tokens']} refresh tokens and "
+              f"{purged['password_reset_tokens']} password reset tokens in {_purge_stats['last_duration_ms']} ms.")
+    except Exception as e:
+        db.rollback()
+        print(f"Scheduler: Token purge failed: {e}")
+    finally:
+        db.close()
@@ -0,0 +1,58 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, tuple_, literal, Date, DateTime, Integer, String
+
+# Response header carrying the cursor of the next page, the body stays a plain list for older clients
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _created_at(model, column):
+    """A created_at (the model's column or the cursor's value) as ordered and compared by the keyset cursor.
+
+    Where the column is nullable (savings) NULL becomes '', which sorts before every timestamp: a NULL would make
+    the row-value comparison NULL and drop the row from every page.
+    """
+    if model.__table__.c.created_at.nullable:
+        return func.coalesce(column, literal("", String))
+    return column
+
+
+def order_by_newest(model) -> tuple:
+    """Newest-first ORDER BY matching the keyset cursor and the (user_id, date, created_at) index.
+
+    id breaks ties between records created in the same instant.
+    """
+    return model.date.desc(), _created_at(model, model.created_at).desc(), model.id.desc()
+
+
+def encode_cursor(record) -> str:
+    """Opaque cursor pointing just after `record` in newest-first order."""
+    payload = [record.date.isoformat(), record.created_at.isoformat() if record.created_at else None, record.id]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[date, datetime | None, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        record_date, created_at, record_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (date.fromisoformat(record_date),
+                datetime.fromisoformat(created_at) if created_at else None,
+                int(record_id))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor")
+
+
+def keyset_filter(model, cursor: str):
+    """WHERE clause selecting the records that come after the cursor in newest-first order.
+
+    A row-value comparison lets SQLite seek straight to the cursor position in the index instead of
+    stepping over every earlier row like OFFSET does.
+    """
+    record_date, created_at, record_id = decode_cursor(cursor)
+    return tuple_(model.date, _created_at(model, model.created_at), model.id) < tuple_(
+        literal(record_date, Date), _created_at(model, literal(created_at, DateTime)), literal(record_id, Integer)
+    )
@@ -1,14 +1,18 @@
+import codecs
+import hashlib
+import io
+import itertools
 import os
+import re
 from datetime import datetime
 import xlrd
 import openpyxl
-from fuzzywuzzy import process
+from rapidfuzz import fuzz, process, utils
 import csv
 
 
-def match_column(possible_names, actual_columns):
-    match, score = process.extractOne(possible_names, actual_columns)
-    return match if score > 80 else None
+# Similarity (0-100, fuzzywuzzy's WRatio) a cell needs to fuzzy-match a column name
+HEADER_MATCH_SCORE = 80
 
 target_fields = {
     'date': ['date', 'transaction date', 'value date','Txn Date', 'Expense Date'],
@@ -17,6 +21,13 @@ target_fields = {
     'deposit': ['credit', 'deposit', 'amount deposited']
 }
 
+def header_words(value):
+    """Lowercased words of a cell, punctuation dropped: 'Withdrawal Amt.' -> ('withdrawal', 'amt')."""
+    return tuple(re.findall(r'[a-z0-9]+', str(value).lower())) if value is not None else ()
+
+# (field, option, option words) of every column name, in target_fields order
+_field_options = [(field, option, header_words(option)) for field, options in target_fields.items() for option in options]
+
 def _to_float(value):
     """Safely convert a value to a float, handling None, empty strings, and commas."""
     if value is None:
@@ -31,149 +42,372 @@ def _to_float(value):
     except ValueError:
         return 0.0
 
-def _read_xls(filepath):
+# Rows at the top of a statement searched for the header (bank name, address and account details come first)
+HEADER_SCAN_ROWS = int(os.getenv("STATEMENT_HEADER_SCAN_ROWS", "100"))
+
+# Bytes at the start of a .csv/.tsv statement used to guess its encoding and delimiter
+SNIFF_BYTES = 64 * 1024
+# Encodings tried on that prefix without a byte order mark, latin-1 decodes anything so it ends the search
+TEXT_ENCODINGS = ['utf-8', 'cp1252', 'latin-1']
+DELIMITERS = [',', ';', '\t', '|']
+# Distinct text dates whose conversion is kept while parsing one statement
+MAX_CACHED_DATES = 10000
+
+# Text date formats of bank exports, day first; the first one every sampled date parses with is the layout's
+DATE_FORMATS = ['%d-%m-%Y', '%d/%m/%Y', '%d/%m/%y', '%d-%m-%y', '%d.%m.%Y', '%d.%m.%y',
+                '%d %b %Y', '%d-%b-%Y', '%d %b %y', '%d-%b-%y', '%Y-%m-%d']
+
+def _iter_xls(source):
+    """Rows of the first sheet of an .xls file (or of a CSV saved as .xls), one at a time."""
+    try:
+        if isinstance(source, str):
+            book = xlrd.open_workbook(source, on_demand=True)
+        else:
+            # xlrd parses from a path or the whole file contents, not a file object
+            book = xlrd.open_workbook(file_contents=source.read(), on_demand=True)
+    except xlrd.biffh.XLRDError:
+        try:
+            yield from _iter_delimited(source)
+        except ValueError as e:
+            raise ValueError(f"File is not a valid .xls file and could not be read as CSV. Error: {e}")
+        return
     try:
-        book = xlrd.open_workbook(filepath)
+        # on_demand only parses the first sheet, not every sheet of the workbook
         sh = book.sheet_by_index(0)
-        data = []
         for row_idx in range(sh.nrows):
             row_values = []
-            for col_idx in range(sh.ncols):
-                cell_type = sh.cell_type(row_idx, col_idx)
-                cell_value = sh.cell_value(row_idx, col_idx)
-                if cell_type == xlrd.XL_CELL_DATE:
-                    dt_tuple = xlrd.xldate_as_tuple(cell_value, book.datemode)
+            for cell in sh.row(row_idx):
+                if cell.ctype == xlrd.XL_CELL_DATE:
+                    dt_tuple = xlrd.xldate_as_tuple(cell.value, book.datemode)
                     row_values.append(datetime(*dt_tuple))
                 else:
-                    row_values.append(cell_value)
-            data.append(row_values)
-        return data
-    except xlrd.biffh.XLRDError:
+                    row_values.append(cell.value)
+            yield row_values
+    finally:
+        book.release_resources()
+
+def sniff_delimited(prefix, default_delimiter=','):
+    """(encoding, delimiter) of a delimited text file from its first bytes.
+
+    The delimiter is the one splitting the most lines into the same number (more than one) of fields, so the
+    one-cell bank and account lines above the header don't throw it off.
+    """
+    if prefix.startswith(codecs.BOM_UTF8):
+        encoding = 'utf-8-sig'
+    elif prefix.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        encoding = 'utf-16'
+    else:
+        for encoding in TEXT_ENCODINGS:
+            try:
+                # Not final: the prefix may end inside a multi-byte character
+                codecs.getincrementaldecoder(encoding)().decode(prefix, final=False)
+                break
+            except UnicodeDecodeError:
+                continue
+    text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(prefix, final=False)
+    # Whole lines only, the last one may be cut
+    lines = text.splitlines()[:-1] if len(prefix) >= SNIFF_BYTES else text.splitlines()
+
+    best, best_count = default_delimiter, 0
+    for delimiter in [default_delimiter] + [d for d in DELIMITERS if d != default_delimiter]:
+        widths = {}
+        for row in csv.reader(lines, delimiter=delimiter):
+            if len(row) > 1:
+                widths[len(row)] = widths.get(len(row), 0) + 1
+        count = max(widths.values(), default=0)
+        if count > best_count:
+            best, best_count = delimiter, count
+    return encoding, best
+
+def _iter_delimited(source, default_delimiter=','):
+    """Rows of a .csv/.tsv file (or of a CSV saved as .xls), decoded and split as sniff_delimited guesses,
+    streamed through the C csv reader."""
+    f = open(source, 'rb') if isinstance(source, str) else source
+    try:
+        f.seek(0)
+        encoding, delimiter = sniff_delimited(f.read(SNIFF_BYTES), default_delimiter)
+        f.seek(0)
+        text = io.TextIOWrapper(f, encoding=encoding, errors='replace', newline='')
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                return [row for row in reader]
-        except Exception as e:
-            raise ValueError(f"File is not a valid .xls file and could not be read as CSV. Error: {e}")
+            yield from csv.reader(text, delimiter=delimiter)
+        finally:
+            # Leave the caller's file open
+            text.detach()
+    except (csv.Error, OSError) as e:
+        raise ValueError(f"Failed to read delimited file. Error: {e}")
+    finally:
+        if isinstance(source, str):
+            f.close()
 
-def _read_xlsx(filepath):
+def _iter_xlsx(source):
+    """Rows of the active sheet of an .xlsx file, streamed from the sheet XML in read-only mode."""
     try:
-        book = openpyxl.load_workbook(filepath, data_only=True)
-        sh = book.active
-        return [[cell.value for cell in row] for row in sh.iter_rows()]
+        book = openpyxl.load_workbook(source, read_only=True, data_only=True)
     except Exception as e:
         raise ValueError(f"Failed to read .xlsx file. Error: {e}")
+    try:
+        sheet = book.active
+        # Read-only mode trusts the sheet's <dimension> tag, which some exports leave stale ("A1") or out, and
+        # would silently stop at it. Without it rows end at their last cell, so pad them to the widest row yet
+        sheet.reset_dimensions()
+        width = 0
+        for row in sheet.iter_rows(values_only=True):
+            width = max(width, len(row))
+            yield row + (None,) * (width - len(row))
+    finally:
+        # Read-only workbooks keep the zip file open until closed
+        book.close()
 
-
-def extract_transactions(filepath):
-    filename, extension = os.path.splitext(filepath)
+def iter_rows(source, filename=None):
+    """Rows of a statement. source is a path, or a binary file object or bytes of the file called filename
+    (for its extension), e.g. an upload still in memory."""
+    _, extension = os.path.splitext(filename or (source if isinstance(source, str) else ''))
     extension = extension.lower()
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    elif not isinstance(source, str):
+        source.seek(0)
 
     if extension == '.xls':
-        data = _read_xls(filepath)
+        return _iter_xls(source)
     elif extension == '.xlsx':
-        data = _read_xlsx(filepath)
+        return _iter_xlsx(source)
+    elif extension in ('.csv', '.tsv'):
+        return _iter_delimited(source, '\t' if extension == '.tsv' else ',')
     else:
         raise ValueError(f"Unsupported file format: {extension}")
 
-    if not data:
-        return []
 
-    col_a = [row[0] if row else None for row in data]
+def _match_fields(best_columns):
+    """{field: column index} of a row from the best matching column (or None) of each of _field_options.
 
-    dateMatchRows = set()
-    for i, cell_value in enumerate(col_a):
-        if cell_value and isinstance(cell_value, str):
-            for j in (target_fields['date']):
-                if match_column(j, [cell_value]):
-                    dateMatchRows.add(i)
-                    break
+    A field takes its first option with a match; when that column is already claimed by an earlier field the
+    next option is tried.
+    """
+    matched, claimed = {}, set()
+    for (field, _, _), column in zip(_field_options, best_columns):
+        if field in matched or column is None or column in claimed:
+            continue
+        matched[field] = column
+        claimed.add(column)
+    return matched
 
-    matchedFields = {}
-    headerRowNum = -1
-    best_match_count = 0
 
-    for row_idx in dateMatchRows:
-        if row_idx >= len(data): continue
-        row_values_str = [str(v) if v is not None else '' for v in data[row_idx]]
-        current_matched_fields = {}
-        
-        for field, options in target_fields.items():
-            for option in options:
-                match = match_column(option, row_values_str)
-                if match and match not in current_matched_fields:
-                    current_matched_fields[match] = field
-                    break
-        
-        if len(current_matched_fields) > best_match_count:
-            best_match_count = len(current_matched_fields)
-            matchedFields = current_matched_fields
-            headerRowNum = row_idx
-        
-        if best_match_count == len(target_fields):
-            break
+def _exact_fields(words):
+    """_match_fields of a row of cell words: an option matches the cells containing all of its words, the
+    one with the fewest other words first ('date' picks 'Date' over 'Value Date')."""
+    best_columns = []
+    for _, _, option_words in _field_options:
+        candidates = [(len(cell) - len(option_words), i) for i, cell in enumerate(words)
+                      if cell and set(option_words) <= set(cell)]
+        best_columns.append(min(candidates)[1] if candidates else None)
+    return _match_fields(best_columns)
 
-    if headerRowNum == -1:
-        print("Error: Could not find a suitable header row.")
-        return []
-    
-    col_name_to_index = {str(name): i for i, name in enumerate(data[headerRowNum])}
-    field_col_indices = {}
-    for sheet_col_name, our_field in matchedFields.items():
-        if sheet_col_name in col_name_to_index:
-            field_col_indices[our_field] = col_name_to_index[sheet_col_name]
 
-    transactions = []
+def _fuzzy_fields(row):
+    """_match_fields of a row by similarity, one options x cells score matrix."""
+    cells = [str(v) if v is not None else '' for v in row]
+    scores = process.cdist([option for _, option, _ in _field_options], cells, scorer=fuzz.WRatio,
+                           processor=utils.default_process)
+    best = scores.argmax(axis=1)
+    return _match_fields([int(column) if scores[k, column] > HEADER_MATCH_SCORE else None
+                          for k, column in enumerate(best)])
 
-    for row_idx in range(headerRowNum + 1, len(data)):
-        row = data[row_idx]
-        if not any(row) or len(row) <= max(field_col_indices.values() or [0]):
-            continue
 
-        try:
-            record = {}
+def find_header(rows):
+    """(header row index, {field: column index}) among rows, or (-1, {}) when none looks like a header.
 
-            date_col_idx = field_col_indices.get('date')
-            desc_col_idx = field_col_indices.get('description')
-            with_col_idx = field_col_indices.get('withdrawal')
-            dep_col_idx = field_col_indices.get('deposit')
+    Header rows start with a date column. Candidates are matched on exact words first; only when no row
+    names every field are the rows tried again by similarity, which catches misspelt or run-together
+    headers.
+    """
+    date_options = [(option, set(option_words)) for field, option, option_words in _field_options if field == 'date']
+    headerRowNum, matchedFields = -1, {}
 
-            if date_col_idx is None or desc_col_idx is None:
-                continue
+    for row_idx, row in enumerate(rows):
+        first_words = set(header_words(row[0])) if row else set()
+        if not any(option_words <= first_words for _, option_words in date_options):
+            continue
+        row_words = [header_words(v) for v in row]
+        fields = _exact_fields(row_words)
+        if len(fields) > len(matchedFields):
+            headerRowNum, matchedFields = row_idx, fields
+        if len(matchedFields) == len(target_fields):
+            return headerRowNum, matchedFields
 
-            raw_date = row[date_col_idx]
-            if not raw_date:
+    # Fuzzy fallback, the first cell of every row against the date names in one call
+    first_cells = [(i, row[0]) for i, row in enumerate(rows) if row and row[0] and isinstance(row[0], str)]
+    if first_cells:
+        date_scores = process.cdist([option for option, _ in date_options], [cell for _, cell in first_cells],
+                                    scorer=fuzz.WRatio, processor=utils.default_process)
+        for (row_idx, _), column_scores in zip(first_cells, date_scores.T):
+            if column_scores.max() <= HEADER_MATCH_SCORE:
                 continue
+            fields = _fuzzy_fields(rows[row_idx])
+            if len(fields) > len(matchedFields):
+                headerRowNum, matchedFields = row_idx, fields
+            if len(matchedFields) == len(target_fields):
+                break
 
-            date_str = str(raw_date).strip()
-            if not any(char.isdigit() for char in date_str):
-                print(f"Skipping row {row_idx} due to invalid date (no numerals): '{date_str}'")
-                continue
+    return headerRowNum, matchedFields
 
-            if not row[desc_col_idx]: 
-                continue
-            
-            if isinstance(raw_date, datetime):
-                record['Date'] = raw_date.strftime('%Y-%m-%d')
-            elif isinstance(raw_date, str):
-                try:
-                    record['Date'] = datetime.strptime(raw_date, '%d-%m-%Y').strftime('%Y-%m-%d')
-                except ValueError:
-                    record['Date'] = str(raw_date)
-            else:
-                record['Date'] = str(raw_date)
-
-            record['Description'] = str(row[desc_col_idx]).strip()
-            
-            withdrawal_val = row[with_col_idx] if with_col_idx is not None else 0
-            deposit_val = row[dep_col_idx] if dep_col_idx is not None else 0
-            
-            record['Withdrawal'] = _to_float(withdrawal_val)
-            record['Deposit'] = _to_float(deposit_val)
-
-            transactions.append(record)
-        except (ValueError, IndexError) as e:
-            print(f"Skipping row {row_idx} due to error: {e}")
+
+def header_fingerprint(header_row, row):
+    """Hash of a header row's normalized column names and its position in the sheet, the same for every
+    statement a bank exports with that layout."""
+    names = [" ".join(header_words(v)) for v in row]
+    while names and not names[-1]:
+        names.pop()
+    return hashlib.sha1(f"{header_row}:{'|'.join(names)}".encode("utf-8")).hexdigest()
+
+
+def detect_date_format(rows, field_col_indices, sample=20):
+    """The DATE_FORMATS entry of the text dates in the transaction rows, None when the dates are real date
+    cells or no format fits them all."""
+    date_col_idx, desc_col_idx = field_col_indices.get('date'), field_col_indices.get('description')
+    if date_col_idx is None or desc_col_idx is None:
+        return None
+    samples = []
+    for row in rows:
+        if not row or len(row) <= max(date_col_idx, desc_col_idx) or not row[desc_col_idx]:
+            continue
+        value = row[date_col_idx]
+        if isinstance(value, str) and any(char.isdigit() for char in value):
+            samples.append(value.strip())
+            if len(samples) >= sample:
+                break
+    for date_format in DATE_FORMATS if samples else []:
+        try:
+            for value in samples:
+                datetime.strptime(value, date_format)
+        except ValueError:
             continue
+        return date_format
+    return None
+
+
+def find_layout(head):
+    """The layout of a statement from its first rows, None when no header is found:
+
+    {"fingerprint", "header_row", "header" (normalized column names), "field_columns" ({field: column
+    index}), "date_format"}
+    """
+    header_row, field_col_indices = find_header(head)
+    if header_row == -1:
+        return None
+    return {
+        "fingerprint": header_fingerprint(header_row, head[header_row]),
+        "header_row": header_row,
+        "header": [" ".join(header_words(v)) for v in head[header_row]],
+        "field_columns": field_col_indices,
+        "date_format": detect_date_format(head[header_row + 1:], field_col_indices),
+    }
+
+
+def _format_date(raw_date, date_format=None):
+    """ISO date of a statement date cell, the text as is when it doesn't parse, '' when it has no numerals."""
+    date_str = str(raw_date).strip()
+    if not any(char.isdigit() for char in date_str):
+        return ''
+    if isinstance(raw_date, datetime):
+        return raw_date.strftime('%Y-%m-%d')
+    if isinstance(raw_date, str):
+        try:
+            return datetime.strptime(date_str, date_format or '%d-%m-%Y').strftime('%Y-%m-%d')
+        except ValueError:
+            return str(raw_date)
+    return str(raw_date)
+
+
+def _parse_row(row_idx, row, field_col_indices, date_format=None, dates=None):
+    """The transaction record of one statement row, or None for rows that aren't transactions. dates caches
+    text date conversions across the rows of a statement."""
+    if not any(row) or len(row) <= max(field_col_indices.values() or [0]):
+        return None
+
+    try:
+        record = {}
+
+        date_col_idx = field_col_indices.get('date')
+        desc_col_idx = field_col_indices.get('description')
+        with_col_idx = field_col_indices.get('withdrawal')
+        dep_col_idx = field_col_indices.get('deposit')
+
+        if date_col_idx is None or desc_col_idx is None:
+            return None
+
+        raw_date = row[date_col_idx]
+        if not raw_date:
+            return None
+
+        # Statements repeat the same few dates on every row, each text date is converted once
+        if dates is not None and isinstance(raw_date, str):
+            date_value = dates.get(raw_date)
+            if date_value is None:
+                if len(dates) >= MAX_CACHED_DATES:
+                    dates.clear()
+                date_value = dates[raw_date] = _format_date(raw_date, date_format)
+        else:
+            date_value = _format_date(raw_date, date_format)
+        if not date_value:
+            print(f"Skipping row {row_idx} due to invalid date (no numerals): '{str(raw_date).strip()}'")
+            return None
+
+        if not row[desc_col_idx]: 
+            return None
+        record['Date'] = date_value
+
+        record['Description'] = str(row[desc_col_idx]).strip()
+        
+        withdrawal_val = row[with_col_idx] if with_col_idx is not None else 0
+        deposit_val = row[dep_col_idx] if dep_col_idx is not None else 0
+        
+        record['Withdrawal'] = _to_float(withdrawal_val)
+        record['Deposit'] = _to_float(deposit_val)
+        return record
+    except (ValueError, IndexError) as e:
+        print(f"Skipping row {row_idx} due to error: {e}")
+        return None
+
+
+def read_statement(source, filename=None, header_scan_rows=HEADER_SCAN_ROWS, resolve_layout=find_layout):
+    """(layout, transactions) of a statement (a path, or a file object or bytes with its filename, see
+    iter_rows); (None, no transactions) when no header is found.
+
+    The layout comes from resolve_layout(first header_scan_rows rows), find_layout or a registry of known
+    layouts in front of it. Only those rows are held in memory, transactions is a generator yielding one
+    record at a time while the rest of the file is read, so memory stays flat however long the statement is.
+    """
+    rows = iter_rows(source, filename)
+    head = list(itertools.islice(rows, header_scan_rows))
+    layout = resolve_layout(head)
+    if layout is None:
+        rows.close()
+        if head:
+            print("Error: Could not find a suitable header row.")
+        return None, iter(())
+    return layout, _transactions(rows, head, layout, header_scan_rows)
+
+
+def _transactions(rows, head, layout, header_scan_rows):
+    field_col_indices, date_format = layout["field_columns"], layout["date_format"]
+    dates = {}
+    for row_idx in range(layout["header_row"] + 1, len(head)):
+        record = _parse_row(row_idx, head[row_idx], field_col_indices, date_format, dates)
+        if record is not None:
+            yield record
+    del head
+    for row_idx, row in enumerate(rows, start=header_scan_rows):
+        record = _parse_row(row_idx, row, field_col_indices, date_format, dates)
+        if record is not None:
+            yield record
+
+
+def iter_transactions(source, filename=None, header_scan_rows=HEADER_SCAN_ROWS):
+    """Transactions of a statement, yielded one at a time while the file is read (see read_statement)."""
+    _, transactions = read_statement(source, filename, header_scan_rows)
+    yield from transactions
+
 
-    return transactions
+def extract_transactions(source, filename=None):
+    return list(iter_transactions(source, filename))
@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+import models
+from service.statementExtractor import detect_date_format, find_layout, header_fingerprint, header_words
+
+# Hit counts are written to statement_layouts at most this often, not with a commit per upload
+LAYOUT_HITS_FLUSH_SECONDS = int(os.getenv("LAYOUT_HITS_FLUSH_SECONDS", "60"))
+# Layouts kept in statement_layouts, the least used ones are dropped beyond it
+MAX_LAYOUTS = int(os.getenv("MAX_STATEMENT_LAYOUTS", "1000"))
+
+
+class LayoutRegistry:
+    """Statement layouts seen before, persisted in statement_layouts and cached in process.
+
+    resolve() hashes the rows at the header positions of the known layouts (only those whose first cell starts
+    a known header): a match gives the column mapping and date format without any header matching. Unknown
+    layouts go through find_layout once and are recorded (authenticated uploads only), so the bank's next
+    statement is a hit; past MAX_LAYOUTS the least used layouts are evicted. Sync and async routes can call it
+    concurrently, hence the lock.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.undetected = 0
+        self.evictions = 0
+        self._layouts = None  # fingerprint -> layout, loaded from the table on first use
+        self._first_cells: Dict[int, Set[str]] = {}  # header row -> first column names of the layouts there
+        self._pending_hits: Dict[str, int] = {}  # fingerprint -> hits not written yet
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _index(self) -> None:
+        self._first_cells = {}
+        for layout in self._layouts.values():
+            self._first_cells.setdefault(layout["header_row"], set()).add(layout["header"][0] if layout["header"] else "")
+
+    def _load(self, db: Session) -> None:
+        if self._layouts is not None:
+            return
+        layouts = {row.fingerprint: {"fingerprint": row.fingerprint, "header_row": row.header_row, "header": row.header,
+                                     "field_columns": row.field_columns, "date_format": row.date_format, "hits": row.hits,
+                                     "last_used_at": row.last_used_at}
+                   for row in db.execute(select(models.StatementLayout)).scalars()}
+        with self._lock:
+            if self._layouts is None:
+                self._layouts = layouts
+                self._index()
+
+    def match(self, head: list) -> Optional[dict]:
+        """The known layout whose header is in head, without touching the database."""
+        with self._lock:
+            layouts, first_cells = self._layouts or {}, self._first_cells
+        for position, names in first_cells.items():
+            if position >= len(head) or not head[position]:
+                continue
+            if " ".join(header_words(head[position][0])) not in names:
+                continue
+            layout = layouts.get(header_fingerprint(position, head[position]))
+            if layout is not None:
+                return layout
+        return None
+
+    def _flush_hits(self, db: Session, force: bool = False) -> None:
+        with self._lock:
+            if not self._pending_hits or (not force and time.monotonic() - self._flushed_at < LAYOUT_HITS_FLUSH_SECONDS):
+                return
+            pending, self._pending_hits = self._pending_hits, {}
+            self._flushed_at = time.monotonic()
+        now = datetime.now()
+        for fingerprint, hits in pending.items():
+            db.execute(update(models.StatementLayout).where(models.StatementLayout.fingerprint == fingerprint)
+                       .values(hits=models.StatementLayout.hits + hits, last_used_at=now))
+        db.commit()
+
+    def _evict(self, db: Session, keep: str) -> None:
+        """Delete the least used layouts (fewest hits, then longest unused) beyond MAX_LAYOUTS, never keep."""
+        with self._lock:
+            excess = len(self._layouts) - MAX_LAYOUTS
+            if excess <= 0:
+                return
+            candidates = sorted((layout for layout in self._layouts.values() if layout["fingerprint"] != keep),
+                                key=lambda layout: (layout["hits"], layout["last_used_at"]))
+            evicted = [layout["fingerprint"] for layout in candidates[:excess]]
+            for fingerprint in evicted:
+                del self._layouts[fingerprint]
+                self._pending_hits.pop(fingerprint, None)
+            self.evictions += len(evicted)
+            self._index()
+        db.execute(delete(models.StatementLayout).where(models.StatementLayout.fingerprint.in_(evicted)))
+        db.commit()
+
+    def _redetect_date_format(self, db: Session, head: list, layout: dict, record: bool) -> Optional[str]:
+        """The date format of a known layout recorded without one (first statement had no text dates, or none
+        that fit), detected again from this statement's rows and stored once found."""
+        date_format = detect_date_format(head[layout["header_row"] + 1:], layout["field_columns"])
+        if date_format is not None and record:
+            db.execute(update(models.StatementLayout)
+                       .where(models.StatementLayout.fingerprint == layout["fingerprint"],
+                              models.StatementLayout.date_format.is_(None))
+                       .values(date_format=date_format))
+            db.commit()
+            with self._lock:
+                layout["date_format"] = date_format
+        return date_format
+
+    def resolve(self, db: Session, head: list, record: bool = True) -> Optional[dict]:
+        """The layout of a statement from its first rows, with "source" "registry" (known layout) or
+        "detected" (new, recorded unless record is False); None when no header is found."""
+        self._load(db)
+        layout = self.match(head)
+        if layout is not None:
+            with self._lock:
+                self.hits += 1
+                layout["hits"] += 1
+                layout["last_used_at"] = datetime.now()
+                self._pending_hits[layout["fingerprint"]] = self._pending_hits.get(layout["fingerprint"], 0) + 1
+            self._flush_hits(db)
+            resolved = {**layout, "source": "registry"}
+            if resolved["date_format"] is None:
+                resolved["date_format"] = self._redetect_date_format(db, head, layout, record)
+            return resolved
+
+        layout = find_layout(head)
+        if layout is None:
+            with self._lock:
+                self.undetected += 1
+            return None
+        with self._lock:
+            self.misses += 1
+        if not record:
+            return {**layout, "source": "detected"}
+        # Another worker may have recorded the same layout meanwhile, the first row stays
+        now = datetime.now()
+        db.execute(insert(models.StatementLayout).values(
+            fingerprint=layout["fingerprint"], header_row=layout["header_row"], header=layout["header"],
+            field_columns=layout["field_columns"], date_format=layout["date_format"], hits=0,
+            created_at=now, last_used_at=now,
+        ).on_conflict_do_nothing(index_elements=["fingerprint"]))
+        db.commit()
+        with self._lock:
+            self._layouts.setdefault(layout["fingerprint"], {**layout, "hits": 0, "last_used_at": now})
+            self._index()
+        self._evict(db, keep=layout["fingerprint"])
+        return {**layout, "source": "detected"}
+
+    def flush(self, db: Session) -> None:
+        """Write the hit counts not written yet (shutdown, tests)."""
+        self._flush_hits(db, force=True)
+
+    def clear(self) -> None:
+        """Forget the cached layouts, the next resolve() reloads them from the table. Unwritten hit counts are
+        dropped."""
+        with self._lock:
+            self._layouts = None
+            self._first_cells = {}
+            self._pending_hits = {}
+
+    def stats(self, top: int = 10) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            layouts = sorted((self._layouts or {}).values(), key=lambda layout: layout["hits"], reverse=True)
+            return {"layouts": len(self._layouts) if self._layouts is not None else None,
+                    "hits": self.hits, "misses": self.misses, "undetected": self.undetected,
+                    "evictions": self.evictions,
+                    "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                    "top_layouts": [{"fingerprint": layout["fingerprint"][:12], "header_row": layout["header_row"],
+                                     "header": " | ".join(name for name in layout["header"] if name),
+                                     "hits": layout["hits"]} for layout in layouts[:top]]}
+
+layout_registry = LayoutRegistry()
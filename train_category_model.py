@@ -0,0 +1,285 @@
+"""
+Train, evaluate and version the expense category model.
+
+Replaces the manual steps of "category finder/categoryFinder.ipynb":
+
+1. Reads the labelled names from the CSV and, with --include-db, the distinct name/category pairs of the
+   expenses users have saved
+2. Holds out a test split (test_size=0.2, random_state=42 like the notebook) and runs a cross-validated grid
+   search over the vectorizer and LogisticRegression settings, in parallel over --n-jobs processes
+3. Writes a new version directory under --model-dir (v1, v2, ...) with the model, metadata.json (data hash,
+   parameters, metrics) and report.md: held-out accuracy, per-class F1 and p50/p99 single-item and batch
+   inference latency of the artifact as the API loads it
+
+    hashing  HashingVectorizer features, weights in a memory-mapped float32 .npy served with numpy only
+             (service/category_model.py)
+    tfidf    the notebook's TF-IDF pipeline, pickled with joblib
+
+Both vectorize the normalized merchant (service/category_service.py normalize_merchant), like the prediction
+cache keys. The API serves a version with CATEGORY_MODEL_VERSION=v3 (or latest).
+
+Usage (from the project root):
+    python train_category_model.py --model hashing --include-db --n-jobs -1
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, classification_report, f1_score
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
+from sklearn.pipeline import Pipeline
+from sqlalchemy import create_engine, text
+
+from database import SQLALCHEMY_DATABASE_URL
+from service.category_model import HashingCategoryModel, list_model_versions, load_category_model
+from service.category_service import CATEGORY_MODEL_DIR, normalize_merchant
+
+DEFAULT_DATA = os.path.join("category finder", "Daily Household Transactions.csv")
+
+# Expense category ids as stored in expenses.category_id (main.py CATEGORIES)
+EXPENSE_CATEGORIES = {
+    1: "Food",
+    2: "Housing",
+    3: "Transportation",
+    4: "Personal",
+    5: "Utility",
+    6: "Recreation",
+    7: "Health",
+    8: "Debt"
+}
+
+PARAM_GRIDS = {
+    "hashing": {
+        "vectorizer__n_features": [2 ** 14, 2 ** 16],
+        "vectorizer__ngram_range": [(1, 1), (1, 2)],
+        "classifier__C": [0.3, 1.0, 3.0, 10.0],
+    },
+    "tfidf": {
+        "vectorizer__ngram_range": [(1, 1), (1, 2)],
+        "vectorizer__sublinear_tf": [False, True],
+        "classifier__C": [0.3, 1.0, 3.0, 10.0],
+    },
+}
+
+
+def load_labelled_names(data_path: str = DEFAULT_DATA, database_url: str = None) -> pd.DataFrame:
+    """Name/Category rows from the CSV, plus the users' saved expenses when database_url is given."""
+    frames = [pd.read_csv(data_path)[["Name", "Category"]]]
+    if database_url:
+        engine = create_engine(database_url)
+        with engine.connect() as connection:
+            rows = connection.execute(text(
+                "SELECT DISTINCT name, category_id FROM expenses WHERE name IS NOT NULL AND trim(name) != ''"
+            )).all()
+        engine.dispose()
+        frames.append(pd.DataFrame(
+            [(name, EXPENSE_CATEGORIES[category_id]) for name, category_id in rows if category_id in EXPENSE_CATEGORIES],
+            columns=["Name", "Category"],
+        ))
+    df = pd.concat(frames, ignore_index=True)
+    df["Name"] = df["Name"].astype(str)
+    return df
+
+
+def split_names(df: pd.DataFrame, test_size: float = 0.2, random_state: int = 42):
+    """(x_train, x_test, y_train, y_test) of the labelled names, the one split training and the benchmarks use."""
+    return train_test_split(df["Name"], df["Category"], test_size=test_size, random_state=random_state)
+
+
+def load_split(data_path: str = DEFAULT_DATA, test_size: float = 0.2, random_state: int = 42, database_url: str = None):
+    """(x_train, x_test, y_train, y_test), without --include-db exactly as the notebook splits them."""
+    return split_names(load_labelled_names(data_path, database_url), test_size, random_state)
+
+
+def build_pipeline(kind: str) -> Pipeline:
+    if kind == "hashing":
+        vectorizer = HashingVectorizer(preprocessor=normalize_merchant, alternate_sign=True, norm="l2")
+    else:
+        vectorizer = TfidfVectorizer(preprocessor=normalize_merchant)
+    return Pipeline([("vectorizer", vectorizer),
+                     ("classifier", LogisticRegression(class_weight="balanced", max_iter=1000))])
+
+
+def search(kind: str, x_train, y_train, folds: int, n_jobs: int, random_state: int) -> GridSearchCV:
+    # Stratified folds can't be more than the rarest class has examples
+    folds = max(2, min(folds, int(y_train.value_counts().min())))
+    grid = GridSearchCV(build_pipeline(kind), PARAM_GRIDS[kind], scoring="f1_macro", n_jobs=n_jobs,
+                        cv=StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state))
+    grid.fit(x_train, y_train)
+    return grid
+
+
+def to_hashing_model(pipeline: Pipeline, x_check) -> HashingCategoryModel:
+    vectorizer, classifier = pipeline.named_steps["vectorizer"], pipeline.named_steps["classifier"]
+    # Feature-major with the intercept as the last row, see HashingCategoryModel
+    weights = np.vstack([classifier.coef_.T, classifier.intercept_]).astype(np.float32)
+    model = HashingCategoryModel(weights, classifier.classes_.tolist(), vectorizer.n_features, vectorizer.ngram_range)
+    # The numpy featurization must reproduce scikit-learn's, otherwise serving silently degrades
+    if not np.allclose(model.predict_proba(list(x_check)), pipeline.predict_proba(x_check), atol=1e-4):
+        raise RuntimeError("HashingCategoryModel predictions don't match the trained scikit-learn pipeline")
+    return model
+
+
+def next_version(model_dir: str) -> str:
+    versions = list_model_versions(model_dir)
+    return f"v{int(versions[-1][1:]) + 1 if versions else 1}"
+
+
+def _percentiles_ms(seconds: list) -> tuple:
+    return round(float(np.percentile(seconds, 50)) * 1000, 3), round(float(np.percentile(seconds, 99)) * 1000, 3)
+
+
+def measure_latency(model, names: list, batch_size: int, repeats: int) -> dict:
+    """p50/p99 milliseconds of predict_proba on one name and on batch_size names."""
+    cycled = names * (max(repeats, batch_size) // len(names) + 1)
+    single = []
+    for name in cycled[:repeats]:
+        started = time.perf_counter()
+        model.predict_proba([name])
+        single.append(time.perf_counter() - started)
+    batch = []
+    for _ in range(max(repeats // 20, 5)):
+        started = time.perf_counter()
+        model.predict_proba(cycled[:batch_size])
+        batch.append(time.perf_counter() - started)
+    single_p50, single_p99 = _percentiles_ms(single)
+    batch_p50, batch_p99 = _percentiles_ms(batch)
+    return {"single_p50_ms": single_p50, "single_p99_ms": single_p99,
+            "batch_size": batch_size, "batch_p50_ms": batch_p50, "batch_p99_ms": batch_p99}
+
+
+def write_report(path: str, metadata: dict, class_report: str) -> None:
+    metrics, latency = metadata["metrics"], metadata["latency"]
+    lines = [
+        f"# Category model {metadata['version']}",
+        "",
+        f"- Created: {metadata['created_at']}",
+        f"- Model: {metadata['model']} ({metadata['model_file']}), scikit-learn {metadata['sklearn_version']}",
+        f"- Data: {metadata['data']['rows']} rows ({metadata['data']['train_rows']} train / {metadata['data']['test_rows']} test), "
+        f"sha256 {metadata['data']['sha256'][:12]}, users' expenses included: {metadata['data']['include_db']}",
+        f"- Best parameters ({metadata['search']['folds']}-fold CV, macro F1 {metadata['search']['cv_f1_macro']:.3f}): "
+        f"{json.dumps(metadata['search']['best_params'])}",
+        "",
+        "## Held-out evaluation",
+        "",
+        f"Accuracy {metrics['accuracy']:.3f}, macro F1 {metrics['f1_macro']:.3f}",
+        "",
+        "```",
+        class_report.rstrip(),
+        "```",
+        "",
+        "## Inference latency",
+        "",
+        "| | p50 ms | p99 ms |",
+        "|---|---|---|",
+        f"| single item | {latency['single_p50_ms']} | {latency['single_p99_ms']} |",
+        f"| batch of {latency['batch_size']} | {latency['batch_p50_ms']} | {latency['batch_p99_ms']} |",
+        "",
+    ]
+    with open(path, "w") as f:
+        f.write("\n".join(lines))
+
+
+def write_version(args, version: str, build_dir: str, df, x_train, x_test, y_test, grid) -> None:
+    """Model file, metadata.json and report.md of the best estimator, evaluated as the API loads it."""
+    if args.model == "hashing":
+        model_file = "model.npy"
+        to_hashing_model(grid.best_estimator_, x_train).save(os.path.join(build_dir, model_file))
+    else:
+        import joblib
+        model_file = "model.pkl"
+        joblib.dump(grid.best_estimator_, os.path.join(build_dir, model_file))
+
+    # Evaluate and time the artifact the way the API loads it
+    model = load_category_model(os.path.join(build_dir, model_file))
+    y_pred = model.predict(list(x_test))
+    class_report = classification_report(y_test, y_pred, zero_division=0)
+    per_class = classification_report(y_test, y_pred, zero_division=0, output_dict=True)
+    metadata = {
+        "version": version,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "model": args.model,
+        "model_file": model_file,
+        "sklearn_version": sklearn.__version__,
+        "data": {
+            "csv": args.data,
+            "include_db": args.include_db,
+            "rows": len(df),
+            "train_rows": len(x_train),
+            "test_rows": len(x_test),
+            "sha256": hashlib.sha256(df.to_csv(index=False).encode("utf-8")).hexdigest(),
+            "test_size": args.test_size,
+            "random_state": args.random_state,
+        },
+        "search": {
+            "folds": grid.n_splits_,
+            "best_params": {key: list(value) if isinstance(value, tuple) else value
+                            for key, value in grid.best_params_.items()},
+            "cv_f1_macro": round(float(grid.best_score_), 4),
+        },
+        "metrics": {
+            "accuracy": round(accuracy_score(y_test, y_pred), 4),
+            "f1_macro": round(f1_score(y_test, y_pred, average="macro", zero_division=0), 4),
+            "f1_per_class": {label: round(scores["f1-score"], 4) for label, scores in per_class.items()
+                             if label in set(model.classes_)},
+        },
+        "latency": measure_latency(model, list(x_test), args.batch_size, args.latency_repeats),
+    }
+    with open(os.path.join(build_dir, "metadata.json"), "w") as f:
+        json.dump(metadata, f, indent=2)
+    write_report(os.path.join(build_dir, "report.md"), metadata, class_report)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DEFAULT_DATA)
+    parser.add_argument("--include-db", action="store_true", help="also train on the expenses users have saved")
+    parser.add_argument("--database-url", default=SQLALCHEMY_DATABASE_URL)
+    parser.add_argument("--model", choices=sorted(PARAM_GRIDS), default="hashing")
+    parser.add_argument("--model-dir", default=CATEGORY_MODEL_DIR)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="parallel grid search processes, -1 for all cores")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=500, help="batch size of the latency benchmark")
+    parser.add_argument("--latency-repeats", type=int, default=1000)
+    args = parser.parse_args()
+
+    df = load_labelled_names(args.data, args.database_url if args.include_db else None)
+    x_train, x_test, y_train, y_test = split_names(df, args.test_size, args.random_state)
+    started = time.perf_counter()
+    grid = search(args.model, x_train, y_train, args.folds, args.n_jobs, args.random_state)
+    print(f"Grid search over {len(grid.cv_results_['params'])} settings took {time.perf_counter() - started:.1f}s")
+
+    version = next_version(args.model_dir)
+    version_dir = os.path.join(args.model_dir, version)
+    # Build and check the version in a scratch directory next to it and rename it into place once complete, so
+    # a failed run (e.g. to_hashing_model's check) leaves no half written vN behind
+    os.makedirs(args.model_dir, exist_ok=True)
+    build_dir = tempfile.mkdtemp(prefix=f".{version}-", dir=args.model_dir)
+    try:
+        write_version(args, version, build_dir, df, x_train, x_test, y_test, grid)
+        os.chmod(build_dir, 0o755)  # mkdtemp's 0700 would hide it from an API running as another user
+        os.rename(build_dir, version_dir)
+    except BaseException:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+
+    with open(os.path.join(version_dir, "report.md")) as f:
+        print(f.read())
+    print(f"Wrote {version_dir}, serve it with CATEGORY_MODEL_VERSION={version}")
+
+
+if __name__ == "__main__":
+    main_cli()